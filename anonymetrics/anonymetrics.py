@@ -1,11 +1,12 @@
 import pandas as pd
-from typing import List
+from typing import List, Tuple
 import numpy as np
 import matplotlib.pyplot as plt
-from collections import Counter
 
+from anonymetrics.groupindex import EquivalenceClassIndex, get_equivalence_class_index, factorize_column
 
-def calculate_k_anonymity(df: pd.DataFrame, qa_indices: List[int]) -> int:
+
+def calculate_k_anonymity(df: pd.DataFrame, qa_indices: List[int], ec_index: EquivalenceClassIndex = None) -> int:
     """
     Calculates the k-anonymity of a dataset based on its quasi-identifiers (QI).
 
@@ -15,6 +16,8 @@ def calculate_k_anonymity(df: pd.DataFrame, qa_indices: List[int]) -> int:
         The input DataFrame containing the dataset.
     qa_indices : list of int
         A list of the indices of the QI columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
@@ -22,20 +25,97 @@ def calculate_k_anonymity(df: pd.DataFrame, qa_indices: List[int]) -> int:
         The minimum group size across all equivalence classes based on given QI.
     """
 
-    # Group the DataFrame by the quasi-identifiers
-    groupby_cols = df.columns[qa_indices].tolist()
-    groupby_obj = df.groupby(groupby_cols)
-
-    # Count number of records in each group
-    group_counts = groupby_obj.size().reset_index(name='count')
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
 
     # Calculate k in k-anonymity
-    k = group_counts['count'].min()
+    k = ec_index.sizes.min()
 
     return k
 
 
-def calculate_l_diversity(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int]) -> int:
+def get_sensitive_value_counts(ec_index: EquivalenceClassIndex, column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Counts the records per distinct (group, sensitive value) pair. The pairs are sorted by group and, within a group,
+    by decreasing count. Missing sensitive values are not counted.
+
+    Parameters
+    -----------
+    ec_index : EquivalenceClassIndex
+        The equivalence class index of the dataset.
+    column : pandas.Series
+        The sensitive attribute column of the indexed dataset.
+
+    Returns
+    -----------
+    groups, counts
+        The group and the number of records of every pair.
+    """
+
+    value_codes, uniques = factorize_column(column)
+    n_values = max(len(uniques), 1)
+
+    valid = (ec_index.codes >= 0) & (value_codes >= 0)
+    pair_codes, pairs = pd.factorize(ec_index.codes[valid] * n_values + value_codes[valid])
+    counts = np.bincount(pair_codes, minlength=len(pairs))
+    groups = pairs // n_values
+
+    order = np.lexsort((-counts, groups))
+
+    return groups[order], counts[order]
+
+
+def calculate_diversities(ec_index: EquivalenceClassIndex, column: pd.Series, c: float = None) -> dict:
+    """
+    Calculates the distinct, the entropy and the recursive (c,l)-diversity of every group for one sensitive
+    attribute from the sorted (group, sensitive value) counts.
+
+    The entropy l-diversity of a group is exp(H) with the entropy H of its sensitive values. A group is recursive
+    (c,l)-diverse, if r_1 < c (r_l + r_(l+1) + ... + r_m) holds for the counts r_1 >= r_2 >= ... >= r_m of its
+    sensitive values; its recursive diversity is the largest such l. Groups without sensitive values have diversity 0.
+
+    Parameters
+    -----------
+    ec_index : EquivalenceClassIndex
+        The equivalence class index of the dataset.
+    column : pandas.Series
+        The sensitive attribute column of the indexed dataset.
+    c : float, optional
+        The constant of the recursive (c,l)-diversity, which is only calculated if c is given.
+
+    Returns
+    -----------
+    dict
+        The arrays of per group diversities 'distinct', 'entropy' and, if c is given, 'recursive'.
+    """
+
+    groups, counts = get_sensitive_value_counts(ec_index, column)
+    n_groups = ec_index.n_groups
+
+    distinct = np.bincount(groups, minlength=n_groups)
+    totals = np.bincount(groups, weights=counts, minlength=n_groups)
+
+    p = counts / totals[groups]
+    entropy = np.bincount(groups, weights=-p * np.log(p), minlength=n_groups)
+
+    diversities = {'distinct': distinct, 'entropy': np.where(distinct > 0, np.exp(entropy), 0)}
+
+    if c is not None:
+        # first pair of every group holds its most frequent value r_1
+        starts = np.zeros(n_groups + 1, dtype=np.int64)
+        np.cumsum(distinct, out=starts[1:])
+
+        # r_l + ... + r_m for the l-th most frequent value of every group
+        cumulative = np.cumsum(counts)
+        tails = totals[groups] - (cumulative - counts - (cumulative - counts)[starts[groups]])
+
+        satisfied = counts[starts[groups]] < c * tails
+        diversities['recursive'] = np.bincount(groups[satisfied], minlength=n_groups)
+
+    return diversities
+
+
+def calculate_l_diversity(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int],
+                          ec_index: EquivalenceClassIndex = None) -> int:
     """
     Calculates the distinct l-diversity of a dataset based on its quasi-identifiers (QI) and sensitive attributes (SA).
 
@@ -47,6 +127,8 @@ def calculate_l_diversity(df: pd.DataFrame, qa_indices: List[int], sa_indices: L
         A list of the indices of the QI columns in the DataFrame.
     sa_indices : list of int
         A list of the indices of the SA columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
@@ -54,20 +136,70 @@ def calculate_l_diversity(df: pd.DataFrame, qa_indices: List[int], sa_indices: L
         The minimum number of distinct values of each sensitive attribute across all equivalence classes given QI.
     """
 
-    # Group the DataFrame by the quasi-identifiers
-    groupby_cols = df.columns[qa_indices].tolist()
-    groupby_obj = df.groupby(groupby_cols)
-
     # Calculate l in l-diversity
+    l = get_diversities(df, qa_indices, sa_indices, ec_index).min()
+
+    return l
+
+
+def calculate_entropy_l_diversity(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int],
+                                  ec_index: EquivalenceClassIndex = None) -> float:
+    """
+    Calculates the entropy l-diversity of a dataset based on its quasi-identifiers (QI) and sensitive attributes (SA).
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing both the QI and SA columns.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_indices : list of int
+        A list of the indices of the SA columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    l
+        The minimum exponential of the entropy of each sensitive attribute across all equivalence classes given QI.
+    """
+
+    l = get_entropy_diversities(df, qa_indices, sa_indices, ec_index).min()
+
+    return l
+
 
-    grouped_df = groupby_obj[df.columns[sa_indices]]
-    distinct_values = grouped_df.nunique()
-    l = distinct_values.min().min()
+def calculate_recursive_cl_diversity(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int], c: float,
+                                     ec_index: EquivalenceClassIndex = None) -> int:
+    """
+    Calculates the recursive (c,l)-diversity of a dataset based on its quasi-identifiers (QI) and sensitive
+    attributes (SA), i.e. the largest l such that the dataset is recursive (c,l)-diverse.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing both the QI and SA columns.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_indices : list of int
+        A list of the indices of the SA columns in the DataFrame.
+    c : float
+        The constant c of the recursive (c,l)-diversity.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    l
+        The minimum recursive diversity of each sensitive attribute across all equivalence classes given QI.
+    """
+
+    l = get_recursive_diversities(df, qa_indices, sa_indices, c, ec_index).min()
 
     return l
 
 
-def get_groups(df: pd.DataFrame, qa_indices: List[int]) -> List[pd.DataFrame]:
+def get_groups(df: pd.DataFrame, qa_indices: List[int], ec_index: EquivalenceClassIndex = None) -> List[pd.DataFrame]:
     """
     Extracts groups (equivalence classes) from a DataFrame based on some quasi-identifying factors.
 
@@ -77,6 +209,8 @@ def get_groups(df: pd.DataFrame, qa_indices: List[int]) -> List[pd.DataFrame]:
         The DataFrame to extract equivalence classes from.
     qa_indices : list of int
         A list of column names to group by.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
@@ -84,12 +218,10 @@ def get_groups(df: pd.DataFrame, qa_indices: List[int]) -> List[pd.DataFrame]:
         list of pandas.DataFrame: A list of new DataFrame including disjunct groups.
     """
 
-    # Group the DataFrame by the quasi identifiers
-    groupby_col = df.columns[qa_indices].tolist()
-    grouped = df.groupby(groupby_col)
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
 
     # Get the list of equivalence classes as DataFrames
-    groups = [group for _, group in grouped]
+    groups = [df.iloc[ec_index.group_positions(group)] for group in range(ec_index.n_groups)]
 
     return groups
 
@@ -120,6 +252,105 @@ def calculate_sensitive_attr_prob_dist(df: pd.DataFrame, sa_index: int):
     return dist
 
 
+def get_midpoints(values) -> np.ndarray:
+    """
+    Converts attribute values to numbers, where tuples/lists of numbers and intervals are represented by their mean.
+
+    Parameters
+    -----------
+    values : array-like
+        The (distinct) attribute values, e.g. the index of a probability distribution.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the midpoint of each value.
+    """
+
+    if isinstance(values, (pd.IntervalIndex, pd.arrays.IntervalArray)):
+        return np.asarray(values.mid, dtype=float)
+
+    if isinstance(values, (pd.CategoricalIndex, pd.Categorical)):
+        # midpoints of the categories, e.g. the intervals of a compact discretized column
+        values = pd.Categorical(values)
+        return np.append(get_midpoints(values.categories), np.nan)[values.codes]
+
+    if isinstance(values, pd.MultiIndex):
+        values = values.to_flat_index()
+
+    values = np.asarray(values)
+
+    if values.dtype != object:
+        return values.astype(float)
+
+    return np.array([value.mid if isinstance(value, pd.Interval) else np.mean(value) for value in values], dtype=float)
+
+
+def emd_ordered(dists: np.ndarray, reference: np.ndarray):
+    """
+    Calculates the ordered earth mover distance between one or many probability distributions and a reference
+    distribution over the same ordered attribute values.
+
+    Parameters
+    -----------
+    dists : numpy.ndarray
+        A probability distribution of shape (m,) or many distributions of shape (n, m) with values in ascending order.
+    reference : numpy.ndarray
+        The reference distribution of shape (m,) with values in ascending order.
+
+    Returns
+    -----------
+    emd
+        The earth mover distance, or an array of n distances if dists is two-dimensional.
+    """
+
+    dists = np.asarray(dists, dtype=float)
+    m = dists.shape[-1]  # number of attribute values
+
+    if m < 2:
+        return np.zeros(dists.shape[:-1]) if dists.ndim > 1 else 0
+
+    # the cumulative sum is the amount of probability mass moved between neighbouring values
+    R = dists - np.asarray(reference, dtype=float)
+    emd = np.abs(np.cumsum(R, axis=-1)).sum(axis=-1) / (m - 1)
+
+    return emd
+
+
+# see https://www.cs.purdue.edu/homes/ninghui/papers/t_closeness_icde07.pdf, S.6
+def emd_numerical_batch(dists: np.ndarray, reference: np.ndarray, values=None) -> np.ndarray:
+    """
+    Calculates the (ordered) earth mover distance between many probability distributions and one reference
+    distribution when the attribute value is numerical. The inputs are not modified.
+
+    Parameters
+    -----------
+    dists : numpy.ndarray
+        The probability distributions of shape (n, m), one column per attribute value.
+    reference : numpy.ndarray
+        The reference distribution of shape (m,).
+    values : array-like, optional
+        The attribute values of the columns (numbers, tuples or intervals). If omitted, the columns are assumed to be
+        in ascending order.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the earth mover distance of each distribution.
+    """
+
+    dists = np.atleast_2d(np.asarray(dists, dtype=float))
+    reference = np.asarray(reference, dtype=float)
+
+    if values is not None:
+        # sort the columns once by the midpoints of their values
+        order = np.argsort(get_midpoints(values), kind='stable')
+        dists = dists[:, order]
+        reference = reference[order]
+
+    return emd_ordered(dists, reference)
+
+
 # see https://www.cs.purdue.edu/homes/ninghui/papers/t_closeness_icde07.pdf, S.6
 def emd_numerical(dist_0: pd.Series, dist_1: pd.Series) -> float:
     """
@@ -138,20 +369,11 @@ def emd_numerical(dist_0: pd.Series, dist_1: pd.Series) -> float:
     emd
         The earth mover distance between the two input distributions.
     """
-    m = dist_0.size  # number of attribute values
+    # order both distributions by the mean value of tuple/list of numbers
+    P = dist_0.to_numpy()[np.argsort(get_midpoints(dist_0.index), kind='stable')]
+    Q = dist_1.to_numpy()[np.argsort(get_midpoints(dist_1.index), kind='stable')]
 
-    # convert tuple/list of numbers to their mean value
-    dist_0.index = dist_0.index.map(lambda x: np.mean(x))
-    dist_1.index = dist_1.index.map(lambda x: np.mean(x))
-
-    P = dist_0.sort_index().array
-    Q = dist_1.sort_index().array
-    R = P - Q
-
-    if m > 1:
-        emd = (1 / (m - 1)) * sum([abs(sum(R[:(i + 1)])) for i in range(m)])
-    else:
-        emd = 0
+    emd = emd_ordered(P, Q)
 
     return emd
 
@@ -188,7 +410,164 @@ def emd_categorical(dist_0: pd.Series, dist_1: pd.Series) -> float:
     return emd
 
 
-def calculate_t_closeness(df: pd.DataFrame, qa_indices: List[int], sa_index: int) -> float:
+def get_value_counts_blocks(ec_index: EquivalenceClassIndex, value_codes: np.ndarray, n_values: int,
+                            max_cells: int = 2 ** 22):
+    """
+    Counts the values of a column per equivalence class as a (groups x values) contingency matrix. The matrix is
+    yielded in blocks of consecutive groups, such that a block holds at most max_cells counts.
+
+    Parameters
+    -----------
+    ec_index : EquivalenceClassIndex
+        The equivalence class index of the dataset.
+    value_codes : numpy.ndarray
+        The integer code of the value of every record, -1 for missing values.
+    n_values : int
+        The number of distinct values.
+    max_cells : int
+        The maximum number of counts per block.
+
+    Yields
+    -----------
+    start, counts
+        The first group of the block and the count matrix of the block.
+    """
+
+    block_size = max(1, max_cells // max(n_values, 1))
+
+    for start in range(0, ec_index.n_groups, block_size):
+        stop = min(start + block_size, ec_index.n_groups)
+
+        # records of consecutive groups are stored consecutively in order
+        rows = ec_index.order[ec_index.offsets[start]:ec_index.offsets[stop]]
+        row_values = value_codes[rows]
+        valid = row_values >= 0
+        cells = (ec_index.codes[rows[valid]] - start) * n_values + row_values[valid]
+
+        counts = np.bincount(cells, minlength=(stop - start) * n_values).reshape(stop - start, n_values)
+
+        yield start, counts
+
+
+def emd_to_reference(counts: np.ndarray, reference: np.ndarray, numerical: bool = False,
+                     order: np.ndarray = None) -> np.ndarray:
+    """
+    Calculates the earth mover distance between the value distribution of each row of a count matrix and a reference
+    distribution.
+
+    Parameters
+    -----------
+    counts : numpy.ndarray
+        A (groups x values) count matrix.
+    reference : numpy.ndarray
+        The reference distribution over the same values.
+    numerical : bool
+        Whether to use the ordered (numerical) instead of the equal (categorical) earth mover distance.
+    order : numpy.ndarray, optional
+        The permutation that sorts the values in ascending order, required for the ordered distance.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the earth mover distance of each row.
+    """
+
+    totals = counts.sum(axis=1, keepdims=True)
+    dists = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+    if numerical:
+        if order is not None:
+            dists = dists[:, order]
+            reference = reference[order]
+        return emd_ordered(dists, reference)
+
+    return 0.5 * np.abs(dists - reference).sum(axis=1)
+
+
+def is_numerical(column: pd.Series) -> bool:
+    """
+    Checks whether a sensitive attribute is treated as numerical by the t-closeness measure.
+    """
+    return column.dtype.name in ["int64", "float32", "float32", "tuple"]
+
+
+def calculate_closenesses(ec_index: EquivalenceClassIndex, column: pd.Series, numerical: bool = False,
+                          max_cells: int = 2 ** 22, weights: np.ndarray = None,
+                          reference: Tuple[np.ndarray, np.ndarray] = None) -> Tuple[float, np.ndarray]:
+    """
+    Calculates the closeness of every equivalence class, i.e. the earth mover distance between the distribution of a
+    sensitive attribute within the group and within the whole dataset.
+
+    All groups are evaluated at once on a (groups x sensitive values) count matrix, which is processed in blocks of
+    at most max_cells counts to bound the memory.
+
+    Parameters
+    -----------
+    ec_index : EquivalenceClassIndex
+        The equivalence class index of the dataset.
+    column : pandas.Series
+        The sensitive attribute column of the indexed dataset.
+    numerical : bool
+        Whether to use the ordered (numerical) instead of the equal (categorical) earth mover distance.
+    max_cells : int
+        The maximum number of counts held in memory at once.
+    weights : numpy.ndarray, optional
+        A weight per record for the distribution of the whole dataset, e.g. the inverse inclusion probabilities of a
+        sample. By default, all records have the same weight.
+    reference : tuple of numpy.ndarray, optional
+        The distinct values of the whole dataset and their counts, if the indexed dataset is only a part of it, e.g.
+        one shard. Replaces the distribution of the column and the weights.
+
+    Returns
+    -----------
+    t, closenesses
+        The maximum closeness and an array containing the closeness per group.
+    """
+
+    value_codes, uniques = factorize_column(column)
+
+    if reference is not None:
+        # recode the values to the positions of the reference values
+        reference_values, reference_counts = reference
+        positions = {value: position for position, value in enumerate(reference_values)}
+        missing = [value for value in uniques if value not in positions]
+        if missing:
+            raise ValueError(f"Value {missing[0]!r} is not part of the reference distribution.")
+
+        lookup = np.array([positions[value] for value in uniques] + [-1], dtype=np.int64)
+        value_codes = lookup[value_codes]
+        uniques = reference_values
+        weights = None
+
+    n_values = len(uniques)
+
+    closenesses = np.zeros(ec_index.n_groups)
+
+    if n_values == 0:
+        return 0, closenesses
+
+    # distribution of the sensitive attribute in the whole dataset
+    if reference is not None:
+        dist_dataset = np.asarray(reference[1], dtype=float)
+    else:
+        valid = value_codes >= 0
+        dist_dataset = np.bincount(value_codes[valid], weights=None if weights is None else weights[valid],
+                                   minlength=n_values)
+    dist_dataset = dist_dataset / dist_dataset.sum()
+
+    # order the values once by their midpoints
+    order = np.argsort(get_midpoints(uniques), kind='stable') if numerical else None
+
+    for start, counts in get_value_counts_blocks(ec_index, value_codes, n_values, max_cells):
+        closenesses[start:start + len(counts)] = emd_to_reference(counts, dist_dataset, numerical, order)
+
+    t = closenesses.max(initial=0)
+
+    return t, closenesses
+
+
+def calculate_t_closeness(df: pd.DataFrame, qa_indices: List[int], sa_index: int,
+                          ec_index: EquivalenceClassIndex = None) -> float:
     """
     Calculates the t-closeness measure for a sensitive attribute in a DataFrame.
 
@@ -205,6 +584,8 @@ def calculate_t_closeness(df: pd.DataFrame, qa_indices: List[int], sa_index: int
         A list of column indices for the quasi-identifying attributes.
     sa_index : int
         The column index for the sensitive attribute.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     ----------
@@ -214,34 +595,17 @@ def calculate_t_closeness(df: pd.DataFrame, qa_indices: List[int], sa_index: int
         values in the entire dataset. A smaller t-closeness value indicates a higher degree of privacy.
     """
 
-    attr_value_type = df.iloc[:, sa_index].dtype.name
-
-    groups = get_groups(df, qa_indices)
-    dist_dataset = calculate_sensitive_attr_prob_dist(df, sa_index)
-
-    t = 0
-
     # numerical attribute
-    if attr_value_type in ["int64", "float32", "float32", "tuple"]:
+    numerical = is_numerical(df.iloc[:, sa_index])
 
-        for group in groups:
-            dist_group = calculate_sensitive_attr_prob_dist(group, sa_index)
-            dist_group = pd.Series(data=dist_group, index=dist_dataset.index).fillna(0)
-            t_new = emd_numerical(dist_group, dist_dataset)
-            t = max(t, t_new)
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
 
-    else:
-
-        for group in groups:
-            dist_group = calculate_sensitive_attr_prob_dist(group, sa_index)
-            dist_group = pd.Series(data=dist_group, index=dist_dataset.index).fillna(0)
-            t_new = emd_categorical(dist_group, dist_dataset)
-            t = max(t, t_new)
+    t, _ = calculate_closenesses(ec_index, df.iloc[:, sa_index], numerical)
 
     return t
 
 
-def get_group_sizes(df: pd.DataFrame, qa_indices: List[int]) -> np.ndarray:
+def get_group_sizes(df: pd.DataFrame, qa_indices: List[int], ec_index: EquivalenceClassIndex = None) -> np.ndarray:
     """
     Extracts the group sizes based on the quasi-identifiers (QI) in a dataset.
 
@@ -251,21 +615,24 @@ def get_group_sizes(df: pd.DataFrame, qa_indices: List[int]) -> np.ndarray:
         The input DataFrame containing the dataset.
     qa_indices : list of int
         A list of the indices of the QI columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
     numpy.ndarray
         An array containing the group sizes.
     """
-    groups = get_groups(df, qa_indices)
-    lengths = get_group_lengths(groups)
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
 
-    return lengths
+    return ec_index.sizes
 
 
-def get_diversities(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int]) -> np.ndarray:
+def get_diversities(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int],
+                    ec_index: EquivalenceClassIndex = None) -> np.ndarray:
     """
-    Extracts ...
+    Extracts the distinct l-diversity of each group, i.e. the minimum number of distinct values of the sensitive
+    attributes within the group.
 
     Parameters
     -----------
@@ -275,21 +642,85 @@ def get_diversities(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[in
         A list of the indices of the QI columns in the DataFrame.
     sa_indices : list of int
         A list of the indices of the sensitive attribute columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
     numpy.ndarray
         An array containing the diversities per group.
     """
-    groups = get_groups(df, qa_indices)
-    diversities = [calculate_l_diversity(group, qa_indices, sa_indices) for group in groups]
+    return _get_diversities(df, qa_indices, sa_indices, 'distinct', ec_index)
 
-    return diversities
 
+def get_entropy_diversities(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int],
+                            ec_index: EquivalenceClassIndex = None) -> np.ndarray:
+    """
+    Extracts the entropy l-diversity of each group, i.e. the minimum exponential of the entropy of the sensitive
+    attributes within the group.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_indices : list of int
+        A list of the indices of the sensitive attribute columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the entropy diversities per group.
+    """
+    return _get_diversities(df, qa_indices, sa_indices, 'entropy', ec_index)
 
-def get_closenesses(df: pd.DataFrame, qa_indices: List[int], sa_index: int) -> np.ndarray:
+
+def get_recursive_diversities(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int], c: float,
+                              ec_index: EquivalenceClassIndex = None) -> np.ndarray:
     """
-    Extracts ...
+    Extracts the recursive (c,l)-diversity of each group, i.e. the largest l for which the group is recursive
+    (c,l)-diverse in all sensitive attributes.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_indices : list of int
+        A list of the indices of the sensitive attribute columns in the DataFrame.
+    c : float
+        The constant c of the recursive (c,l)-diversity.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the recursive diversities per group.
+    """
+    return _get_diversities(df, qa_indices, sa_indices, 'recursive', ec_index, c)
+
+
+def _get_diversities(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int], kind: str,
+                     ec_index: EquivalenceClassIndex = None, c: float = None) -> np.ndarray:
+    # per group minimum of one kind of diversity over all sensitive attributes
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+
+    diversities = [calculate_diversities(ec_index, df.iloc[:, sa_index], c)[kind]
+                   for sa_index in np.atleast_1d(sa_indices)]
+
+    return np.min(diversities, axis=0)
+
+
+def get_closenesses(df: pd.DataFrame, qa_indices: List[int], sa_index: int,
+                    ec_index: EquivalenceClassIndex = None) -> np.ndarray:
+    """
+    Extracts the closeness of each group, i.e. the (equal) earth mover distance between the distribution of the
+    sensitive attribute within the group and within the whole dataset.
 
     Parameters
     -----------
@@ -299,6 +730,8 @@ def get_closenesses(df: pd.DataFrame, qa_indices: List[int], sa_index: int) -> n
         A list of the indices of the QI columns in the DataFrame.
     sa_index : list of int
         The index of a sensitive attribute
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
@@ -306,20 +739,15 @@ def get_closenesses(df: pd.DataFrame, qa_indices: List[int], sa_index: int) -> n
         An array containing the closeness per group.
     """
 
-    groups = get_groups(df, qa_indices)
-    dist_dataset = calculate_sensitive_attr_prob_dist(df, sa_index)
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
 
-    closenesses = []
-
-    for group in groups:
-        dist_group = calculate_sensitive_attr_prob_dist(group, sa_index)
-        dist_group = pd.Series(data=dist_group, index=dist_dataset.index).fillna(0)
-        closenesses.append(emd_categorical(dist_group, dist_dataset))
+    _, closenesses = calculate_closenesses(ec_index, df.iloc[:, sa_index])
 
     return closenesses
 
 
-def get_count_per_group_size(df: pd.DataFrame, qa_indices: List[int]) -> np.ndarray:
+def get_count_per_group_size(df: pd.DataFrame, qa_indices: List[int],
+                             ec_index: EquivalenceClassIndex = None) -> np.ndarray:
     """
     Calculates the count per group size based on the quasi-identifiers (QI) in a dataset.
 
@@ -329,6 +757,8 @@ def get_count_per_group_size(df: pd.DataFrame, qa_indices: List[int]) -> np.ndar
         The input DataFrame containing the dataset.
     qa_indices : list of int
         A list of the indices of the QI columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
     Returns
     -----------
@@ -336,23 +766,31 @@ def get_count_per_group_size(df: pd.DataFrame, qa_indices: List[int]) -> np.ndar
         An array containing the count per group size.
     """
     # Call the get_group_sizes function to calculate group sizes
-    group_sizes = get_group_sizes(df, qa_indices)
+    group_sizes = get_group_sizes(df, qa_indices, ec_index)
 
-    counter = Counter(group_sizes)
+    return count_per_group_size(group_sizes)
 
-    keys = []
-    values = []
 
-    for group_size in counter:
-        keys.append(group_size)
-        values.append(counter[group_size])
+def count_per_group_size(group_sizes: np.ndarray) -> np.ndarray:
+    """
+    Calculates the number of records per group size from the group sizes.
+
+    Parameters
+    -----------
+    group_sizes : numpy.ndarray
+        An array containing the group sizes.
 
-    max = np.max(keys)
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the count per group size.
+    """
 
-    counts = np.zeros(max + 2)
+    # number of groups per group size
+    groups_per_size = np.bincount(group_sizes)
 
-    for i in range(len(keys)):
-        counts[keys[i]] = keys[i] * values[i]
+    counts = np.zeros(len(groups_per_size) + 1)
+    counts[:len(groups_per_size)] = np.arange(len(groups_per_size)) * groups_per_size
 
     # Return the count per group size
     return counts
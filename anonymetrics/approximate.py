@@ -0,0 +1,411 @@
+from statistics import NormalDist
+from typing import Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import calculate_closenesses, count_per_group_size, is_numerical
+from anonymetrics.groupindex import EquivalenceClassIndex, get_equivalence_class_index
+
+
+def get_sampling_scores(df: pd.DataFrame, qa_indices: List[int], stratify_index: int = None,
+                        strata_weights: dict = None, seed: int = 0) -> np.ndarray:
+    """
+    Calculates a sampling score per record, which is equal for all records of an equivalence class.
+
+    The score is a hash of the QI values mapped to [0, 1), divided by the weight of the stratum of the record. A sample
+    at rate r consists of all records with a score below r, so it contains whole equivalence classes, each with the
+    inclusion probability min(r * weight, 1), and the samples of increasing rates are nested.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    stratify_index : int, optional
+        The index of a QI column whose values define the strata.
+    strata_weights : dict, optional
+        The factor of the sampling rate per value of the stratification column. Missing values have the factor 1.
+    seed : int
+        The seed of the hash function.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the sampling score per record.
+    """
+
+    if stratify_index is not None and stratify_index not in qa_indices:
+        raise ValueError("The stratification column must be one of the QI columns.")
+
+    hashes = pd.util.hash_pandas_object(df.iloc[:, list(qa_indices)], index=False,
+                                        hash_key=f"{seed:016d}"[-16:]).to_numpy()
+
+    # the upper 53 bits of the hash as a uniform number in [0, 1)
+    scores = (hashes >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+    if stratify_index is not None and strata_weights:
+        weights = df.iloc[:, stratify_index].map(strata_weights).fillna(1).to_numpy(dtype=float)
+        if np.any(weights <= 0):
+            raise ValueError("The strata weights must be positive.")
+        scores = scores / weights
+
+    return scores
+
+
+def sample_equivalence_classes(df: pd.DataFrame, qa_indices: List[int], rate: float, stratify_index: int = None,
+                               strata_weights: dict = None, seed: int = 0,
+                               scores: np.ndarray = None) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Draws a random sample of whole equivalence classes (cluster sample).
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    rate : float
+        The sampling rate of the equivalence classes, in (0, 1].
+    stratify_index : int, optional
+        The index of a QI column whose values define the strata.
+    strata_weights : dict, optional
+        The factor of the sampling rate per value of the stratification column.
+    seed : int
+        The seed of the hash function.
+    scores : numpy.ndarray, optional
+        Precomputed sampling scores from get_sampling_scores.
+
+    Returns
+    -----------
+    sample, probabilities
+        The sampled records and the inclusion probability of each sampled record.
+    """
+
+    if not 0 < rate <= 1:
+        raise ValueError("The sampling rate must be in (0, 1].")
+
+    if scores is None:
+        scores = get_sampling_scores(df, qa_indices, stratify_index, strata_weights, seed)
+
+    positions = np.flatnonzero(scores < rate)
+
+    weights = np.ones(len(positions))
+    if stratify_index is not None and strata_weights:
+        weights = df.iloc[positions, stratify_index].map(strata_weights).fillna(1).to_numpy(dtype=float)
+
+    probabilities = np.minimum(rate * weights, 1)
+
+    return df.iloc[positions], probabilities
+
+
+def _get_confidence_interval(estimate: np.ndarray, variance: np.ndarray, observed: np.ndarray,
+                             confidence: float) -> Tuple[np.ndarray, np.ndarray]:
+    # normal interval, bounded below by the value observed in the sample
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_width = z * np.sqrt(variance)
+
+    return np.maximum(estimate - half_width, observed), estimate + half_width
+
+
+def _may_miss_groups(min_probability: float, confidence: float) -> bool:
+    # whether a group outside the sample is plausible, the sample misses a group with probability 1 - its inclusion
+    # probability, so at most 1 - min_probability, however many groups there are
+    return 1 - min_probability > 1 - confidence
+
+
+def estimate_k_anonymity(sample: pd.DataFrame, qa_indices: List[int],
+                         ec_index: EquivalenceClassIndex = None) -> int:
+    """
+    Estimates the k-anonymity from a sample of equivalence classes.
+
+    The sample contains whole equivalence classes, so the smallest sampled group is an upper bound of k. The true k
+    may be any smaller value, down to 1, if the smallest groups were not sampled, see estimate_k_anonymity_ci.
+
+    Parameters
+    -----------
+    sample : pandas DataFrame
+        A sample from sample_equivalence_classes.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for sample and qa_indices.
+
+    Returns
+    -----------
+    int
+        An upper bound of the k-anonymity of the dataset, or None if no group was sampled.
+    """
+
+    ec_index = get_equivalence_class_index(sample, qa_indices, ec_index)
+
+    if ec_index.n_groups == 0:
+        return None
+
+    return ec_index.sizes.min()
+
+
+def estimate_k_anonymity_ci(sample: pd.DataFrame, qa_indices: List[int], min_probability: float,
+                            confidence: float = 0.95, ec_index: EquivalenceClassIndex = None) -> Tuple[int, int]:
+    """
+    Estimates a confidence interval of the k-anonymity from a sample of equivalence classes.
+
+    The upper bound is the smallest sampled group, see estimate_k_anonymity. The sample misses a smaller group with a
+    probability of at most 1 - min_probability, so if this is below 1 - confidence, the upper bound is also the lower
+    bound. Otherwise, a missed group may have any size and the lower bound is 1.
+
+    Parameters
+    -----------
+    sample : pandas DataFrame
+        A sample from sample_equivalence_classes.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    min_probability : float
+        The smallest inclusion probability of the groups of the dataset, e.g. the sampling rate without strata.
+    confidence : float
+        The confidence level of the interval.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for sample and qa_indices.
+
+    Returns
+    -----------
+    lower, upper
+        The bounds of the confidence interval of the k-anonymity of the dataset, or None if no group was sampled.
+    """
+
+    k_upper = estimate_k_anonymity(sample, qa_indices, ec_index)
+
+    if k_upper is None:
+        return None, None
+
+    return (1 if _may_miss_groups(min_probability, confidence) else k_upper), k_upper
+
+
+def estimate_count_per_group_size(sample: pd.DataFrame, qa_indices: List[int], probabilities: np.ndarray,
+                                  confidence: float = 0.95,
+                                  ec_index: EquivalenceClassIndex = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estimates the count per group size of a dataset from a sample of equivalence classes with the Horvitz-Thompson
+    estimator.
+
+    Parameters
+    -----------
+    sample : pandas DataFrame
+        A sample from sample_equivalence_classes.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    probabilities : numpy.ndarray
+        The inclusion probability of each sampled record.
+    confidence : float
+        The confidence level of the interval.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for sample and qa_indices.
+
+    Returns
+    -----------
+    estimate, lower, upper
+        Arrays containing the estimated count per group size and the bounds of its confidence interval.
+    """
+
+    ec_index = get_equivalence_class_index(sample, qa_indices, ec_index)
+
+    sizes = ec_index.sizes
+    group_probabilities = probabilities[ec_index.order[ec_index.offsets[:-1]]]
+
+    observed = count_per_group_size(sizes)
+    estimate = np.zeros(len(observed))
+    variance = np.zeros(len(observed))
+
+    estimate[:len(observed) - 1] = np.bincount(sizes, weights=sizes / group_probabilities,
+                                               minlength=len(observed) - 1)
+    variance[:len(observed) - 1] = np.bincount(sizes, weights=sizes ** 2 * (1 - group_probabilities)
+                                               / group_probabilities ** 2, minlength=len(observed) - 1)
+
+    return (estimate, *_get_confidence_interval(estimate, variance, observed, confidence))
+
+
+def estimate_unique_fraction(sample: pd.DataFrame, qa_indices: List[int], probabilities: np.ndarray,
+                             n_records: int, confidence: float = 0.95,
+                             ec_index: EquivalenceClassIndex = None) -> Tuple[float, float, float]:
+    """
+    Estimates the share of records that are unique in their QI values from a sample of equivalence classes.
+
+    Parameters
+    -----------
+    sample : pandas DataFrame
+        A sample from sample_equivalence_classes.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    probabilities : numpy.ndarray
+        The inclusion probability of each sampled record.
+    n_records : int
+        The number of records of the whole dataset.
+    confidence : float
+        The confidence level of the interval.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for sample and qa_indices.
+
+    Returns
+    -----------
+    estimate, lower, upper
+        The estimated unique fraction and the bounds of its confidence interval.
+    """
+
+    estimate, lower, upper = estimate_count_per_group_size(sample, qa_indices, probabilities, confidence, ec_index)
+
+    if n_records == 0 or len(estimate) < 2:
+        return 0.0, 0.0, 0.0
+
+    return estimate[1] / n_records, lower[1] / n_records, min(upper[1] / n_records, 1.0)
+
+
+def estimate_t_closeness(sample: pd.DataFrame, qa_indices: List[int], sa_index: int, probabilities: np.ndarray,
+                         ec_index: EquivalenceClassIndex = None) -> float:
+    """
+    Estimates the t-closeness from a sample of equivalence classes.
+
+    The distribution of the sensitive attribute in the dataset is estimated from the sample weighted by the inverse
+    inclusion probabilities. The largest closeness of the sampled groups is a lower bound of t, up to the error of the
+    estimated distribution. The true t may be any larger value, if the farthest groups were not sampled, see
+    estimate_t_closeness_ci.
+
+    Parameters
+    -----------
+    sample : pandas DataFrame
+        A sample from sample_equivalence_classes.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_index : int
+        The index of the sensitive attribute column.
+    probabilities : numpy.ndarray
+        The inclusion probability of each sampled record.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for sample and qa_indices.
+
+    Returns
+    -----------
+    float
+        The estimated lower bound of the t-closeness of the dataset.
+    """
+
+    column = sample.iloc[:, sa_index]
+    ec_index = get_equivalence_class_index(sample, qa_indices, ec_index)
+
+    t, _ = calculate_closenesses(ec_index, column, is_numerical(column), weights=1 / probabilities)
+
+    return t
+
+
+def estimate_t_closeness_ci(sample: pd.DataFrame, qa_indices: List[int], sa_index: int, probabilities: np.ndarray,
+                            min_probability: float, confidence: float = 0.95,
+                            ec_index: EquivalenceClassIndex = None) -> Tuple[float, float]:
+    """
+    Estimates a confidence interval of the t-closeness from a sample of equivalence classes, analogous to
+    estimate_k_anonymity_ci.
+
+    The lower bound is the largest closeness of the sampled groups, see estimate_t_closeness. The sample misses a
+    farther group with a probability of at most 1 - min_probability, so if this is below 1 - confidence, the lower
+    bound is also the upper bound, up to the error of the estimated distribution. Otherwise, a missed group may have
+    any closeness and the upper bound is 1, the largest earth mover distance.
+
+    Parameters
+    -----------
+    sample : pandas DataFrame
+        A sample from sample_equivalence_classes.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_index : int
+        The index of the sensitive attribute column.
+    probabilities : numpy.ndarray
+        The inclusion probability of each sampled record.
+    min_probability : float
+        The smallest inclusion probability of the groups of the dataset, e.g. the sampling rate without strata.
+    confidence : float
+        The confidence level of the interval.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for sample and qa_indices.
+
+    Returns
+    -----------
+    lower, upper
+        The bounds of the confidence interval of the t-closeness of the dataset.
+    """
+
+    t_lower = estimate_t_closeness(sample, qa_indices, sa_index, probabilities, ec_index)
+
+    return t_lower, (1.0 if _may_miss_groups(min_probability, confidence) else t_lower)
+
+
+def refine_estimates(df: pd.DataFrame, qa_indices: List[int], sa_index: int = None,
+                     rates: List[float] = (0.01, 0.05, 0.2, 1.0), stratify_index: int = None,
+                     strata_weights: dict = None, confidence: float = 0.95, seed: int = 0) -> Iterator[dict]:
+    """
+    Estimates the anonymity metrics on nested samples of increasing rates.
+
+    The records are hashed once and every sample contains the previous one, so the estimates can be refined until they
+    are precise enough. Once all inclusion probabilities reach 1, the estimates are exact.
+
+    'k_upper' is the upper bound of k and 't_lower' the lower bound of t given by the sampled groups. Their
+    confidence intervals 'k_ci' and 't_ci' only narrow down to these bounds once the inclusion probabilities of all
+    groups exceed the confidence level, see estimate_k_anonymity_ci and estimate_t_closeness_ci.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    sa_index : int, optional
+        The index of a sensitive attribute column to estimate the t-closeness for.
+    rates : list of float
+        The increasing sampling rates.
+    stratify_index : int, optional
+        The index of a QI column whose values define the strata.
+    strata_weights : dict, optional
+        The factor of the sampling rate per value of the stratification column.
+    confidence : float
+        The confidence level of the intervals.
+    seed : int
+        The seed of the hash function.
+
+    Returns
+    -----------
+    iterator of dict
+        The estimates per rate with the keys 'rate', 'n_sampled', 'k_upper', 'k_ci', 'count_per_group_size',
+        'count_per_group_size_ci', 'unique_fraction', 'unique_fraction_ci' and, if sa_index is given, 't_lower' and
+        't_ci'.
+    """
+
+    scores = get_sampling_scores(df, qa_indices, stratify_index, strata_weights, seed)
+
+    # the smallest factor of the sampling rate of any record
+    min_weight = 1.0
+    if stratify_index is not None and strata_weights:
+        min_weight = df.iloc[:, stratify_index].map(strata_weights).fillna(1).to_numpy(dtype=float).min(initial=np.inf)
+
+    for rate in rates:
+        sample, probabilities = sample_equivalence_classes(df, qa_indices, rate, stratify_index, strata_weights,
+                                                           scores=scores)
+        ec_index = EquivalenceClassIndex(sample, qa_indices)
+
+        counts, lower, upper = estimate_count_per_group_size(sample, qa_indices, probabilities, confidence, ec_index)
+        unique = estimate_unique_fraction(sample, qa_indices, probabilities, len(df), confidence, ec_index)
+        min_probability = 1.0 if len(sample) == len(df) else min(rate * min_weight, 1.0)
+        k_ci = estimate_k_anonymity_ci(sample, qa_indices, min_probability, confidence, ec_index)
+
+        estimates = {'rate': rate,
+                     'n_sampled': len(sample),
+                     'k_upper': k_ci[1],
+                     'k_ci': k_ci,
+                     'count_per_group_size': counts,
+                     'count_per_group_size_ci': (lower, upper),
+                     'unique_fraction': unique[0],
+                     'unique_fraction_ci': unique[1:]}
+
+        if sa_index is not None:
+            t_ci = estimate_t_closeness_ci(sample, qa_indices, sa_index, probabilities, min_probability, confidence,
+                                           ec_index)
+            estimates['t_lower'] = t_ci[0]
+            estimates['t_ci'] = t_ci
+
+        yield estimates
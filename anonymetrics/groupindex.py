@@ -0,0 +1,200 @@
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+
+def factorize_column(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encodes the values of a column as integer codes in sorted value order.
+
+    Parameters
+    -----------
+    column : pandas.Series
+        The column to encode.
+
+    Returns
+    -----------
+    codes, uniques
+        An array of codes (-1 for missing values) and the sorted distinct values, in order of appearance if the
+        values cannot be sorted.
+    """
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        values = column.array
+    else:
+        # factorize the raw values, an Index would turn frozensets into tuples
+        values = column.to_numpy()
+
+    try:
+        codes, uniques = pd.factorize(values, sort=True)
+    except TypeError:
+        # values of mixed types without an order, e.g. numbers next to suppressed cells
+        codes, uniques = pd.factorize(values)
+
+    return codes.astype(np.int64, copy=False), uniques
+
+
+def combine_codes(codes: List[np.ndarray], cardinalities: List[int], sort: bool = True) -> Tuple[np.ndarray, int]:
+    """
+    Combines the codes of several columns into one code per record. If sorted, the combined codes follow the
+    lexicographic order of the column codes, i.e. the order of pandas.DataFrame.groupby.
+
+    Parameters
+    -----------
+    codes : list of numpy.ndarray
+        One array of codes per column, -1 marks a missing value.
+    cardinalities : list of int
+        The number of distinct codes per column.
+    sort : bool
+        Whether the combined codes are numbered in sorted order instead of order of appearance.
+
+    Returns
+    -----------
+    codes, n_groups
+        An array of combined codes (-1 if any column is missing) and the number of distinct combinations.
+    """
+
+    n = len(codes[0]) if len(codes) > 0 else 0
+    missing = np.zeros(n, dtype=bool)
+    combined = np.zeros(n, dtype=np.int64)
+    radix = 1
+
+    for column_codes, cardinality in zip(codes, cardinalities):
+        missing |= column_codes < 0
+        cardinality = max(int(cardinality), 1)
+
+        # compress the codes seen so far before the mixed radix would overflow int64
+        if radix * cardinality >= 2 ** 62:
+            combined, uniques = pd.factorize(combined, sort=sort)
+            radix = len(uniques)
+
+        combined = combined * cardinality + column_codes
+        radix *= cardinality
+
+    group_codes = np.full(n, -1, dtype=np.int64)
+    valid = ~missing
+    valid_codes, uniques = pd.factorize(combined[valid], sort=sort)
+    group_codes[valid] = valid_codes
+
+    return group_codes, len(uniques)
+
+
+class EquivalenceClassIndex:
+    """
+    Index of the equivalence classes of a dataset based on its quasi-identifiers (QI).
+
+    The QI columns are factorized once into one integer group code per record. Groups are numbered in the order of
+    pandas.DataFrame.groupby and records with a missing QI value belong to no group (code -1). The records of group g
+    are found at the positions order[offsets[g]:offsets[g + 1]].
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+
+    Attributes
+    -----------
+    qa_indices : list of int
+        The indices of the QI columns the index was built for.
+    n_records : int
+        The number of records in the indexed DataFrame.
+    codes : numpy.ndarray
+        The group code of every record.
+    n_groups : int
+        The number of equivalence classes.
+    sizes : numpy.ndarray
+        The number of records in each equivalence class.
+    offsets : numpy.ndarray
+        The start of each equivalence class in order, followed by the number of grouped records.
+    order : numpy.ndarray
+        The positions of the grouped records, sorted by group code.
+    """
+
+    def __init__(self, df: pd.DataFrame, qa_indices: List[int]):
+        self.qa_indices = list(qa_indices)
+        self.n_records = len(df)
+
+        column_codes = []
+        cardinalities = []
+        for qa_index in self.qa_indices:
+            codes, uniques = factorize_column(df.iloc[:, qa_index])
+            column_codes.append(codes)
+            cardinalities.append(len(uniques))
+
+        self.codes, self.n_groups = combine_codes(column_codes, cardinalities)
+
+        valid = np.flatnonzero(self.codes >= 0)
+        self.order = valid[np.argsort(self.codes[valid], kind='stable')]
+        self.sizes = np.bincount(self.codes[valid], minlength=self.n_groups)
+        self.offsets = np.zeros(self.n_groups + 1, dtype=np.int64)
+        np.cumsum(self.sizes, out=self.offsets[1:])
+
+    def matches(self, df: pd.DataFrame, qa_indices: List[int]) -> bool:
+        """
+        Checks whether the index was built for a DataFrame of this length and the given QI.
+        """
+        return self.n_records == len(df) and self.qa_indices == list(qa_indices)
+
+    def group_positions(self, group: int) -> np.ndarray:
+        """
+        Returns the positions of the records in one equivalence class.
+        """
+        return self.order[self.offsets[group]:self.offsets[group + 1]]
+
+    def broadcast(self, values: np.ndarray, fill_value=np.nan) -> np.ndarray:
+        """
+        Broadcasts one value per equivalence class to all records of the class.
+
+        Parameters
+        -----------
+        values : numpy.ndarray
+            An array with one value per equivalence class.
+        fill_value : scalar
+            The value for records that belong to no equivalence class.
+
+        Returns
+        -----------
+        numpy.ndarray
+            An array with one value per record.
+        """
+
+        values = np.asarray(values)
+        grouped = self.codes >= 0
+
+        if grouped.all():
+            return values[self.codes]
+
+        result = np.full(self.n_records, fill_value, dtype=np.result_type(values.dtype, np.asarray(fill_value).dtype))
+        result[grouped] = values[self.codes[grouped]]
+        return result
+
+
+def get_equivalence_class_index(df: pd.DataFrame, qa_indices: List[int],
+                                ec_index: EquivalenceClassIndex = None) -> EquivalenceClassIndex:
+    """
+    Returns the given equivalence class index or builds a new one, if none is given.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed index for df and qa_indices.
+
+    Returns
+    -----------
+    ec_index
+        An equivalence class index for df and qa_indices.
+    """
+
+    if ec_index is None:
+        return EquivalenceClassIndex(df, qa_indices)
+
+    if not ec_index.matches(df, qa_indices):
+        raise ValueError("Equivalence class index does not match the DataFrame and quasi-identifiers.")
+
+    return ec_index
@@ -0,0 +1,298 @@
+import heapq
+from collections import Counter
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import emd_to_reference, get_midpoints, is_numerical
+
+
+def _pop_min(histogram: Counter, heap: List[int]):
+    # smallest value with a positive count, stale heap entries are discarded lazily
+    while heap and histogram[heap[0]] == 0:
+        heapq.heappop(heap)
+
+    return heap[0] if heap else None
+
+
+class IncrementalAnonymityTracker:
+    """
+    Keeps the k-anonymity, distinct l-diversity and t-closeness of a table up to date while batches of records are
+    inserted and deleted.
+
+    The tracker stores the size and the sensitive attribute (SA) counts of every equivalence class together with the
+    SA distribution of the whole table. A batch only touches the groups it contains, and k and l are read from
+    histograms of the group sizes and diversities. The closeness of every group is cached with respect to the SA
+    distribution it was computed for: t is recomputed only for changed groups as long as that distribution is
+    unchanged, and from the stored counts (without regrouping records) otherwise.
+
+    Parameters
+    -----------
+    qa_indices : list of int
+        A list of the indices of the QI columns in the inserted DataFrames.
+    sa_index : int
+        The index of the sensitive attribute column in the inserted DataFrames.
+    numerical : bool, optional
+        Whether the ordered (numerical) earth mover distance is used for t-closeness. By default, it is derived from
+        the type of the SA column like in calculate_t_closeness.
+
+    Attributes
+    -----------
+    n_records : int
+        The number of records in the tracked table.
+    """
+
+    def __init__(self, qa_indices: List[int], sa_index: int, numerical: bool = None):
+        self.qa_indices = list(qa_indices)
+        self.sa_index = sa_index
+        self.numerical = numerical
+        self.n_records = 0
+
+        # equivalence classes, identified by their QI values, are stored in reusable slots
+        self._slots = {}
+        self._free_slots = []
+        self._n_slots = 0
+        self._sizes = np.zeros(0, dtype=np.int64)
+        self._diversities = np.zeros(0, dtype=np.int64)
+        self._closenesses = np.zeros(0)
+
+        # sensitive values are stored in columns of the (slots x values) count matrix
+        self._columns = {}
+        self._values = []
+        self._counts = np.zeros((0, 0), dtype=np.int64)
+        self._dataset_counts = np.zeros(0, dtype=np.int64)
+
+        self._size_histogram = Counter()
+        self._size_heap = []
+        self._diversity_histogram = Counter()
+        self._diversity_heap = []
+
+        # SA counts of the whole table the cached closenesses refer to, and slots changed since
+        self._reference = None
+        self._changed = set()
+
+    @property
+    def n_groups(self) -> int:
+        """
+        The number of equivalence classes in the tracked table.
+        """
+        return len(self._slots)
+
+    def insert(self, df: pd.DataFrame):
+        """
+        Adds the records of a DataFrame to the tracked table.
+        """
+        self._update(df, 1)
+
+    def delete(self, df: pd.DataFrame):
+        """
+        Removes the records of a DataFrame from the tracked table. Raises a ValueError, if a record is not part of the
+        table.
+        """
+        self._update(df, -1)
+
+    def calculate_k_anonymity(self) -> int:
+        """
+        Returns the minimum group size of the tracked table, or None if the table is empty.
+        """
+        return _pop_min(self._size_histogram, self._size_heap)
+
+    def calculate_l_diversity(self) -> int:
+        """
+        Returns the minimum number of distinct sensitive values in a group, or None if the table is empty.
+        """
+        return _pop_min(self._diversity_histogram, self._diversity_heap)
+
+    def calculate_t_closeness(self) -> float:
+        """
+        Returns the maximum earth mover distance between the SA distribution of a group and of the whole table.
+        """
+
+        if not self._reference_is_current():
+            self._reference = None
+            self._changed = set(self._slots.values())
+
+        self._update_closenesses()
+
+        return self._closenesses[self._active_slots()].max(initial=0)
+
+    def get_t_closeness_bounds(self) -> Tuple[float, float]:
+        """
+        Bounds t by the cached closenesses, which are only updated for changed groups. As the earth mover distance
+        is a metric, the closeness of each group moves at most by the distance between the current and the cached
+        SA distribution of the table.
+
+        Returns
+        -----------
+        lower, upper
+            A lower and an upper bound of t.
+        """
+
+        support = self._dataset_counts > 0
+        if self._reference is None or (self.numerical and not np.array_equal(support, self._reference > 0)):
+            t = self.calculate_t_closeness()
+            return t, t
+
+        self._update_closenesses()
+        t = self._closenesses[self._active_slots()].max(initial=0)
+
+        # distance between the current and the cached distribution of the table
+        shift = self._emd(self._dataset_counts[np.newaxis, :], self._reference)[0]
+
+        return max(t - shift, 0), t + shift
+
+    def _active_slots(self) -> np.ndarray:
+        return np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+
+    def _reference_is_current(self) -> bool:
+        # the cached closenesses are valid if the SA distribution of the table is unchanged
+        if self._reference is None:
+            return False
+
+        total = self._dataset_counts.sum()
+        reference_total = self._reference.sum()
+
+        return np.array_equal(self._dataset_counts * reference_total, self._reference * total)
+
+    def _emd(self, counts: np.ndarray, reference_counts: np.ndarray) -> np.ndarray:
+        order = None
+
+        if self.numerical:
+            # the ordered distance runs over the values present in the reference
+            support = np.flatnonzero(reference_counts > 0)
+            order = np.argsort(get_midpoints([self._values[i] for i in support]), kind='stable')
+        else:
+            support = np.arange(len(self._values))
+
+        reference = reference_counts[support] / reference_counts[support].sum()
+
+        return emd_to_reference(counts[:, support], reference, self.numerical, order)
+
+    def _update_closenesses(self):
+        if self._reference is None:
+            self._reference = self._dataset_counts.copy()
+
+        slots = np.array([slot for slot in self._changed if self._sizes[slot] > 0], dtype=np.int64)
+        self._changed = set()
+
+        if len(slots) > 0 and self._reference.sum() > 0:
+            self._closenesses[slots] = self._emd(self._counts[slots], self._reference)
+
+    def _batch_counts(self, df: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        # group sizes and SA counts of a batch, records with missing QI values belong to no group
+        data = df.iloc[:, self.qa_indices + [self.sa_index]]
+        data.columns = range(data.shape[1])
+
+        n_qi = len(self.qa_indices)
+        sizes = data.groupby(list(range(n_qi)), sort=False).size()
+        pairs = data.groupby(list(range(n_qi + 1)), sort=False).size()
+
+        return sizes, pairs
+
+    def _key(self, key) -> tuple:
+        return key if isinstance(key, tuple) else (key,)
+
+    def _reserve(self, n_slots: int, n_values: int):
+        # grow the per slot arrays and the count matrix by doubling
+        slot_capacity, value_capacity = self._counts.shape
+
+        if n_slots <= slot_capacity and n_values <= value_capacity:
+            return
+
+        slot_capacity = max(n_slots, 2 * slot_capacity) if n_slots > slot_capacity else slot_capacity
+        value_capacity = max(n_values, 2 * value_capacity) if n_values > value_capacity else value_capacity
+
+        counts = np.zeros((slot_capacity, value_capacity), dtype=np.int64)
+        counts[:self._counts.shape[0], :self._counts.shape[1]] = self._counts
+        self._counts = counts
+
+        for name in ['_sizes', '_diversities', '_closenesses', '_dataset_counts']:
+            array = getattr(self, name)
+            grown = np.zeros(value_capacity if name == '_dataset_counts' else slot_capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+        if self._reference is not None:
+            reference = np.zeros(value_capacity, dtype=np.int64)
+            reference[:len(self._reference)] = self._reference
+            self._reference = reference
+
+    def _slot(self, key: tuple) -> int:
+        slot = self._slots.get(key)
+
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = self._n_slots
+                self._n_slots += 1
+            self._slots[key] = slot
+
+        return slot
+
+    def _column(self, value) -> int:
+        column = self._columns.get(value)
+
+        if column is None:
+            column = len(self._values)
+            self._columns[value] = column
+            self._values.append(value)
+
+        return column
+
+    def _update(self, df: pd.DataFrame, sign: int):
+        if self.numerical is None:
+            self.numerical = is_numerical(df.iloc[:, self.sa_index])
+
+        sizes, pairs = self._batch_counts(df)
+        keys = [self._key(key) for key in sizes.index]
+        pair_keys = [self._key(key) for key in pairs.index]
+
+        if sign < 0:
+            self._check_deletion(keys, sizes.to_numpy(), pair_keys, pairs.to_numpy())
+
+        slots = np.array([self._slot(key) for key in keys], dtype=np.int64)
+        pair_slots = np.array([self._slots[key[:-1]] for key in pair_keys], dtype=np.int64)
+        pair_columns = np.array([self._column(key[-1]) for key in pair_keys], dtype=np.int64)
+        self._reserve(self._n_slots, len(self._values))
+
+        self._update_histograms(slots, -1)
+
+        self._sizes[slots] += sign * sizes.to_numpy()
+        np.add.at(self._counts, (pair_slots, pair_columns), sign * pairs.to_numpy())
+        np.add.at(self._dataset_counts, pair_columns, sign * pairs.to_numpy())
+        self._diversities[slots] = (self._counts[slots] > 0).sum(axis=1)
+        self.n_records += sign * int(sizes.sum())
+
+        self._update_histograms(slots, 1)
+        self._changed.update(slots.tolist())
+
+        # release the slots of emptied groups
+        for key, slot in zip(keys, slots):
+            if self._sizes[slot] == 0 and key in self._slots:
+                del self._slots[key]
+                self._free_slots.append(slot)
+
+    def _check_deletion(self, keys: List[tuple], sizes: np.ndarray, pair_keys: List[tuple], counts: np.ndarray):
+        slots = [self._slots.get(key) for key in keys]
+        columns = [self._columns.get(key[-1]) for key in pair_keys]
+
+        if None in slots or None in columns or np.any(self._sizes[np.array(slots, dtype=np.int64)] < sizes):
+            raise ValueError("Deleted records are not part of the tracked table.")
+
+        pair_slots = np.array([self._slots[key[:-1]] for key in pair_keys], dtype=np.int64)
+        if np.any(self._counts[pair_slots, np.array(columns, dtype=np.int64)] < counts):
+            raise ValueError("Deleted records are not part of the tracked table.")
+
+    def _update_histograms(self, slots: np.ndarray, sign: int):
+        for slot in slots.tolist():
+            size = int(self._sizes[slot])
+            if size == 0:
+                continue
+
+            diversity = int(self._diversities[slot])
+            for histogram, heap, value in [(self._size_histogram, self._size_heap, size),
+                                           (self._diversity_histogram, self._diversity_heap, diversity)]:
+                histogram[value] += sign
+                if sign > 0 and histogram[value] == 1:
+                    heapq.heappush(heap, value)
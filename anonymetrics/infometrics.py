@@ -1,6 +1,55 @@
+from typing import Tuple
 import numpy as np
 import pandas as pd
-from collections import Counter
+
+from anonymetrics.groupindex import factorize_column
+
+
+def _get_cell_bounds(value) -> Tuple[float, float]:
+    # lower and upper bound of a tuple, an interval or a plain number
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, pd.Interval):
+        return value.left, value.right
+    return np.min(value), np.max(value)
+
+
+def get_interval_bounds(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extracts the lower and upper bounds of a column of generalized numerical values, which may be tuples, intervals
+    (also as a Categorical from discretize with compact=True) or plain numbers.
+
+    Parameters
+    -----------
+    column : pd.Series
+        The column of generalized values.
+
+    Returns
+    -----------
+    lower, upper
+        Arrays containing the lower and upper bound per record, NaN for missing values.
+    """
+    values = column.array
+
+    if isinstance(values, pd.Categorical):
+        # bounds of the categories, the code -1 of missing values selects NaN
+        lower, upper = get_interval_bounds(pd.Series(values.categories))
+        return np.append(lower, np.nan)[values.codes], np.append(upper, np.nan)[values.codes]
+
+    if isinstance(values, pd.arrays.IntervalArray):
+        return np.asarray(values.left, dtype=float), np.asarray(values.right, dtype=float)
+
+    if column.dtype != object:
+        values = column.to_numpy(dtype=float)
+        return values, values
+
+    # bounds of the distinct values only
+    codes, uniques = pd.factorize(column.to_numpy())
+    bounds = np.full((len(uniques) + 1, 2), np.nan)
+    if len(uniques) > 0:
+        bounds[:-1] = [_get_cell_bounds(value) for value in uniques]
+
+    return bounds[codes, 0], bounds[codes, 1]
 
 
 def entropy_info_loss(df1: pd.DataFrame, df2: pd.DataFrame, column_index: int) -> float:
@@ -24,26 +73,22 @@ def entropy_info_loss(df1: pd.DataFrame, df2: pd.DataFrame, column_index: int) -
     if len(df1) != len(df2):
         return 0
 
-    # Compute the frequencies for each attribute value in the original dataset
-    original_values = df1.iloc[:, column_index].values
-    original_value_counts = Counter(original_values)
+    # Compute the frequencies for each attribute value in the original dataset, on the codes of the values
+    original_codes, original_uniques = factorize_column(df1.iloc[:, column_index])
+    original_value_counts = dict(zip(original_uniques, np.bincount(original_codes[original_codes >= 0],
+                                                                   minlength=len(original_uniques))))
 
-    # Compute the probabilities for each attribute value in the original dataset
-    original_prob = {key: val / len(df1) for key, val in original_value_counts.items()}
+    # Compute the frequencies for each anonymized attribute value
+    anonymized_codes, anonymized_uniques = factorize_column(df2.iloc[:, column_index])
+    anonymized_value_counts = np.bincount(anonymized_codes[anonymized_codes >= 0], minlength=len(anonymized_uniques))
 
-    # Compute the probabilities for each anonymized attribute value
-    anonymized_values = df2.iloc[:, column_index].values
-    anonymized_value_counts = Counter(anonymized_values)
-    anonymized_prob = {key: val / len(df2) for key, val in anonymized_value_counts.items()}
-
-    # Compute the entropy-based information loss for each anonymized row
+    # Compute the entropy-based information loss once per distinct anonymized value and weight it with its frequency,
+    # values that are no frozenset add 0
     info_loss = 0
-    for i in range(len(df1)):
-        anonymized_value = anonymized_values[i]
-        # If anonymized value in row i is a frozenset, calculate the conditional probabilities, otherwise: add 0
+    for anonymized_value, count in zip(anonymized_uniques, anonymized_value_counts):
         if isinstance(anonymized_value, frozenset):
-            conditional_probs = [original_prob.get(val, 0)/anonymized_prob.get(anonymized_value, 0) for val in anonymized_value]
-            info_loss += np.sum([-p * np.log2(p) for p in conditional_probs if p > 0])
+            conditional_probs = [original_value_counts.get(val, 0) / count for val in anonymized_value]
+            info_loss += count * np.sum([-p * np.log2(p) for p in conditional_probs if p > 0])
 
     return info_loss
 
@@ -60,12 +105,16 @@ def numerical_info_loss(df1: pd.DataFrame, df2: pd.DataFrame, index):
     where:
         upper_ij and lower_ij are the upper and lower bounds of the generalized attribute value interval,
         min_j and max_j are the minimum and maximum attribute value before generalization.
+    Cells whose bounds equal those of the original value lose nothing. The bounds of both datasets are extracted per
+    column with get_interval_bounds and the losses of all cells are computed with array operations.
+
     Parameters
     -----------
     df1 : pd.DataFrame
         The original, non-anonymized tabular data.
     df2 : pd.DataFrame
-        The anonymized tabular data. Each cell should contain a tuple representing the generalized interval.
+        The anonymized tabular data. Each cell should contain a tuple or an interval representing the generalized
+        interval.
     index : int or list of int
         The column index or indices based on which the information loss will be calculated.
 
@@ -79,43 +128,27 @@ def numerical_info_loss(df1: pd.DataFrame, df2: pd.DataFrame, index):
     if not n == df1.shape[0]:
         return 0
 
+    if n == 0:
+        return 0.0
+
     r = 1
 
     total_info_loss = 0.0
 
     for idx in np.atleast_1d(index):
 
-        # assumes, that if first record at idx is tuple, then all records at index idx are tuples
-
-        # print(df1.iloc[:, idx])
-
-        if isinstance(df1.iloc[0, idx], tuple):
-            min_j = df1.iloc[:, idx].apply(lambda x: x[0]).min()
-            max_j = df1.iloc[:, idx].apply(lambda x: x[1]).max()
-        else:
-            min_j = df1.iloc[:, idx].min()
-            max_j = df1.iloc[:, idx].max()
-
-        for i in range(n):
+        lower_j, upper_j = get_interval_bounds(df1.iloc[:, idx])
+        min_j = np.nanmin(lower_j)
+        max_j = np.nanmax(upper_j)
 
-            if isinstance(df2.iloc[i, idx], tuple):
-                lower_ij, upper_ij = df2.iloc[i, idx]
-            else:
-                lower_ij = df2.iloc[i, idx].min()
-                upper_ij = df2.iloc[i, idx].max()
+        lower_ij, upper_ij = get_interval_bounds(df2.iloc[:, idx])
 
-            if isinstance(df1.iloc[i, idx], tuple):
-                lower_ij_1, upper_ij_1 = df1.iloc[i, idx]
-            else:
-                lower_ij_1 = df1.iloc[i, idx].min()
-                upper_ij_1 = df1.iloc[i, idx].max()
+        # cells with the bounds of the original value lose nothing, missing values make the loss NaN
+        unchanged = (lower_j == lower_ij) & (upper_j == upper_ij)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            losses = (upper_ij - lower_ij) / (max_j - min_j)
 
-            if lower_ij_1 == lower_ij and upper_ij_1 == upper_ij:
-                loss = 0
-            else:
-                loss = (upper_ij - lower_ij) / (max_j - min_j)
-
-            total_info_loss += loss
+        total_info_loss += np.where(unchanged, 0.0, losses).sum()
 
     info_loss = total_info_loss / (n * r)
     return info_loss
@@ -152,32 +185,18 @@ def euclid_info_loss(df1: pd.DataFrame, df2: pd.DataFrame, index):
 
     n = df1.shape[0]  # number of records
 
-    total_info_loss = 0.0
-
-    for i in range(n):
-
-        for idx in np.atleast_1d(index):
+    if n == 0:
+        return 0.0
 
-            sum_of_squares = 0.0
+    sum_of_squares = np.zeros(n)
 
-            # handle tuples in by taking their mean
-            if isinstance(df2.iloc[i, idx], tuple):
-                df1_val = np.mean(df1.iloc[i, idx])
-            else:
-                df1_val = df1.iloc[i, idx]
-
-            if isinstance(df2.iloc[i, idx], tuple):
-                df2_val = np.mean(df2.iloc[i, idx])
-            else:
-                df2_val = df2.iloc[i, idx]
-
-            # print(df1_val, df2_val)
-
-            sum_of_squares += (df1_val - df2_val) ** 2
+    for idx in np.atleast_1d(index):
 
-        dist = np.sqrt(sum_of_squares)
+        # tuples and intervals are represented by their mean
+        lower_1, upper_1 = get_interval_bounds(df1.iloc[:, idx])
+        lower_2, upper_2 = get_interval_bounds(df2.iloc[:, idx])
 
-        total_info_loss += dist
+        sum_of_squares += ((lower_1 + upper_1) / 2 - (lower_2 + upper_2) / 2) ** 2
 
-    info_loss = total_info_loss / n
+    info_loss = np.sqrt(sum_of_squares).sum() / n
     return info_loss
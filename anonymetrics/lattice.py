@@ -0,0 +1,244 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.groupindex import factorize_column, combine_codes
+
+# table of the distinct value combinations of all scanned columns, shared with the worker processes
+_ROOT = None
+
+
+class _Table:
+    """
+    Distinct value combinations of a set of columns with the number of records per combination.
+
+    The codes of the columns are packed into int64 keys with mixed radix. Columns whose cardinalities do not fit into
+    one key are spread over several blocks of keys, so a column is dropped by integer arithmetic on its block.
+    """
+
+    def __init__(self, blocks: List[Tuple[np.ndarray, List[Tuple[int, int]]]], counts: np.ndarray,
+                 missing: np.ndarray):
+        # blocks of (keys, [(column, cardinality), ...]) with the most significant column first
+        self.blocks = blocks
+        self.counts = counts
+        # whether a row has a missing value, per column of the table it was derived from
+        self.missing = missing
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, column_indices: List[int], separate: int = None) -> '_Table':
+        # a missing value gets its own code, the column at position separate gets a block of its own
+        blocks = []
+        keys = None
+        radix = 1
+        missing = np.zeros((len(df), len(column_indices)), dtype=bool)
+
+        for column, column_index in enumerate(column_indices):
+            codes, uniques = factorize_column(df.iloc[:, column_index])
+            missing[:, column] = codes < 0
+            codes[codes < 0] = len(uniques)
+            cardinality = len(uniques) + 1
+
+            if keys is None or radix * cardinality >= 2 ** 62 or column == separate:
+                blocks.append((codes, [(column, cardinality)]))
+                radix = cardinality
+            else:
+                keys, columns = blocks[-1]
+                blocks[-1] = (keys * cardinality + codes, columns + [(column, cardinality)])
+                radix *= cardinality
+
+            keys = blocks[-1][0]
+
+        return cls(blocks, np.ones(len(df), dtype=np.int64), missing).roll_up(blocks)
+
+    def columns(self) -> List[int]:
+        return [column for _, columns in self.blocks for column, _ in columns]
+
+    def group(self, blocks) -> Tuple[np.ndarray, int]:
+        # numbers the distinct key combinations of the given blocks
+        if len(blocks) == 1:
+            codes, uniques = pd.factorize(blocks[0][0])
+            return codes, len(uniques)
+
+        block_codes = [pd.factorize(keys) for keys, _ in blocks]
+        return combine_codes([codes for codes, _ in block_codes], [len(uniques) for _, uniques in block_codes],
+                             sort=False)
+
+    def roll_up(self, blocks) -> '_Table':
+        # aggregates the rows of the table with equal keys in blocks
+        codes, n_groups = self.group(blocks)
+
+        counts = np.bincount(codes, weights=self.counts, minlength=n_groups).astype(np.int64)
+        representatives = np.zeros(n_groups, dtype=np.int64)
+        representatives[codes] = np.arange(len(codes))
+
+        blocks = [(keys[representatives], columns) for keys, columns in blocks]
+
+        return _Table(blocks, counts, self.missing[representatives])
+
+    def drop(self, column: int) -> '_Table':
+        """
+        Derives the table without the given column by aggregating the counts.
+        """
+
+        blocks = []
+
+        for keys, columns in self.blocks:
+            positions = [c for c, _ in columns]
+
+            if column in positions:
+                position = positions.index(column)
+                cardinality = columns[position][1]
+                radix = int(np.prod([c for _, c in columns[position + 1:]], dtype=np.int64))
+
+                # remove the digit of the column from the mixed radix keys
+                keys = (keys // (radix * cardinality)) * radix + keys % radix
+                columns = columns[:position] + columns[position + 1:]
+
+            if len(columns) > 0:
+                blocks.append((keys, columns))
+
+        table = _Table(blocks, self.counts, self.missing).roll_up(blocks)
+
+        return table
+
+    def evaluate(self, sa_column: int = None) -> Tuple[int, int]:
+        """
+        Calculates k and, if the table contains the sensitive attribute column, the distinct l.
+        """
+
+        qi_columns = [column for column in self.columns() if column != sa_column]
+        grouped = ~self.missing[:, qi_columns].any(axis=1)
+
+        if sa_column is None:
+            # every row is an equivalence class
+            k = int(self.counts[grouped].min()) if grouped.any() else 0
+            return k, None
+
+        # every row is a distinct combination of the QI values and the sensitive value
+        qi_blocks = [block for block in self.blocks if block[1][0][0] != sa_column]
+        codes, n_groups = self.group(qi_blocks)
+
+        sizes = np.bincount(codes[grouped], weights=self.counts[grouped], minlength=n_groups)
+        diversities = np.bincount(codes[grouped & ~self.missing[:, sa_column]], minlength=n_groups)
+
+        is_group = np.zeros(n_groups, dtype=bool)
+        is_group[codes[grouped]] = True
+
+        if not is_group.any():
+            return 0, 0
+
+        return int(sizes[is_group].min()), int(diversities[is_group].min())
+
+
+def _scan(table: _Table, subset: Tuple[int, ...], last_removed: int, max_size: int, sa_column: int, results: list):
+    # depth first search of the subtree of subset, which removes columns in decreasing order
+    if len(subset) <= max_size:
+        results.append((subset, *table.evaluate(sa_column)))
+
+    if len(subset) == 1:
+        return
+
+    for position, column in enumerate(subset):
+        # the subtree of the child only removes the columns below column, which are all still in the subset, so its
+        # smallest subset has len(subset) - 1 - column columns
+        if column < last_removed and len(subset) - 1 - column <= max_size:
+            _scan(table.drop(column), subset[:position] + subset[position + 1:], column, max_size, sa_column,
+                  results)
+
+
+def _init_worker(root: _Table):
+    global _ROOT
+    _ROOT = root
+
+
+def _scan_branch(task) -> list:
+    # roll up the root table to the subset of the task and scan its subtree
+    subset, removed, max_size, sa_column = task
+
+    table = _ROOT
+    for column in sorted(removed, reverse=True):
+        table = table.drop(column)
+
+    results = []
+    _scan(table, subset, min(removed), max_size, sa_column, results)
+
+    return results
+
+
+def scan_qi_subsets(df: pd.DataFrame, candidate_indices: List[int], sa_index: int = None, max_size: int = None,
+                    n_jobs: int = 1, split_depth: int = 2) -> pd.DataFrame:
+    """
+    Calculates the k-anonymity (and the distinct l-diversity) for every subset of candidate quasi-identifiers (QI).
+
+    The dataset is grouped once by all candidate columns. Coarser subsets are derived by aggregating the group counts
+    of a finer subset instead of regrouping the records. The subsets form a tree, in which each subset is derived from
+    the subset with one more column, and the subtrees below a depth of split_depth are scanned in parallel.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    candidate_indices : list of int
+        A list of the indices of the candidate QI columns in the DataFrame.
+    sa_index : int, optional
+        The index of a sensitive attribute column to calculate the distinct l-diversity for.
+    max_size : int, optional
+        The maximum number of columns of the reported subsets. By default, all subsets are reported. Subtrees
+        without subsets of at most max_size columns are not rolled up.
+    n_jobs : int
+        The number of worker processes.
+    split_depth : int
+        The depth of the subset tree, whose subtrees are distributed to the worker processes. Below 1, the subsets
+        are scanned in this process.
+
+    Returns
+    -----------
+    pandas.DataFrame
+        A DataFrame with the QI column indices 'qa_indices', 'k' and, if sa_index is given, 'l' for every subset.
+    """
+
+    candidate_indices = list(candidate_indices)
+    m = len(candidate_indices)
+    max_size = m if max_size is None else max_size
+    sa_column = m if sa_index is not None else None
+
+    column_indices = candidate_indices + ([sa_index] if sa_index is not None else [])
+    root = _Table.from_df(df, column_indices, separate=sa_column)
+    full_set = tuple(range(m))
+
+    results = []
+
+    if n_jobs <= 1 or split_depth < 1 or m <= split_depth:
+        _scan(root, full_set, m, max_size, sa_column, results)
+
+    else:
+        # subsets above the split depth are derived in this process, their subtrees in the workers
+        tasks = []
+        for depth in range(split_depth + 1):
+            for removed in combinations(full_set, depth):
+                subset = tuple(j for j in full_set if j not in removed)
+
+                if depth == split_depth:
+                    if len(subset) - min(removed) <= max_size:
+                        tasks.append((subset, removed, max_size, sa_column))
+                elif len(subset) <= max_size:
+                    table = root
+                    for column in removed:
+                        table = table.drop(column)
+                    results.append((subset, *table.evaluate(sa_column)))
+
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(root,)) as executor:
+            for branch in executor.map(_scan_branch, tasks):
+                results.extend(branch)
+
+    results.sort(key=lambda result: (len(result[0]), result[0]))
+
+    scan = pd.DataFrame({'qa_indices': [tuple(candidate_indices[j] for j in subset) for subset, _, _ in results],
+                         'k': [k for _, k, _ in results]})
+
+    if sa_index is not None:
+        scan['l'] = [l for _, _, l in results]
+
+    return scan
@@ -0,0 +1,179 @@
+from typing import List
+import numpy as np
+import pandas as pd
+
+from anonymetrics.groupindex import EquivalenceClassIndex, get_equivalence_class_index
+
+
+def prosecutor_risk(df: pd.DataFrame, qa_indices: List[int], ec_index: EquivalenceClassIndex = None) -> np.ndarray:
+    """
+    Calculates the prosecutor re-identification risk of every record, i.e. 1 / f_j with the size f_j of the
+    equivalence class of the record in the dataset.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the risk per record, NaN for records with a missing QI value.
+    """
+
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+
+    return ec_index.broadcast(1 / ec_index.sizes)
+
+
+def get_population_sizes(df: pd.DataFrame, qa_indices: List[int], population: pd.DataFrame,
+                         population_qa_indices: List[int] = None, count_index: int = None,
+                         ec_index: EquivalenceClassIndex = None) -> np.ndarray:
+    """
+    Looks up the population size F_j of every equivalence class of a dataset in a population table.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    population : pandas DataFrame
+        The population table, either with one row per individual or with the number of individuals per row.
+    population_qa_indices : list of int, optional
+        The indices of the QI columns in the population table, in the order of qa_indices. By default, the first
+        columns of the population table.
+    count_index : int, optional
+        The index of the column holding the number of individuals per row of the population table.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the population size per group.
+    """
+
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+
+    if population_qa_indices is None:
+        population_qa_indices = list(range(len(qa_indices)))
+
+    # one row with the QI values of every group
+    keys = df.iloc[ec_index.order[ec_index.offsets[:-1]], list(qa_indices)]
+    keys.columns = range(len(qa_indices))
+
+    population_keys = population.iloc[:, list(population_qa_indices)]
+    population_keys.columns = range(len(qa_indices))
+
+    if count_index is None:
+        counts = population_keys.groupby(list(population_keys.columns)).size()
+    else:
+        counts = population.iloc[:, count_index].groupby([population_keys[c] for c in population_keys.columns]).sum()
+
+    counts = counts.rename('population_size').reset_index()
+    sizes = keys.merge(counts, how='left', on=list(keys.columns))['population_size'].to_numpy(dtype=float)
+
+    if np.isnan(sizes).any() or np.any(sizes < ec_index.sizes):
+        raise ValueError("Population table does not cover all equivalence classes of the dataset.")
+
+    return sizes
+
+
+def journalist_risk(df: pd.DataFrame, qa_indices: List[int], population: pd.DataFrame = None,
+                    population_qa_indices: List[int] = None, count_index: int = None,
+                    ec_index: EquivalenceClassIndex = None) -> np.ndarray:
+    """
+    Calculates the journalist re-identification risk of every record, i.e. 1 / F_j with the size F_j of the
+    equivalence class of the record in the population. Without a population table, the dataset is taken as the
+    population and the risk equals the prosecutor risk.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    population : pandas DataFrame, optional
+        The population table, either with one row per individual or with the number of individuals per row.
+    population_qa_indices : list of int, optional
+        The indices of the QI columns in the population table, in the order of qa_indices.
+    count_index : int, optional
+        The index of the column holding the number of individuals per row of the population table.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the risk per record, NaN for records with a missing QI value.
+    """
+
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+
+    if population is None:
+        return prosecutor_risk(df, qa_indices, ec_index)
+
+    sizes = get_population_sizes(df, qa_indices, population, population_qa_indices, count_index, ec_index)
+
+    return ec_index.broadcast(1 / sizes)
+
+
+def marketer_risk(df: pd.DataFrame, qa_indices: List[int], population: pd.DataFrame = None,
+                  population_qa_indices: List[int] = None, count_index: int = None,
+                  ec_index: EquivalenceClassIndex = None) -> float:
+    """
+    Calculates the marketer re-identification risk, i.e. the expected share of correctly re-identified records
+    (1/n) * Σ_j f_j / F_j. Without a population table, it equals the number of groups divided by n.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input DataFrame containing the dataset.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the DataFrame.
+    population : pandas DataFrame, optional
+        The population table, either with one row per individual or with the number of individuals per row.
+    population_qa_indices : list of int, optional
+        The indices of the QI columns in the population table, in the order of qa_indices.
+    count_index : int, optional
+        The index of the column holding the number of individuals per row of the population table.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    float
+        The marketer risk of the dataset.
+    """
+
+    risks = journalist_risk(df, qa_indices, population, population_qa_indices, count_index, ec_index)
+
+    return np.nanmean(risks)
+
+
+def get_share_at_risk(risks: np.ndarray, threshold: float) -> float:
+    """
+    Calculates the share of records whose re-identification risk exceeds a threshold.
+
+    Parameters
+    -----------
+    risks : numpy.ndarray
+        An array containing the risk per record, e.g. from prosecutor_risk.
+    threshold : float
+        The highest acceptable risk.
+
+    Returns
+    -----------
+    float
+        The share of records with a risk above the threshold, among the records with a known risk.
+    """
+
+    risks = np.asarray(risks, dtype=float)
+    known = ~np.isnan(risks)
+
+    return np.count_nonzero(risks[known] > threshold) / max(np.count_nonzero(known), 1)
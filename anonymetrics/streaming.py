@@ -0,0 +1,239 @@
+from typing import Iterable, Iterator, List, Union
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import count_per_group_size
+
+
+def read_chunks(source: Union[str, Iterable[pd.DataFrame]], column_indices: List[int] = None, chunksize: int = 100000,
+                **read_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Reads selected columns of a dataset chunk by chunk.
+
+    Parameters
+    -----------
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet (.parquet, .pq) file, or an iterable of DataFrames holding consecutive records.
+    column_indices : list of int, optional
+        The indices of the columns to read. By default, all columns.
+    chunksize : int
+        The number of records per chunk.
+    **read_kwargs
+        Further arguments for pandas.read_csv, e.g. sep or dtype.
+
+    Yields
+    -----------
+    pandas.DataFrame
+        A chunk holding the selected columns in the order of column_indices.
+    """
+
+    if column_indices is None:
+        if not isinstance(source, str):
+            yield from source
+        elif source.endswith(('.parquet', '.pq')):
+            yield from read_chunks(source, list(range(_get_parquet_width(source))), chunksize)
+        else:
+            yield from pd.read_csv(source, chunksize=chunksize, **read_kwargs)
+        return
+
+    column_indices = list(column_indices)
+
+    if not isinstance(source, str):
+        for chunk in source:
+            yield chunk.iloc[:, column_indices]
+
+    elif source.endswith(('.parquet', '.pq')):
+        parquet_file = _import_parquet().ParquetFile(source)
+        names = [parquet_file.schema_arrow.names[i] for i in column_indices]
+
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=names):
+            yield batch.to_pandas()[names]
+
+    else:
+        # read_csv returns the selected columns in file order
+        file_order = sorted(set(column_indices))
+        positions = [file_order.index(i) for i in column_indices]
+
+        for chunk in pd.read_csv(source, usecols=file_order, chunksize=chunksize, **read_kwargs):
+            yield chunk.iloc[:, positions]
+
+
+def _import_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet files requires pyarrow.") from e
+    return pq
+
+
+def _get_parquet_width(source: str) -> int:
+    return len(_import_parquet().ParquetFile(source).schema_arrow.names)
+
+
+class GroupCounter:
+    """
+    Counts the records per combination of quasi-identifiers (QI) over chunks of a dataset.
+
+    The counts of each chunk are buffered and merged into one table, whose index holds the distinct QI combinations
+    dictionary-encoded. Memory therefore grows with the number of distinct combinations, not with the number of
+    records. Records with a missing QI value are not counted, like in pandas.DataFrame.groupby.
+
+    Attributes
+    -----------
+    n_records : int
+        The number of counted records.
+    """
+
+    def __init__(self):
+        self.n_records = 0
+        self._counts = None
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Adds the records of a chunk, which holds exactly the QI columns.
+        """
+        counts = chunk.groupby(list(chunk.columns), sort=False).size()
+        self.n_records += int(counts.sum())
+
+        self._buffer.append(counts)
+        self._buffered += len(counts)
+
+        # merge once the buffer is as large as the table, so every combination is merged amortized O(1) times
+        if self._counts is None or self._buffered >= len(self._counts):
+            self._merge()
+
+    def _merge(self):
+        tables = self._buffer if self._counts is None else [self._counts] + self._buffer
+        self._buffer = []
+        self._buffered = 0
+
+        if len(tables) == 0:
+            return
+
+        table = pd.concat(tables)
+        self._counts = table.groupby(level=list(range(table.index.nlevels))).sum()
+
+    @property
+    def counts(self) -> pd.Series:
+        """
+        The number of records per QI combination, sorted like pandas.DataFrame.groupby.
+        """
+        self._merge()
+
+        if self._counts is None:
+            return pd.Series([], dtype=np.int64)
+
+        return self._counts
+
+
+def get_group_counts_streaming(source: Union[str, Iterable[pd.DataFrame]], qa_indices: List[int],
+                               chunksize: int = 100000, **read_kwargs) -> pd.Series:
+    """
+    Counts the records per equivalence class of a dataset, which is read chunk by chunk.
+
+    Parameters
+    -----------
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet file, or an iterable of DataFrames holding consecutive records.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the dataset.
+    chunksize : int
+        The number of records per chunk.
+    **read_kwargs
+        Further arguments for pandas.read_csv.
+
+    Returns
+    -----------
+    pandas.Series
+        The number of records per QI combination.
+    """
+
+    counter = GroupCounter()
+
+    for chunk in read_chunks(source, qa_indices, chunksize, **read_kwargs):
+        counter.update(chunk)
+
+    return counter.counts
+
+
+def calculate_k_anonymity_streaming(source: Union[str, Iterable[pd.DataFrame]], qa_indices: List[int],
+                                    chunksize: int = 100000, **read_kwargs) -> int:
+    """
+    Calculates the k-anonymity of a dataset, which is read chunk by chunk. See calculate_k_anonymity.
+
+    Parameters
+    -----------
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet file, or an iterable of DataFrames holding consecutive records.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the dataset.
+    chunksize : int
+        The number of records per chunk.
+    **read_kwargs
+        Further arguments for pandas.read_csv.
+
+    Returns
+    -----------
+    k
+        The minimum group size across all equivalence classes based on given QI.
+    """
+
+    k = get_group_sizes_streaming(source, qa_indices, chunksize, **read_kwargs).min()
+
+    return k
+
+
+def get_group_sizes_streaming(source: Union[str, Iterable[pd.DataFrame]], qa_indices: List[int],
+                              chunksize: int = 100000, **read_kwargs) -> np.ndarray:
+    """
+    Extracts the group sizes of a dataset, which is read chunk by chunk. See get_group_sizes.
+
+    Parameters
+    -----------
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet file, or an iterable of DataFrames holding consecutive records.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the dataset.
+    chunksize : int
+        The number of records per chunk.
+    **read_kwargs
+        Further arguments for pandas.read_csv.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the group sizes.
+    """
+
+    counts = get_group_counts_streaming(source, qa_indices, chunksize, **read_kwargs)
+
+    return counts.to_numpy()
+
+
+def get_count_per_group_size_streaming(source: Union[str, Iterable[pd.DataFrame]], qa_indices: List[int],
+                                       chunksize: int = 100000, **read_kwargs) -> np.ndarray:
+    """
+    Calculates the count per group size of a dataset, which is read chunk by chunk. See get_count_per_group_size.
+
+    Parameters
+    -----------
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet file, or an iterable of DataFrames holding consecutive records.
+    qa_indices : list of int
+        A list of the indices of the QI columns in the dataset.
+    chunksize : int
+        The number of records per chunk.
+    **read_kwargs
+        Further arguments for pandas.read_csv.
+
+    Returns
+    -----------
+    numpy.ndarray
+        An array containing the count per group size.
+    """
+
+    group_sizes = get_group_sizes_streaming(source, qa_indices, chunksize, **read_kwargs)
+
+    return count_per_group_size(group_sizes)
@@ -0,0 +1,372 @@
+import heapq
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import emd_to_reference, get_midpoints, is_numerical
+from anonymetrics.groupindex import combine_codes, factorize_column
+from anonymize.hierarchy import GeneralizationHierarchy
+
+# search lattice shared with the worker processes
+_LATTICE = None
+
+
+def _aggregate(codes: np.ndarray, cardinalities: List[int], counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # merges the equal rows of a code matrix, a missing value (-1) is kept as a value of its own
+    keys = [np.where(column < 0, cardinality, column) for column, cardinality in zip(codes.T, cardinalities)]
+    groups, n_groups = combine_codes(keys, [cardinality + 1 for cardinality in cardinalities], sort=False)
+
+    representatives = np.zeros(n_groups, dtype=np.int64)
+    representatives[groups] = np.arange(len(groups))
+
+    return codes[representatives], np.bincount(groups, weights=counts, minlength=n_groups)
+
+
+def get_level_losses(hierarchy: GeneralizationHierarchy, leaf_codes: np.ndarray) -> np.ndarray:
+    """
+    Calculates the information loss of every level of a hierarchy for a column, from the frequencies of its leaves.
+
+    A generalized categorical value covering s of the d leaves loses (s - 1) / (d - 1), an interval [lower, upper]
+    loses (upper - lower) / (max - min) as in numerical_info_loss. The loss of a level is the mean over all records.
+
+    Parameters
+    ----------
+    hierarchy : GeneralizationHierarchy
+        The hierarchy of the column.
+    leaf_codes : numpy.ndarray
+        The leaf codes of the column, see GeneralizationHierarchy.encode.
+
+    Returns
+    ----------
+    numpy.ndarray
+        An array containing the loss per level.
+    """
+
+    n_leaves = len(hierarchy.leaves)
+    frequencies = np.bincount(leaf_codes[leaf_codes >= 0], minlength=n_leaves)
+
+    losses = np.zeros(hierarchy.height)
+
+    if len(leaf_codes) == 0 or n_leaves < 2:
+        return losses
+
+    for level in range(1, hierarchy.height):
+        lookup = hierarchy.get_lookup(level)[:-1]
+        values = hierarchy.get_values(level)
+
+        if isinstance(values, pd.IntervalIndex):
+            leaves = hierarchy.leaves.to_numpy(dtype=float)
+            value_losses = (values.right - values.left).to_numpy(dtype=float) / (leaves.max() - leaves.min())
+        else:
+            value_losses = (np.bincount(lookup, minlength=len(values)) - 1) / (n_leaves - 1)
+
+        losses[level] = (frequencies * value_losses[lookup]).sum() / len(leaf_codes)
+
+    return losses
+
+
+class _Lattice:
+    """
+    The generalization lattice of a dataset, whose nodes are evaluated on aggregated tables of distinct code
+    combinations instead of the records.
+    """
+
+    def __init__(self, df: pd.DataFrame, hierarchies: List[GeneralizationHierarchy], qa_indices: List[int],
+                 sa_index: int = None, cache_size: int = 32):
+        self.hierarchies = hierarchies
+        self.heights = np.array([hierarchy.height for hierarchy in hierarchies])
+        self.cache_size = cache_size
+
+        leaf_codes = [hierarchy.encode(df.iloc[:, j]) for hierarchy, j in zip(hierarchies, qa_indices)]
+        self.losses = [get_level_losses(hierarchy, codes).tolist() for hierarchy, codes in zip(hierarchies, leaf_codes)]
+
+        # code maps between all pairs of levels of a column, the trailing -1 keeps missing values
+        self.maps = []
+        for hierarchy in hierarchies:
+            representatives = []
+            for level in range(hierarchy.height):
+                lookup = hierarchy.get_lookup(level)[:-1]
+                representative = np.zeros(len(hierarchy.get_values(level)), dtype=np.int64)
+                representative[lookup] = np.arange(len(lookup))
+                representatives.append(representative)
+            self.maps.append([[np.append(hierarchy.get_lookup(b)[representatives[a]], -1)
+                               for b in range(hierarchy.height)] for a in range(hierarchy.height)])
+
+        columns = leaf_codes
+        cardinalities = [len(hierarchy.leaves) for hierarchy in hierarchies]
+
+        self.n_values = 0
+        self.reference = None
+        self.numerical = False
+        self.order = None
+
+        if sa_index is not None:
+            sa_column = df.iloc[:, sa_index]
+            sa_codes, uniques = factorize_column(sa_column)
+            self.n_values = len(uniques)
+
+            # distribution of the sensitive attribute in the whole dataset
+            reference = np.bincount(sa_codes[sa_codes >= 0], minlength=self.n_values)
+            self.reference = reference / max(reference.sum(), 1)
+            self.numerical = is_numerical(sa_column)
+            self.order = np.argsort(get_midpoints(uniques), kind='stable') if self.numerical else None
+
+            columns = columns + [sa_codes]
+            cardinalities = cardinalities + [self.n_values]
+
+        codes = np.stack(columns, axis=1) if len(df) > 0 else np.zeros((0, len(columns)), dtype=np.int64)
+        bottom = tuple(0 for _ in hierarchies)
+
+        self.cache = OrderedDict()
+        self.cache[bottom] = _aggregate(codes, cardinalities, np.ones(len(df)))
+
+    def cardinalities(self, node: Tuple[int, ...]) -> List[int]:
+        return [len(hierarchy.get_values(level)) for hierarchy, level in zip(self.hierarchies, node)]
+
+    def loss(self, node: Tuple[int, ...]) -> float:
+        # the mean loss of the columns, evaluated for many nodes, so on plain floats
+        return sum([losses[level] for losses, level in zip(self.losses, node)]) / len(node)
+
+    def table(self, node: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rolls up the table of the closest cached predecessor of a node.
+        """
+
+        if node in self.cache:
+            self.cache.move_to_end(node)
+            return self.cache[node]
+
+        predecessors = [cached for cached in self.cache if all(a <= b for a, b in zip(cached, node))]
+        predecessor = max(predecessors, key=sum)
+        codes, counts = self.cache[predecessor]
+
+        codes = codes.copy()
+        for j, (a, b) in enumerate(zip(predecessor, node)):
+            if a != b:
+                codes[:, j] = self.maps[j][a][b][codes[:, j]]
+
+        cardinalities = self.cardinalities(node) + ([self.n_values] if self.reference is not None else [])
+        table = _aggregate(codes, cardinalities, counts)
+
+        self.cache[node] = table
+        if len(self.cache) > self.cache_size:
+            # keep the bottom node, from which every node can be rolled up
+            oldest = next(iter(key for key in self.cache if sum(key) > 0))
+            del self.cache[oldest]
+
+        return table
+
+    def evaluate(self, node: Tuple[int, ...]) -> Tuple[int, int, float]:
+        """
+        Calculates k, the distinct l and t of a node, l and t only if a sensitive attribute is given.
+        """
+
+        codes, counts = self.table(node)
+        m = len(self.hierarchies)
+
+        if self.reference is None:
+            # every row of the table is an equivalence class or contains a missing value
+            grouped = np.all(codes >= 0, axis=1)
+            return (int(counts[grouped].min()) if grouped.any() else 0), None, None
+
+        groups, _ = combine_codes(list(codes[:, :m].T), self.cardinalities(node), sort=False)
+        grouped = groups >= 0
+        groups, uniques = pd.factorize(groups[grouped])
+        n_groups = len(uniques)
+
+        if n_groups == 0:
+            return 0, 0, 0
+
+        k = int(np.bincount(groups, weights=counts[grouped], minlength=n_groups).min())
+
+        # every row of the table is a distinct combination of the QI values and the sensitive value
+        sa_codes = codes[grouped, m]
+        known = sa_codes >= 0
+        l = int(np.bincount(groups[known], minlength=n_groups).min())
+
+        value_counts = np.bincount(groups[known] * self.n_values + sa_codes[known], weights=counts[grouped][known],
+                                   minlength=n_groups * self.n_values).reshape(n_groups, self.n_values)
+        t = float(emd_to_reference(value_counts, self.reference, self.numerical, self.order).max(initial=0))
+
+        return k, l, t
+
+
+class _FailingTags:
+    """
+    Nodes known to fail the criteria. Every tag is a bit in one mask per column and level, which is set for all levels
+    up to the level of the tag, so a node lies below a tag if the masks of its levels share a bit.
+    """
+
+    def __init__(self, heights: List[int]):
+        self.masks = [[0] * int(height) for height in heights]
+        self.n_tags = 0
+
+    def add(self, node: Tuple[int, ...]):
+        bit = 1 << self.n_tags
+        self.n_tags += 1
+
+        for masks, level in zip(self.masks, node):
+            for lower in range(level + 1):
+                masks[lower] |= bit
+
+    def covers(self, node: Tuple[int, ...]) -> bool:
+        mask = -1
+        for masks, level in zip(self.masks, node):
+            mask &= masks[level]
+            if not mask:
+                return False
+        return True
+
+
+def _init_worker(lattice: _Lattice):
+    global _LATTICE
+    _LATTICE = lattice
+
+
+def _evaluate_node(node: Tuple[int, ...]) -> Tuple[int, int, float]:
+    return _LATTICE.evaluate(node)
+
+
+def search_full_domain(df: pd.DataFrame, hierarchies: Dict[int, GeneralizationHierarchy], k: int,
+                       sa_index: int = None, l: int = None, t: float = None, n_jobs: int = 1,
+                       cache_size: int = 32) -> dict:
+    """
+    Finds the full-domain generalization with the minimal information loss that satisfies k-anonymity and optionally
+    the distinct l-diversity and t-closeness of a sensitive attribute.
+
+    The nodes of the lattice of generalization levels are visited in order of increasing loss, so the first node that
+    satisfies the criteria is optimal. The criteria are monotonic: every generalization of a satisfying node
+    satisfies them and no specialization of a failing node does. Nodes below a known failing node are therefore
+    skipped, and the highest failing node on a greedy path upwards from each evaluated failing node is found by binary
+    search to tag as many nodes as possible. Nodes are evaluated on the distinct code combinations of a cached lower
+    node, which are rolled up to the node, instead of the records.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    hierarchies : dict
+        The generalization hierarchy per QI column index.
+    k : int
+        The desired k to obtain k-anonymity.
+    sa_index : int, optional
+        The index of the sensitive attribute column, required for l and t.
+    l : int, optional
+        The desired distinct l-diversity.
+    t : float, optional
+        The desired t-closeness.
+    n_jobs : int
+        The number of worker processes evaluating the next nodes in parallel.
+    cache_size : int
+        The number of aggregated node tables kept for roll-ups.
+
+    Returns
+    ----------
+    dict
+        The optimal 'levels' per column index, its 'loss', 'k', 'l' and 't', and the number of evaluated nodes
+        'n_evaluated', or None if even the most general node fails.
+    """
+
+    if (l is not None or t is not None) and sa_index is None:
+        raise ValueError("l-diversity and t-closeness require a sensitive attribute.")
+
+    qa_indices = list(hierarchies)
+    lattice = _Lattice(df, [hierarchies[j] for j in qa_indices], qa_indices,
+                       sa_index if l is not None or t is not None else None, cache_size)
+    top = tuple(int(height) - 1 for height in lattice.heights)
+
+    results = {}
+    failing = _FailingTags(lattice.heights)
+
+    # increase of the loss per column and level, to derive the loss of a successor from its predecessor
+    steps = [[(losses[level + 1] - losses[level]) / len(top) for level in range(len(losses) - 1)]
+             for losses in lattice.losses]
+
+    def evaluate(nodes):
+        nodes = [node for node in nodes if node not in results]
+        if executor is not None and len(nodes) > 1:
+            evaluations = executor.map(_evaluate_node, nodes)
+        else:
+            evaluations = map(lattice.evaluate, nodes)
+        for node, evaluation in zip(nodes, evaluations):
+            results[node] = evaluation
+
+    def satisfies(node):
+        node_k, node_l, node_t = results[node]
+        return node_k >= k and (l is None or node_l >= l) and (t is None or node_t <= t)
+
+    def probe(node):
+        # binary search for the first satisfying node on a greedy path to the top, which minimizes the loss per step
+        path = [node]
+        while path[-1] != top:
+            successors = [path[-1][:j] + (path[-1][j] + 1,) + path[-1][j + 1:] for j in range(len(top))
+                          if path[-1][j] < top[j]]
+            path.append(min(successors, key=lambda successor: (lattice.loss(successor), successor)))
+
+        low, high = 0, len(path) - 1
+        while high - low > 1:
+            middle = (low + high) // 2
+            evaluate([path[middle]])
+            if satisfies(path[middle]):
+                high = middle
+            else:
+                low = middle
+
+        return path[low], path[high]
+
+    executor = None
+    if n_jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(lattice,))
+
+    try:
+        evaluate([top])
+        if not satisfies(top):
+            return None
+
+        best = top
+        best_loss = lattice.loss(top)
+
+        bottom = tuple(0 for _ in top)
+        heap = [(lattice.loss(bottom), bottom, 0)]
+
+        while heap and heap[0][0] < best_loss:
+            # the next untagged nodes in order of loss, one per worker
+            batch = []
+            while heap and heap[0][0] < best_loss and len(batch) < max(n_jobs, 1):
+                loss, node, first = heapq.heappop(heap)
+
+                # each node is generated once, by increasing the levels from the last increased column onwards
+                for j in range(first, len(top)):
+                    if node[j] < top[j]:
+                        successor = node[:j] + (node[j] + 1,) + node[j + 1:]
+                        heapq.heappush(heap, (loss + steps[j][node[j]], successor, j))
+
+                if failing.covers(node):
+                    continue
+
+                batch.append((loss, node))
+
+            evaluate([node for _, node in batch])
+
+            for loss, node in batch:
+                if satisfies(node):
+                    if loss < best_loss:
+                        best, best_loss = node, loss
+                    continue
+
+                last_failing, first_satisfying = probe(node)
+                failing.add(last_failing)
+
+                if satisfies(first_satisfying) and lattice.loss(first_satisfying) < best_loss:
+                    best, best_loss = first_satisfying, lattice.loss(first_satisfying)
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best_k, best_l, best_t = results[best]
+
+    return {'levels': dict(zip(qa_indices, best)), 'loss': best_loss, 'k': best_k, 'l': best_l, 't': best_t,
+            'n_evaluated': len(results)}
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple
 import numpy as np
 import pandas as pd
 
@@ -7,11 +7,14 @@ import sys
 sys.path.append(".")
 
 
-def discretize(df: pd.DataFrame, column_index: int, L: float):
+def discretize(df: pd.DataFrame, column_index: int, L: float, compact: bool = False):
     """
     Discretizes a column of real numbers in a dataframe into intervals of fixed length L.
     Each interval is represented as a tuple of (lower_ij, upper_ij).
 
+    With compact=True, the column is stored as a pandas Categorical instead, whose integer codes refer to the closed
+    intervals [lower_ij, upper_ij] of the occurring bins. Use interval_tuples to get the tuple view of such a column.
+
     Parameters
     ----------
     df : pd.DataFrame
@@ -19,23 +22,143 @@ def discretize(df: pd.DataFrame, column_index: int, L: float):
     column_index : int
         The index of the numerical attribute column.
     L : float
-        The length of the intervals.
+        The length of the intervals, at least 1, since an interval ends L - 1 above its lower bound.
+    compact : bool
+        Whether to store the intervals as a Categorical instead of tuples.
 
     """
 
-    # Check if L is positive
-    if L <= 0:
-        raise ValueError("Interval length must be positive.")
+    # Check if L is at least 1, shorter intervals would end below their lower bound
+    if not L >= 1:
+        raise ValueError("Interval length must be at least 1.")
 
     # Discretize the sensitive attribute
-    df.iloc[:, column_index] = df.iloc[:, column_index].apply(lambda x: ((x // L) * L, ((x // L) * L) + L - 1))
+    column = df.iloc[:, column_index]
+    lower = (column.to_numpy(dtype=float) // L) * L
+
+    if compact:
+        # one category per occurring bin, missing values get the code -1
+        codes, edges = pd.factorize(lower, sort=True)
+        categories = pd.IntervalIndex.from_arrays(edges, edges + L - 1, closed='both')
+        df.isetitem(column_index, pd.Series(pd.Categorical.from_codes(codes, categories), index=df.index,
+                                            name=column.name))
+        return
+
+    intervals = np.empty(len(lower), dtype=object)
+    intervals[:] = list(zip(lower.tolist(), (lower + L - 1).tolist()))
+    df.iloc[:, column_index] = pd.Series(intervals, index=df.index)
+
+
+def interval_tuples(column: pd.Series) -> pd.Series:
+    """
+    Converts a column of intervals, e.g. from discretize with compact=True, into a column of (lower, upper) tuples.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column of intervals.
 
+    Returns
+    ----------
+    pd.Series
+        The column of tuples, with NaN for missing values.
+    """
+
+    values = column.array
+
+    if isinstance(values, pd.Categorical):
+        categories = values.categories
+        tuples = np.empty(len(categories) + 1, dtype=object)
+        tuples[:-1] = list(zip(categories.left.tolist(), categories.right.tolist()))
+        tuples[-1] = np.nan
+        # the code -1 of missing values selects the last entry
+        return pd.Series(tuples[values.codes], index=column.index, name=column.name)
+
+    return column.map(lambda x: (x.left, x.right) if isinstance(x, pd.Interval) else x)
 
-def generalize_categorical(df: pd.DataFrame, indices: List[int], values: List):
+
+def _object_array(values: list) -> np.ndarray:
+    # builds a 1-d object array without unpacking tuples or sets
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def generalize_column(column: pd.Series, mapping: dict, compact: bool = False) -> Tuple[pd.Series, int]:
+    """
+    Replaces the values of a column according to a mapping. The mapping is applied to the distinct values only and
+    the column is rebuilt with one gather over the integer codes of its values.
+
+    A Categorical column stays Categorical, where values mapped to the same generalized value share one category.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column to generalize.
+    mapping : dict
+        The generalized value per original value. Values not in the mapping are kept.
+    compact : bool
+        Whether to return an object column as a Categorical.
+
+    Returns
+    ----------
+    column, n_changed
+        The generalized column and the number of changed cells.
+    """
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.array.codes
+        uniques = list(column.array.categories)
+        compact = True
+    else:
+        codes, uniques = pd.factorize(column.to_numpy())
+
+    generalized = [mapping.get(value, value) for value in uniques]
+    changed = np.array([value in mapping and mapping[value] != value for value in uniques], dtype=bool)
+
+    n_changed = int(np.bincount(codes[codes >= 0], minlength=len(uniques))[changed].sum()) if changed.any() else 0
+
+    if compact:
+        # merge the categories that are mapped to the same value, the code -1 of missing values is kept
+        category_codes, categories = pd.factorize(_object_array(generalized))
+        new_codes = np.append(category_codes, -1)[codes]
+        values = pd.Categorical.from_codes(new_codes, categories=pd.Index(categories))
+    elif n_changed == 0:
+        return column, 0
+    else:
+        values = np.append(_object_array(generalized), np.nan)[codes]
+
+    return pd.Series(values, index=column.index, name=column.name), n_changed
+
+
+def get_generalized_values(column: pd.Series) -> dict:
+    """
+    Maps the code of every category of a Categorical generalized column to the set of original values it stands for.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The Categorical column.
+
+    Returns
+    ----------
+    dict
+        The set of original values per category code.
+    """
+
+    return {code: value if isinstance(value, frozenset) else frozenset([value])
+            for code, value in enumerate(column.cat.categories)}
+
+
+def generalize_categorical(df: pd.DataFrame, indices: List[int], values: List, compact: bool = False):
     """
      Generalizes specified categorical attribute values in the given dataframe by replacing them with a common value.
      The resulting new DataFrame has the specified values embedded in a list in the corresponding columns.
 
+     Categorical columns stay Categorical, so their cells are stored as integer codes into the categories, and
+     compact=True converts object columns as well. get_generalized_values gives the original values per code.
+
      Parameters
      -----------
      df : pandas DataFrame
@@ -44,16 +167,78 @@ def generalize_categorical(df: pd.DataFrame, indices: List[int], values: List):
          The indices of the columns to generalize.
      values : list of any hashable type
          The categorical attribute values to be generalized.
+     compact : bool
+         Whether to store the generalized columns as Categorical.
 
      """
 
     values = frozenset(values)
+    mapping = dict.fromkeys(values, values)
 
     for j in indices:
-        new_col = []
-        for val in df.iloc[:, j]:
-            if val in values:
-                new_col.append(values)
-            else:
-                new_col.append(val)
-        df.iloc[:, j] = np.array(new_col)
+        column, n_changed = generalize_column(df.iloc[:, j], mapping, compact)
+        if n_changed > 0 or compact:
+            df.isetitem(j, column)
+
+
+def get_generalization_mapping(rules) -> dict:
+    """
+    Converts generalization rules into a mapping of original values to generalized values.
+
+    Parameters
+    ----------
+    rules : dict or list of collections
+        Either a mapping of original values to generalized values or a list of disjoint value collections, whose
+        values are each generalized to the frozenset of the collection.
+
+    Returns
+    ----------
+    dict
+        The generalized value per original value.
+    """
+
+    if isinstance(rules, dict):
+        return rules
+
+    mapping = {}
+    for values in rules:
+        values = frozenset(values)
+        for value in values:
+            if value in mapping:
+                raise ValueError(f"Value {value!r} is part of several value sets.")
+            mapping[value] = values
+
+    return mapping
+
+
+def generalize_columns(df: pd.DataFrame, rules: dict, compact: bool = False) -> dict:
+    """
+    Generalizes several categorical columns at once. All rules of a column are applied in one pass over the column,
+    see generalize_column.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    rules : dict
+        The generalization rules per column index, either a mapping of original values to generalized values or a
+        list of disjoint value collections, e.g. {13: [['Cuba', 'Jamaica'], ['Germany', 'France']]}.
+    compact : bool
+        Whether to store the generalized columns as Categorical.
+
+    Returns
+    ----------
+    dict
+        The number of changed cells per column index.
+    """
+
+    # validate all rules before the dataframe is modified
+    mappings = {j: get_generalization_mapping(column_rules) for j, column_rules in rules.items()}
+
+    n_changed = {}
+    for j, mapping in mappings.items():
+        column, n_changed[j] = generalize_column(df.iloc[:, j], mapping, compact)
+        if n_changed[j] > 0 or compact:
+            df.isetitem(j, column)
+
+    return n_changed
@@ -0,0 +1,276 @@
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymize.generalize import _object_array
+
+
+class GeneralizationHierarchy:
+    """
+    A domain generalization hierarchy of an attribute.
+
+    Level 0 holds the original (leaf) values and every further level generalizes the values of the level below. For
+    every level, an array maps the codes of the leaves to the codes of their generalized values, so a column is
+    generalized to any level by one gather on its leaf codes.
+
+    Categorical values are generalized to the frozenset of the leaves below a node (as in generalize_categorical),
+    numerical values to closed intervals (as in discretize with compact=True).
+
+    Parameters
+    ----------
+    leaves : list
+        The distinct original values.
+    levels : list of list
+        The generalized value of every leaf per level above level 0.
+    """
+
+    def __init__(self, leaves: List, levels: List[List]):
+        self.leaves = pd.Index(_object_array(list(leaves)) if not _is_numeric(leaves) else list(leaves))
+
+        if not self.leaves.is_unique:
+            raise ValueError("The leaves of a hierarchy must be unique.")
+
+        # the trailing -1 maps the code -1 of missing values to itself
+        self._lookups = [np.append(np.arange(len(self.leaves)), -1)]
+        self._values = [self.leaves]
+
+        for level in levels:
+            if len(level) != len(self.leaves):
+                raise ValueError("Every level must contain one generalized value per leaf.")
+
+            codes, values = pd.factorize(_object_array(list(level)))
+            self._lookups.append(np.append(codes, -1))
+            self._values.append(pd.Index(values))
+
+        for lookup_0, lookup_1 in zip(self._lookups, self._lookups[1:]):
+            # every generalized value must be contained in one value of the next level
+            pairs = np.unique(np.stack([lookup_0, lookup_1]), axis=1)
+            if len(np.unique(pairs[0])) != pairs.shape[1]:
+                raise ValueError("The levels of a hierarchy must be nested.")
+
+    @classmethod
+    def from_tree(cls, tree: dict) -> 'GeneralizationHierarchy':
+        """
+        Builds a categorical hierarchy from a tree of nested dicts whose innermost values are lists of leaves, e.g.
+        {'Europe': {'West': ['France', 'Germany'], 'East': ['Poland']}, 'America': ['Cuba']}. Each node is generalized
+        to the frozenset of its leaves, leaves at a lower depth keep their value on the deeper levels.
+
+        Parameters
+        ----------
+        tree : dict
+            The nested dicts of the tree.
+
+        Returns
+        ----------
+        GeneralizationHierarchy
+            The hierarchy with one level per depth of the tree plus the root.
+        """
+
+        paths = []
+
+        def collect(node, ancestors):
+            if isinstance(node, dict):
+                for child in node.values():
+                    collect(child, ancestors + [node])
+            else:
+                for leaf in node:
+                    paths.append((leaf, ancestors + [node]))
+
+        collect(tree, [])
+        height = max(len(ancestors) for _, ancestors in paths)
+
+        leaves = [leaf for leaf, _ in paths]
+        levels = [[] for _ in range(height)]
+
+        for leaf, ancestors in paths:
+            # from the parent of the leaf up to the root, padded with the leaf itself
+            nodes = [None] * (height - len(ancestors)) + ancestors[::-1]
+            for level, node in enumerate(nodes):
+                values = frozenset(_get_leaves(node)) if node is not None else frozenset([leaf])
+                levels[level].append(values if len(values) > 1 else leaf)
+
+        return cls(leaves, levels)
+
+    @classmethod
+    def from_intervals(cls, values, widths: List[float]) -> 'GeneralizationHierarchy':
+        """
+        Builds a numerical hierarchy of nested intervals of fixed widths, where each interval is
+        [(x // width) * width, (x // width) * width + width - 1], as in discretize.
+
+        Parameters
+        ----------
+        values : array-like
+            The original values, e.g. the column to generalize.
+        widths : list of float
+            The interval width per level, at least 1 and each a multiple of the previous one.
+
+        Returns
+        ----------
+        GeneralizationHierarchy
+            The hierarchy with one level per width.
+        """
+
+        leaves = pd.unique(pd.Series(values).dropna().to_numpy())
+        leaves = np.sort(leaves)
+
+        for width_0, width_1 in zip(widths, widths[1:]):
+            if width_0 <= 0 or width_1 % width_0 != 0:
+                raise ValueError("The interval widths must be positive multiples of the previous width.")
+
+        hierarchy = cls(leaves, [])
+
+        for width in widths:
+            if not width >= 1:
+                raise ValueError("Interval length must be at least 1.")
+
+            lower = (leaves.astype(float) // width) * width
+            codes, edges = pd.factorize(lower, sort=True)
+            hierarchy._lookups.append(np.append(codes, -1))
+            hierarchy._values.append(pd.IntervalIndex.from_arrays(edges, edges + width - 1, closed='both'))
+
+        return hierarchy
+
+    @property
+    def height(self) -> int:
+        """
+        The number of levels, including level 0 of the original values.
+        """
+        return len(self._lookups)
+
+    def get_values(self, level: int) -> pd.Index:
+        """
+        Returns the distinct generalized values of a level in the order of their codes.
+        """
+        return self._values[level]
+
+    def get_lookup(self, level: int) -> np.ndarray:
+        """
+        Returns the array mapping the leaf codes to the codes of a level. Its last entry maps the code -1 of missing
+        values to -1, so lookup[leaf_codes] generalizes a whole column.
+        """
+        return self._lookups[level]
+
+    def encode(self, column: pd.Series) -> np.ndarray:
+        """
+        Encodes a column of original values as leaf codes, -1 marks a missing value.
+
+        Parameters
+        ----------
+        column : pd.Series
+            The column of original values.
+
+        Returns
+        ----------
+        numpy.ndarray
+            An array containing the leaf code per record.
+        """
+
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # encode the categories only
+            category_codes = self.leaves.get_indexer(column.cat.categories)
+            codes = np.append(category_codes, -1)[column.cat.codes.to_numpy()]
+            unknown = (codes < 0) & (column.cat.codes.to_numpy() >= 0)
+        else:
+            codes = self.leaves.get_indexer(column.to_numpy())
+            unknown = (codes < 0) & column.notna().to_numpy()
+
+        if unknown.any():
+            raise ValueError(f"Value {column.iloc[np.flatnonzero(unknown)[0]]!r} is not a leaf of the hierarchy.")
+
+        return codes.astype(np.int64, copy=False)
+
+    def generalize_codes(self, leaf_codes: np.ndarray, level: int) -> np.ndarray:
+        """
+        Maps leaf codes to the codes of the generalized values of a level with one gather.
+        """
+        return self._lookups[level][leaf_codes]
+
+    def generalize(self, leaf_codes: np.ndarray, level: int) -> pd.Categorical:
+        """
+        Generalizes leaf codes to a Categorical of the values of a level.
+        """
+        return pd.Categorical.from_codes(self.generalize_codes(leaf_codes, level), categories=self._values[level])
+
+
+def _is_numeric(values) -> bool:
+    return np.asarray(values).dtype.kind in 'iuf'
+
+
+def _get_leaves(node) -> list:
+    # the leaves below a node of a tree of nested dicts
+    if isinstance(node, dict):
+        return [leaf for child in node.values() for leaf in _get_leaves(child)]
+    return list(node)
+
+
+def encode_leaves(df: pd.DataFrame, hierarchies: Dict[int, GeneralizationHierarchy]) -> Dict[int, np.ndarray]:
+    """
+    Encodes the columns of a dataset as leaf codes of their hierarchies. The codes can be generalized to any levels
+    without touching the dataset again.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    hierarchies : dict
+        The hierarchy per column index.
+
+    Returns
+    ----------
+    dict
+        The leaf codes per column index.
+    """
+
+    return {j: hierarchy.encode(df.iloc[:, j]) for j, hierarchy in hierarchies.items()}
+
+
+def generalize_codes(leaf_codes: Dict[int, np.ndarray], hierarchies: Dict[int, GeneralizationHierarchy],
+                     levels: Dict[int, int]) -> Tuple[List[np.ndarray], List[int]]:
+    """
+    Generalizes the leaf codes of several columns to the given levels, one gather per column.
+
+    Parameters
+    ----------
+    leaf_codes : dict
+        The leaf codes per column index, see encode_leaves.
+    hierarchies : dict
+        The hierarchy per column index.
+    levels : dict
+        The level per column index.
+
+    Returns
+    ----------
+    codes, cardinalities
+        The generalized codes and the number of generalized values per column, e.g. for combine_codes.
+    """
+
+    codes = [hierarchies[j].generalize_codes(leaf_codes[j], level) for j, level in levels.items()]
+    cardinalities = [len(hierarchies[j].get_values(level)) for j, level in levels.items()]
+
+    return codes, cardinalities
+
+
+def apply_hierarchies(df: pd.DataFrame, hierarchies: Dict[int, GeneralizationHierarchy], levels: Dict[int, int],
+                      leaf_codes: Dict[int, np.ndarray] = None):
+    """
+    Generalizes the columns of a dataframe to the given levels of their hierarchies. The generalized columns are
+    stored as Categorical.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    hierarchies : dict
+        The hierarchy per column index.
+    levels : dict
+        The level per column index.
+    leaf_codes : dict, optional
+        Precomputed leaf codes per column index from encode_leaves.
+    """
+
+    if leaf_codes is None:
+        leaf_codes = encode_leaves(df, {j: hierarchies[j] for j in levels})
+
+    for j, level in levels.items():
+        values = hierarchies[j].generalize(leaf_codes[j], level)
+        df.isetitem(j, pd.Series(values, index=df.index, name=df.columns[j]))
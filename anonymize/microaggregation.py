@@ -0,0 +1,206 @@
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+class _RemainingIndex:
+    """
+    A KD-tree over the records that are not yet aggregated. Aggregated records are only marked, the tree and the
+    centroid of the remaining records are rebuilt once half of the records of the tree are gone.
+    """
+
+    def __init__(self, points: np.ndarray):
+        self.points = points
+        self.remaining = np.ones(len(points), dtype=bool)
+        self.n_remaining = len(points)
+        self._build()
+
+    def _build(self):
+        self._positions = np.flatnonzero(self.remaining)
+        self._tree = cKDTree(self.points[self._positions])
+
+        # the remaining records from the farthest to the closest to their centroid
+        block = self.points[self._positions]
+        distances = np.sum((block - block.mean(axis=0)) ** 2, axis=1)
+        self._extremes = self._positions[np.argsort(-distances, kind='stable')]
+        self._next_extreme = 0
+
+    def remove(self, positions: np.ndarray):
+        self.remaining[positions] = False
+        self.n_remaining -= len(positions)
+
+        if 0 < self.n_remaining <= len(self._positions) // 2:
+            self._build()
+
+    def farthest(self) -> int:
+        """
+        Returns the remaining record farthest from the centroid of the remaining records.
+        """
+        while not self.remaining[self._extremes[self._next_extreme]]:
+            self._next_extreme += 1
+        return self._extremes[self._next_extreme]
+
+    def nearest(self, point: np.ndarray, count: int) -> np.ndarray:
+        """
+        Returns at least count remaining records (all, if fewer remain) sorted by their distance to a point.
+        """
+        count = min(count, self.n_remaining)
+        # some of the neighbors in the tree may be aggregated already
+        query_count = 2 * count
+
+        while True:
+            query_count = min(query_count, len(self._positions))
+            _, neighbors = self._tree.query(point, k=max(query_count, 2))
+            positions = self._positions[neighbors[:query_count]]
+            positions = positions[self.remaining[positions]]
+
+            if len(positions) >= count or query_count == len(self._positions):
+                return positions
+
+            query_count *= 2
+
+
+def _extend_group(index: _RemainingIndex, group: np.ndarray, candidates: np.ndarray, max_size: int,
+                  gamma: float) -> np.ndarray:
+    # V-MDAV: add the closest candidates while they are closer to the group than to the other remaining records
+    points = index.points
+    extension = []
+
+    for candidate in candidates:
+        if len(group) + len(extension) >= max_size:
+            break
+
+        members = np.append(group, extension).astype(np.int64)
+        distance_in = np.sqrt(np.min(np.sum((points[members] - points[candidate]) ** 2, axis=1)))
+
+        excluded = set(members.tolist())
+        excluded.add(candidate)
+        outside = [position for position in index.nearest(points[candidate], len(excluded) + 1).tolist()
+                   if position not in excluded]
+        if len(outside) == 0:
+            break
+        distance_out = np.sqrt(np.sum((points[outside[0]] - points[candidate]) ** 2))
+
+        if distance_in >= gamma * distance_out:
+            break
+        extension.append(candidate)
+
+    return np.append(group, extension).astype(np.int64)
+
+
+def get_sse(values: np.ndarray, groups: np.ndarray) -> float:
+    """
+    Calculates the within-group sum of squared errors (SSE), i.e. the squared distance of every record to the mean of
+    its group, summed over all records and columns.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values of the records, one row per record.
+    groups : numpy.ndarray
+        The group per record, -1 for records without group.
+
+    Returns
+    ----------
+    float
+        The within-group SSE.
+    """
+
+    values = np.asarray(values, dtype=float).reshape(len(groups), -1)
+    grouped = groups >= 0
+    values = values[grouped]
+    groups = groups[grouped]
+
+    sizes = np.bincount(groups)
+    sse = 0.0
+    for column in values.T:
+        means = np.bincount(groups, weights=column, minlength=len(sizes)) / np.maximum(sizes, 1)
+        sse += float(np.sum((column - means[groups]) ** 2))
+
+    return sse
+
+
+def microaggregate(df: pd.DataFrame, column_indices: List[int], k: int, variable: bool = False,
+                   gamma: float = 0.2, standardize: bool = True) -> Tuple[np.ndarray, float]:
+    """
+    Microaggregates numerical QI columns with MDAV (maximum distance to average vector), so that every record shares
+    its QI values with at least k - 1 other records. Each value is replaced by the mean of its group.
+
+    Groups are formed one at a time around the remaining record farthest from the centroid of the remaining records,
+    from this record and its k - 1 nearest neighbors. The neighbors are found with a KD-tree over the remaining
+    records, which is rebuilt together with the centroid whenever half of its records are aggregated. The last
+    k to 2k - 1 records form one group. With variable=True, groups are extended as in V-MDAV up to 2k - 1 records
+    by the next nearest neighbors of the farthest record, as long as they are less than gamma times as far from the
+    group as from any other remaining record. Records with a missing value are not aggregated.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    column_indices : list of int
+        The indices of the numerical QI columns.
+    k : int
+        The minimum group size.
+    variable : bool
+        Whether to form groups of variable size (V-MDAV).
+    gamma : float
+        The gain factor of V-MDAV, larger values form larger groups.
+    standardize : bool
+        Whether to scale the columns to unit variance before measuring distances.
+
+    Returns
+    ----------
+    groups, sse
+        The group per record (-1 for records with a missing value) and the within-group SSE of the (standardized)
+        values, see get_sse.
+    """
+
+    if k < 1:
+        raise ValueError("k must be positive.")
+
+    values = df.iloc[:, column_indices].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(values).any(axis=1))
+
+    if len(valid) < k:
+        raise ValueError(f"The dataset has less than {k} records with complete values.")
+
+    points = values[valid]
+    if standardize:
+        scales = points.std(axis=0)
+        points = (points - points.mean(axis=0)) / np.where(scales > 0, scales, 1)
+
+    index = _RemainingIndex(points)
+    local_groups = np.full(len(points), -1, dtype=np.int64)
+    n_groups = 0
+
+    while index.n_remaining >= 2 * k:
+        extreme = index.farthest()
+        neighbors = index.nearest(points[extreme], 2 * k if variable else k)
+        group = neighbors[:k]
+
+        if variable:
+            # keep at least k records for the remaining groups
+            max_size = min(2 * k - 1, index.n_remaining - k)
+            group = _extend_group(index, group, neighbors[k:], max_size, gamma)
+
+        local_groups[group] = n_groups
+        n_groups += 1
+        index.remove(group)
+
+    local_groups[index.remaining] = n_groups
+
+    groups = np.full(len(df), -1, dtype=np.int64)
+    groups[valid] = local_groups
+
+    sse = get_sse(points, local_groups)
+
+    # replace the values by the means of their groups
+    sizes = np.bincount(local_groups)
+    for column, j in enumerate(column_indices):
+        means = np.bincount(local_groups, weights=values[valid, column]) / sizes
+        aggregated = values[:, column].copy()
+        aggregated[valid] = means[local_groups]
+        df.isetitem(j, pd.Series(aggregated, index=df.index, name=df.columns[j]))
+
+    return groups, sse
@@ -0,0 +1,208 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.groupindex import factorize_column
+from anonymize.generalize import _object_array
+
+# code matrix and column scales shared with the worker processes
+_CODES = None
+_SCALES = None
+
+
+def _split(codes: np.ndarray, scales: List[np.ndarray], positions: np.ndarray, k: int,
+           max_leaves: int = None) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Splits a partition recursively at the median of the column with the widest normalized range, as long as both
+    halves keep at least k records. Returns the leaf partitions and, if max_leaves is reached, the partitions that
+    still need to be split.
+    """
+
+    leaves = []
+    stack = [positions]
+
+    while stack:
+        if max_leaves is not None and len(stack) + len(leaves) >= max_leaves:
+            break
+
+        positions = stack.pop()
+
+        if len(positions) < 2 * k:
+            leaves.append(positions)
+            continue
+
+        block = codes[positions]
+        lows = block.min(axis=0)
+        highs = block.max(axis=0)
+        spans = [scale[high] - scale[low] for scale, low, high in zip(scales, lows, highs)]
+
+        for j in np.argsort(spans, kind='stable')[::-1]:
+            if spans[j] <= 0:
+                continue
+
+            values = block[:, j]
+            middle = len(values) // 2
+            median = values[np.argpartition(values, middle)[middle]]
+
+            # strict split, the records with the median value stay together
+            left = values < median
+            n_left = np.count_nonzero(left)
+            if n_left < k or len(values) - n_left < k:
+                left = values <= median
+                n_left = np.count_nonzero(left)
+            if n_left < k or len(values) - n_left < k:
+                continue
+
+            stack.append(positions[~left])
+            stack.append(positions[left])
+            break
+
+        else:
+            # no column can be cut
+            leaves.append(positions)
+
+    return leaves, stack
+
+
+def _init_worker(codes: np.ndarray, scales: List[np.ndarray]):
+    global _CODES, _SCALES
+    _CODES = codes
+    _SCALES = scales
+
+
+def _split_subtree(task) -> List[np.ndarray]:
+    positions, k = task
+    leaves, _ = _split(_CODES, _SCALES, positions, k)
+    return leaves
+
+
+def _summarize_numerical(codes: np.ndarray, starts: np.ndarray, uniques: np.ndarray) -> Tuple[np.ndarray, pd.Index]:
+    # the closed interval [min, max] of every partition
+    lows = np.minimum.reduceat(codes, starts)
+    highs = np.maximum.reduceat(codes, starts)
+
+    summary_codes, bounds = pd.factorize(lows.astype(np.int64) * len(uniques) + highs)
+    lower = np.asarray(uniques)[bounds // len(uniques)]
+    upper = np.asarray(uniques)[bounds % len(uniques)]
+
+    return summary_codes, pd.IntervalIndex.from_arrays(lower, upper, closed='both')
+
+
+def _summarize_categorical(codes: np.ndarray, starts: np.ndarray, uniques) -> Tuple[np.ndarray, pd.Index]:
+    # the set of values of every partition, or the value itself if it is the only one
+    partition_ids = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(codes))))
+    pairs = np.unique(partition_ids.astype(np.int64) * len(uniques) + codes)
+    pair_partitions = pairs // len(uniques)
+    pair_codes = pairs % len(uniques)
+
+    boundaries = np.flatnonzero(np.diff(pair_partitions)) + 1
+    sets = [tuple(value_codes) for value_codes in np.split(pair_codes, boundaries)]
+
+    summary_codes, distinct_sets = pd.factorize(_object_array(sets))
+    values = [uniques[value_codes[0]] if len(value_codes) == 1 else frozenset(uniques[c] for c in value_codes)
+              for value_codes in distinct_sets]
+
+    return summary_codes, pd.Index(_object_array(values))
+
+
+def mondrian(df: pd.DataFrame, qa_indices: List[int], k: int, categorical_indices: List[int] = None,
+             n_jobs: int = 1) -> np.ndarray:
+    """
+    Anonymizes a dataframe with the Mondrian multidimensional partitioning, so that it is k-anonymous in the QI columns.
+
+    The records are partitioned recursively by median cuts of the QI column with the widest normalized range, on
+    integer codes of the values and arrays of record positions. Each QI value is then replaced by the summary of its
+    partition: numerical columns by the closed interval [min, max], categorical columns by the frozenset of the
+    values (categorical values are cut in their sorted order). The columns are stored as Categorical, as by discretize
+    and generalize_categorical with compact=True. Records with a missing QI value are not partitioned and keep their
+    QI values.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    qa_indices : list of int
+        The indices of the QI columns.
+    k : int
+        The desired k to obtain k-anonymity.
+    categorical_indices : list of int, optional
+        The indices of the QI columns to treat as categorical. By default, all non-numeric QI columns.
+    n_jobs : int
+        The number of worker processes splitting independent subtrees.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The partition per record, -1 for records with a missing QI value.
+    """
+
+    if k < 1:
+        raise ValueError("k must be positive.")
+
+    if categorical_indices is None:
+        categorical_indices = [j for j in qa_indices if not pd.api.types.is_numeric_dtype(df.iloc[:, j])]
+
+    n = len(df)
+    codes = np.zeros((n, len(qa_indices)), dtype=np.int32)
+    uniques = []
+    scales = []
+
+    for column, j in enumerate(qa_indices):
+        column_codes, column_uniques = factorize_column(df.iloc[:, j])
+        codes[:, column] = column_codes
+        uniques.append(column_uniques)
+
+        # position of every value on [0, 1], which makes the ranges of the columns comparable
+        if j in categorical_indices or len(column_uniques) < 2:
+            scale = np.arange(len(column_uniques)) / max(len(column_uniques) - 1, 1)
+        else:
+            values = np.asarray(column_uniques, dtype=float)
+            scale = (values - values[0]) / (values[-1] - values[0])
+        scales.append(scale)
+
+    positions = np.flatnonzero(np.all(codes >= 0, axis=1))
+
+    if len(positions) < k:
+        raise ValueError(f"The dataset has less than {k} records with complete QI values.")
+
+    if n_jobs > 1:
+        # split the top of the tree here and the subtrees below in the workers
+        leaves, subtrees = _split(codes, scales, positions, k, max_leaves=4 * n_jobs)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(codes, scales)) as executor:
+            for subtree_leaves in executor.map(_split_subtree, [(subtree, k) for subtree in subtrees]):
+                leaves.extend(subtree_leaves)
+    else:
+        leaves, _ = _split(codes, scales, positions, k)
+
+    # the records ordered by partition
+    order = np.concatenate(leaves)
+    sizes = np.array([len(leaf) for leaf in leaves])
+    starts = np.append(0, np.cumsum(sizes)[:-1])
+
+    partitions = np.full(n, -1, dtype=np.int64)
+    partitions[order] = np.repeat(np.arange(len(leaves)), sizes)
+
+    for column, j in enumerate(qa_indices):
+        if j in categorical_indices:
+            summary_codes, categories = _summarize_categorical(codes[order, column], starts, uniques[column])
+        else:
+            summary_codes, categories = _summarize_numerical(codes[order, column], starts, uniques[column])
+
+        value_codes = np.append(summary_codes, -1)[partitions]
+
+        unpartitioned = np.flatnonzero((partitions < 0) & (codes[:, column] >= 0))
+        if len(unpartitioned) > 0:
+            # records with a missing QI value keep their values, which become further categories
+            kept_codes, kept = pd.factorize(codes[unpartitioned, column])
+            kept_values = [uniques[column][code] for code in kept]
+            category_codes, distinct = pd.factorize(_object_array(list(categories) + kept_values))
+            summarized = value_codes >= 0
+            value_codes[summarized] = category_codes[value_codes[summarized]]
+            value_codes[unpartitioned] = category_codes[len(categories) + kept_codes]
+            categories = pd.Index(distinct)
+
+        values = pd.Categorical.from_codes(value_codes, categories=categories)
+        df.isetitem(j, pd.Series(values, index=df.index, name=df.columns[j]))
+
+    return partitions
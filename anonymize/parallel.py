@@ -0,0 +1,221 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.groupindex import factorize_column
+from anonymize.generalize import _object_array
+from anonymize.plan import AnonymizationPlan, get_column_segments, apply_column_segments, run_removal_steps, \
+    count_values, get_report, _COLUMN_OPERATIONS, _REMOVAL_OPERATIONS
+from anonymize.streaming import hash_values
+
+
+def partition_by_groups(df: pd.DataFrame, qa_indices: List[int], n_partitions: int) -> List[np.ndarray]:
+    """
+    Partitions the records of a dataframe by a hash of their QI values, so all records of an equivalence class fall
+    into the same partition. Records with a missing QI value fall into the first partition.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to partition.
+    qa_indices : list of int
+        The indices of the QI columns.
+    n_partitions : int
+        The number of partitions.
+
+    Returns
+    ----------
+    list of numpy.ndarray
+        The ascending positions of the records per partition.
+    """
+
+    if n_partitions < 1:
+        raise ValueError("The number of partitions must be positive.")
+
+    grouped = df.iloc[:, qa_indices].notna().all(axis=1).to_numpy()
+    partitions = (hash_values(df.iloc[:, qa_indices]) % np.uint64(n_partitions)).astype(np.int64)
+    partitions[~grouped] = 0
+
+    order = np.argsort(partitions, kind='stable')
+    bounds = np.searchsorted(partitions[order], np.arange(n_partitions + 1))
+
+    return [order[bounds[i]:bounds[i + 1]] for i in range(n_partitions)]
+
+
+def write_shards(df: pd.DataFrame, qa_indices: List[int], n_shards: int, directory: str) -> List[str]:
+    """
+    Writes the records of a dataframe partitioned by partition_by_groups to one pickle file per shard. The index of
+    a shard holds the positions of its records in the dataframe.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to partition.
+    qa_indices : list of int
+        The indices of the QI columns.
+    n_shards : int
+        The number of shards.
+    directory : str
+        The directory of the shard files.
+
+    Returns
+    ----------
+    list of str
+        The paths of the shard files.
+    """
+
+    paths = []
+    for i, positions in enumerate(partition_by_groups(df, qa_indices, n_shards)):
+        shard = df.iloc[positions].copy()
+        shard.index = pd.RangeIndex(len(df))[positions]
+
+        path = os.path.join(directory, f'shard_{i}.pkl')
+        shard.to_pickle(path)
+        paths.append(path)
+
+    return paths
+
+
+def _run_shard(task) -> dict:
+    # runs one round of removal steps on a shard file and returns the statistics needed by the next round
+    path, qa_indices, sa_indices, steps, references, count_indices, report = task
+    shard = pd.read_pickle(path)
+
+    result = {}
+    if steps:
+        result['rows_removed'] = run_removal_steps(shard, qa_indices, sa_indices, steps, references)
+        shard.to_pickle(path)
+
+    result['counts'] = {j: count_values(shard.iloc[:, j]) for j in count_indices}
+
+    if report:
+        result['report'] = get_report(shard, qa_indices, sa_indices, references=references)
+
+    return result
+
+
+def _merge_counts(results: List[dict], j: int) -> Tuple[np.ndarray, np.ndarray]:
+    # the reference distribution of a column over all shards, with the values sorted as by factorize_column
+    counts = {}
+    for result in results:
+        for value, count in result['counts'][j].items():
+            counts[value] = counts.get(value, 0) + count
+
+    codes, values = factorize_column(pd.Series(_object_array(list(counts)), dtype=object))
+    sorted_counts = np.zeros(len(values), dtype=np.int64)
+    sorted_counts[codes] = list(counts.values())
+
+    return np.asarray(values, dtype=object), sorted_counts
+
+
+def _merge_reports(reports: List[dict], sa_indices: List[int]) -> Dict[str, object]:
+    # k and l are the minimum, t the maximum over the shards with groups
+    reports = [report for report in reports if report['k']]
+
+    if not reports:
+        return {'k': 0, 'l': None, 't': None}
+
+    return {'k': min(report['k'] for report in reports),
+            'l': min(report['l'] for report in reports) if sa_indices else None,
+            't': max(report['t'] for report in reports) if sa_indices else None}
+
+
+def run_plan_parallel(plan: AnonymizationPlan, df: pd.DataFrame, n_jobs: int = 1, n_shards: int = None,
+                      workdir: str = None) -> Tuple[pd.DataFrame, dict]:
+    """
+    Runs an anonymization plan with the group removals spread over several processes.
+
+    The column steps are applied to the whole dataframe first. The records are then hash-partitioned on their QI
+    values into shard files, so that every equivalence class lies in exactly one shard, and every worker removes the
+    groups of its shards. Closeness is measured against the distribution of the whole dataset, which the workers
+    return as value counts at the end of every round, so the plan runs in one round per closeness step plus one.
+    The kept records are merged in their original order, and k, l and t from the shard reports. The result is the
+    same as of AnonymizationPlan.run.
+
+    Parameters
+    ----------
+    plan : AnonymizationPlan
+        The plan to run, which holds column steps followed by group removals.
+    df : pd.DataFrame
+        The dataframe to anonymize, which is not changed.
+    n_jobs : int
+        The number of worker processes.
+    n_shards : int, optional
+        The number of shards, by default n_jobs.
+    workdir : str, optional
+        The directory of the shard files, by default a temporary directory.
+
+    Returns
+    ----------
+    df, report
+        The anonymized dataframe and the report of the run as by AnonymizationPlan.run.
+    """
+
+    first_removal = next((position for position, step in enumerate(plan.steps)
+                          if step['operation'] not in _COLUMN_OPERATIONS), len(plan.steps))
+    column_steps = plan.steps[:first_removal]
+    removal_steps = plan.steps[first_removal:]
+
+    for step in removal_steps:
+        if step['operation'] not in _REMOVAL_OPERATIONS:
+            raise ValueError(f"Operation {step['operation']!r} is not supported in parallel mode, only column steps "
+                             f"followed by group removals.")
+
+    plan.validate(df)
+    if not plan.qa_indices:
+        raise ValueError("The plan has no quasi-identifiers.")
+
+    df = df.copy()
+    cells_changed = apply_column_segments(df, get_column_segments(column_steps), plan.compact)
+
+    # the closeness steps start a new round, which needs the distribution of the records kept by the last round
+    rounds = [[]]
+    for step in removal_steps:
+        if step['operation'] == 'remove_groups_with_closeness_higher_t':
+            rounds.append([])
+        rounds[-1].append(step)
+    rounds.append([])
+
+    directory = tempfile.mkdtemp(dir=workdir)
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+    try:
+        paths = write_shards(df, plan.qa_indices, n_shards or n_jobs, directory)
+        count_indices = sorted(set(plan.sa_indices) | {step['sa_index'] for step in removal_steps
+                                                      if 'sa_index' in step})
+        rows_removed = 0
+        results = None
+
+        for round_number, steps in enumerate(rounds):
+            references = {}
+            if results is not None:
+                if steps and 'sa_index' in steps[0]:
+                    references[0] = _merge_counts(results, steps[0]['sa_index'])
+                elif not steps:
+                    references = {j: _merge_counts(results, j) for j in plan.sa_indices}
+
+            is_last = round_number == len(rounds) - 1
+            tasks = [(path, plan.qa_indices, plan.sa_indices, steps, references, count_indices, is_last)
+                     for path in paths]
+            results = list(executor.map(_run_shard, tasks) if executor is not None else map(_run_shard, tasks))
+            rows_removed += sum(result.get('rows_removed', 0) for result in results)
+
+        shards = [pd.read_pickle(path) for path in paths]
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    # the kept records in their original order and with their original labels
+    anonymized = pd.concat(shards).sort_index()
+    anonymized.index = df.index[anonymized.index.to_numpy()]
+
+    report = {'rows_removed': rows_removed, 'cells_changed': cells_changed, 'n_records': len(anonymized)}
+    report.update(_merge_reports([result['report'] for result in results], plan.sa_indices))
+
+    return anonymized, report
@@ -0,0 +1,256 @@
+from typing import Dict, List, Union
+import numpy as np
+import pandas as pd
+from anonymetrics.groupindex import EquivalenceClassIndex, get_equivalence_class_index
+
+_DISTRIBUTIONS = ('gaussian', 'laplace')
+
+
+def _draw_noise(rng: np.random.Generator, distribution: str, size: int, scale: float) -> np.ndarray:
+    # draws noise with standard deviation (gaussian) or diversity (laplace) scale in one call
+    if distribution == 'gaussian':
+        noise = rng.standard_normal(size)
+        noise *= scale
+        return noise
+    if distribution == 'laplace':
+        return rng.laplace(0.0, scale, size)
+    raise ValueError(f"Unknown distribution {distribution!r}, expected one of {_DISTRIBUTIONS}.")
+
+
+def add_noise(df: pd.DataFrame, column_indices: List[int], scale: float, distribution: str = 'gaussian',
+              relative: bool = True, seed: Union[int, np.random.Generator] = None):
+    """
+    Adds random noise to numerical columns in the given dataframe. The noise of a column is drawn in one call, so
+    the result is reproducible from the seed. Integer columns are rounded and keep their dtype, missing values are
+    kept.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    column_indices : list of int
+        The indices of the numerical attribute columns.
+    scale : float
+        The standard deviation of gaussian noise or the diversity of laplace noise.
+    distribution : str
+        'gaussian' or 'laplace'.
+    relative : bool
+        Whether the scale is relative to the standard deviation of each column.
+    seed : int or numpy.random.Generator, optional
+        The seed or generator of the noise.
+    """
+
+    if scale < 0:
+        raise ValueError("The noise scale must not be negative.")
+    if distribution not in _DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution {distribution!r}, expected one of {_DISTRIBUTIONS}.")
+
+    rng = np.random.default_rng(seed)
+
+    for column_index in column_indices:
+        column = df.iloc[:, column_index]
+        values = column.to_numpy(dtype=float, na_value=np.nan, copy=True)
+
+        column_scale = scale * np.nanstd(values) if relative else scale
+        values += _draw_noise(rng, distribution, len(values), column_scale)
+
+        noisy = pd.Series(values, index=df.index, name=column.name)
+        if pd.api.types.is_integer_dtype(column.dtype):
+            # also nullable integer columns, whose missing values are NaN here
+            noisy = noisy.round().astype(column.dtype)
+
+        df.isetitem(column_index, noisy)
+
+
+def rank_swap(df: pd.DataFrame, column_indices: List[int], p: float, seed: Union[int, np.random.Generator] = None):
+    """
+    Swaps the values of numerical columns in the given dataframe between records of close rank. Every value moves
+    to a record whose rank in the column differs by less than p percent of the records, so the distribution of each
+    column is kept exactly. The values are sorted by rank keys perturbed with uniform noise of width p percent, which
+    is one sort per column instead of a sequential pairing of the records. Missing values are kept.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    column_indices : list of int
+        The indices of the numerical attribute columns.
+    p : float
+        The maximal rank distance in percent of the number of records, between 0 and 100.
+    seed : int or numpy.random.Generator, optional
+        The seed or generator of the swaps.
+    """
+
+    if not 0 <= p <= 100:
+        raise ValueError("The rank distance p must be between 0 and 100.")
+
+    rng = np.random.default_rng(seed)
+
+    for column_index in column_indices:
+        column = df.iloc[:, column_index]
+        values = column.to_numpy(copy=True)
+
+        present = np.flatnonzero(column.notna().to_numpy())
+        order = present[np.argsort(values[present])]
+        window = p / 100 * len(present)
+
+        # the record of rank r receives the value at position r of the perturbed ranks
+        keys = np.arange(len(order)) + rng.uniform(0, window, len(order))
+        values[order] = values[order[np.argsort(keys)]]
+
+        df.isetitem(column_index, pd.Series(values, index=df.index, name=column.name))
+
+
+def laplace_mechanism(values: np.ndarray, sensitivity: float, epsilon: float,
+                      seed: Union[int, np.random.Generator] = None) -> np.ndarray:
+    """
+    Releases values with epsilon-differential privacy by adding laplace noise of diversity sensitivity / epsilon.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The exact values of the query.
+    sensitivity : float
+        The L1 sensitivity of the query.
+    epsilon : float
+        The privacy budget.
+    seed : int or numpy.random.Generator, optional
+        The seed or generator of the noise.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The noisy values.
+    """
+
+    if epsilon <= 0:
+        raise ValueError("The privacy budget epsilon must be positive.")
+
+    values = np.asarray(values, dtype=float)
+    noise = _draw_noise(np.random.default_rng(seed), 'laplace', values.size, sensitivity / epsilon)
+    return values + noise.reshape(values.shape)
+
+
+def gaussian_mechanism(values: np.ndarray, sensitivity: float, epsilon: float, delta: float,
+                       seed: Union[int, np.random.Generator] = None) -> np.ndarray:
+    """
+    Releases values with (epsilon, delta)-differential privacy by adding gaussian noise of standard deviation
+    sqrt(2 ln(1.25 / delta)) * sensitivity / epsilon, the classical bound for epsilon < 1.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The exact values of the query.
+    sensitivity : float
+        The L2 sensitivity of the query.
+    epsilon : float
+        The privacy budget, between 0 and 1.
+    delta : float
+        The probability of exceeding the privacy budget, between 0 and 1.
+    seed : int or numpy.random.Generator, optional
+        The seed or generator of the noise.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The noisy values.
+    """
+
+    if not 0 < epsilon < 1:
+        raise ValueError("The gaussian mechanism requires a privacy budget epsilon between 0 and 1.")
+    if not 0 < delta < 1:
+        raise ValueError("The privacy parameter delta must be between 0 and 1.")
+
+    values = np.asarray(values, dtype=float)
+    sigma = np.sqrt(2 * np.log(1.25 / delta)) * sensitivity / epsilon
+    noise = _draw_noise(np.random.default_rng(seed), 'gaussian', values.size, sigma)
+    return values + noise.reshape(values.shape)
+
+
+def release_histogram(df: pd.DataFrame, qa_indices: List[int], epsilon: float, delta: float = None,
+                      domains: Dict[int, List] = None, post_process: bool = True,
+                      seed: Union[int, np.random.Generator] = None, max_cells: int = 2 ** 24,
+                      ec_index: EquivalenceClassIndex = None) -> pd.DataFrame:
+    """
+    Releases the number of records per combination of QI values with differential privacy. The exact counts are the
+    sizes of the equivalence classes, which are placed into the cells of the cross product of the column domains.
+    Adding or removing a record changes one cell by one, so the laplace mechanism (or the gaussian mechanism, if
+    delta is given) adds noise of sensitivity 1 to every cell, including the empty ones.
+
+    By default, the domain of a column are its distinct values, which are themselves taken from the data. For a
+    release without this leak, pass the public domains of all QI columns, records with values outside of them are
+    not counted. As every cell is released, the cross product is limited to max_cells cells.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to release.
+    qa_indices : list of int
+        The indices of the QI columns.
+    epsilon : float
+        The privacy budget.
+    delta : float, optional
+        The privacy parameter of the gaussian mechanism.
+    domains : dict, optional
+        The list of possible values per QI column index.
+    post_process : bool
+        Whether to round the noisy counts and clip them at zero, which does not affect the privacy.
+    seed : int or numpy.random.Generator, optional
+        The seed or generator of the noise.
+    max_cells : int
+        The maximum number of cells of the histogram.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    ----------
+    pd.DataFrame
+        The QI columns holding every combination of domain values and the column 'count' of noisy counts.
+    """
+
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+    domains = domains or {}
+
+    # one record per equivalence class, mapped to its cell of the cross product
+    representatives = df.iloc[ec_index.order[ec_index.offsets[:-1]], qa_indices]
+    indexes = []
+    cell_codes = []
+    for position, qa_index in enumerate(qa_indices):
+        column = representatives.iloc[:, position]
+        if qa_index in domains:
+            index = pd.Index(domains[qa_index], dtype=object)
+            if not index.is_unique:
+                raise ValueError(f"The domain of column {qa_index} holds duplicate values.")
+        else:
+            index = pd.Index(pd.unique(df.iloc[:, qa_index].dropna().to_numpy()), dtype=object)
+        indexes.append(index)
+        cell_codes.append(index.get_indexer(column.to_numpy()))
+
+    shape = tuple(len(index) for index in indexes)
+
+    # the number of cells as a python int, which does not overflow
+    n_cells = 1
+    for size in shape:
+        n_cells *= size
+    if n_cells > max_cells:
+        raise ValueError(f"The histogram has {n_cells} cells, more than max_cells = {max_cells}. Release fewer QI "
+                         f"columns or coarser domains.")
+
+    inside = np.all(np.array(cell_codes).reshape(len(qa_indices), -1) >= 0, axis=0)
+
+    counts = np.zeros(n_cells, dtype=np.int64)
+    cells = np.ravel_multi_index(tuple(codes[inside] for codes in cell_codes), shape)
+    counts[cells] = ec_index.sizes[inside]
+
+    if delta is None:
+        noisy = laplace_mechanism(counts, 1, epsilon, seed)
+    else:
+        noisy = gaussian_mechanism(counts, 1, epsilon, delta, seed)
+
+    if post_process:
+        noisy = np.clip(np.rint(noisy), 0, None).astype(np.int64)
+
+    histogram = pd.MultiIndex.from_product(indexes, names=list(df.columns[qa_indices])).to_frame(index=False)
+    histogram['count'] = noisy
+
+    return histogram
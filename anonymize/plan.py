@@ -0,0 +1,543 @@
+import json
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import get_diversities, calculate_closenesses, is_numerical
+from anonymetrics.groupindex import EquivalenceClassIndex, get_equivalence_class_index, factorize_column
+from anonymize.generalize import discretize, generalize_column, get_generalization_mapping
+from anonymize.suppress import suppress_float, suppress_locally, _drop_groups, _get_suppression_token
+
+# the parameters of every operation, optional parameters have a default value
+_OPERATIONS = {
+    'discretize': {'column_index': None, 'interval_length': None},
+    'generalize': {'column_index': None, 'rules': None},
+    'suppress_values': {'column_index': None, 'values': [], 'min_frequency': None},
+    'suppress_float': {'column_index': None},
+    'remove_groups': {'k': None},
+    'remove_groups_with_diversity_smaller_l': {'l': None},
+    'remove_groups_with_closeness_higher_t': {'sa_index': None, 't': None},
+    'suppress_locally': {'k': None, 'weights': None},
+}
+
+# operations on the values of one column, which do not depend on other columns
+_COLUMN_OPERATIONS = ('discretize', 'generalize', 'suppress_values', 'suppress_float')
+
+# operations on the distinct values of a column, which are fused into one pass
+_VALUE_OPERATIONS = ('generalize', 'suppress_values')
+
+# operations removing whole equivalence classes, which share one equivalence class index
+_REMOVAL_OPERATIONS = ('remove_groups', 'remove_groups_with_diversity_smaller_l',
+                       'remove_groups_with_closeness_higher_t')
+
+
+class AnonymizationPlan:
+    """
+    A declarative chain of anonymization steps, which is recorded first and executed on a dataframe by run.
+
+    Steps are added with the methods named after the functions in anonymize.generalize and anonymize.suppress, e.g.
+    AnonymizationPlan([0, 1], [2]).discretize(0, 10).generalize(1, [['a', 'b']]).remove_groups(5). On execution,
+    consecutive steps on the values of a column are applied in one pass over the distinct values of the column,
+    consecutive group removals are decided on one shared equivalence class index and the rows are dropped once.
+    The result equals the one of calling the functions one after another.
+
+    A plan is serialized with to_json or to_yaml, so the same steps can be rerun on new data. Generalization rules
+    are serializable as lists of value lists. Plans of column steps followed by group removals can also run on
+    datasets larger than the memory, see anonymize.streaming.run_plan_streaming.
+
+    Parameters
+    ----------
+    qa_indices : list of int, optional
+        The indices of the QI columns, required by the group based steps and the report.
+    sa_indices : list of int, optional
+        The indices of the sensitive attribute columns, required by l-diversity and reported l and t.
+    compact : bool
+        Whether to store the changed columns as Categorical.
+    """
+
+    def __init__(self, qa_indices: List[int] = None, sa_indices: List[int] = None, compact: bool = False):
+        self.qa_indices = list(qa_indices) if qa_indices is not None else []
+        self.sa_indices = list(sa_indices) if sa_indices is not None else []
+        self.compact = compact
+        self.steps = []
+
+    def _add_step(self, operation: str, **parameters) -> 'AnonymizationPlan':
+        if operation not in _OPERATIONS:
+            raise ValueError(f"Unknown operation {operation!r}.")
+
+        unknown = set(parameters) - set(_OPERATIONS[operation])
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)} of operation {operation!r}.")
+
+        step = {'operation': operation}
+        step.update(_OPERATIONS[operation])
+        step.update(parameters)
+        self.steps.append(step)
+
+        return self
+
+    def discretize(self, column_index: int, interval_length: float) -> 'AnonymizationPlan':
+        """
+        Adds a discretization of a numerical column into intervals of fixed length, see discretize.
+        """
+        return self._add_step('discretize', column_index=column_index, interval_length=interval_length)
+
+    def generalize(self, column_index: int, rules) -> 'AnonymizationPlan':
+        """
+        Adds a generalization of categorical values by a mapping or a list of disjoint value lists, see
+        generalize_columns.
+        """
+        return self._add_step('generalize', column_index=column_index, rules=rules)
+
+    def suppress_values(self, column_index: int, values: List = None,
+                        min_frequency: int = None) -> 'AnonymizationPlan':
+        """
+        Adds a suppression of categorical values or of values rarer than min_frequency, see
+        suppress_categorical_values.
+        """
+        return self._add_step('suppress_values', column_index=column_index, values=list(values or []),
+                              min_frequency=min_frequency)
+
+    def suppress_float(self, column_index: int) -> 'AnonymizationPlan':
+        """
+        Adds a suppression of a numerical column by its mean, see suppress_float.
+        """
+        return self._add_step('suppress_float', column_index=column_index)
+
+    def remove_groups(self, k: int) -> 'AnonymizationPlan':
+        """
+        Adds a removal of the groups with < k records, see remove_groups.
+        """
+        return self._add_step('remove_groups', k=k)
+
+    def remove_groups_with_diversity_smaller_l(self, l: int) -> 'AnonymizationPlan':
+        """
+        Adds a removal of the groups with < l diversity in the sensitive attributes, see
+        remove_groups_with_diversity_smaller_l.
+        """
+        return self._add_step('remove_groups_with_diversity_smaller_l', l=l)
+
+    def remove_groups_with_closeness_higher_t(self, sa_index: int, t: float) -> 'AnonymizationPlan':
+        """
+        Adds a removal of the groups with > t closeness in a sensitive attribute, see
+        remove_groups_with_closeness_higher_t.
+        """
+        return self._add_step('remove_groups_with_closeness_higher_t', sa_index=sa_index, t=t)
+
+    def suppress_locally(self, k: int, weights: Dict[int, float] = None) -> 'AnonymizationPlan':
+        """
+        Adds a local suppression of QI cells until all groups have >= k records, see suppress_locally.
+        """
+        return self._add_step('suppress_locally', k=k, weights=weights)
+
+    def validate(self, df: pd.DataFrame = None):
+        """
+        Checks the parameters of all steps and, if a dataframe is given, whether the steps fit its columns. Raises a
+        ValueError for the first invalid step.
+
+        Parameters
+        ----------
+        df : pd.DataFrame, optional
+            The dataframe the plan is run on.
+        """
+
+        n_columns = df.shape[1] if df is not None else None
+
+        def check_column(j, name):
+            if not isinstance(j, (int, np.integer)) or (n_columns is not None and not 0 <= j < n_columns):
+                raise ValueError(f"{name} {j!r} is not a column of the dataframe.")
+
+        for j in self.qa_indices + self.sa_indices:
+            check_column(j, "Column index")
+
+        # columns that are no longer numerical after a step
+        generalized = set()
+        if df is not None:
+            generalized.update(j for j in range(n_columns) if not pd.api.types.is_numeric_dtype(df.iloc[:, j]))
+
+        for position, step in enumerate(self.steps):
+            operation = step['operation']
+            prefix = f"Step {position} ({operation}): "
+
+            try:
+                if operation in _COLUMN_OPERATIONS:
+                    check_column(step['column_index'], "Column index")
+
+                if operation in ('discretize', 'suppress_float') and step['column_index'] in generalized:
+                    raise ValueError(f"Column {step['column_index']} is not numerical.")
+
+                if operation == 'discretize' and not step['interval_length'] >= 1:
+                    raise ValueError("Interval length must be at least 1.")
+                if operation == 'generalize':
+                    get_generalization_mapping(step['rules'])
+                if operation == 'suppress_values' and not step['values'] and step['min_frequency'] is None:
+                    raise ValueError("Either values or min_frequency must be given.")
+                if operation in ('remove_groups', 'suppress_locally') and not step['k'] >= 1:
+                    raise ValueError("k must be positive.")
+                if operation == 'remove_groups_with_diversity_smaller_l':
+                    if not self.sa_indices:
+                        raise ValueError("The plan has no sensitive attributes.")
+                    if not step['l'] >= 1:
+                        raise ValueError("l must be positive.")
+                if operation == 'remove_groups_with_closeness_higher_t':
+                    check_column(step['sa_index'], "Sensitive attribute index")
+                    if not step['t'] >= 0:
+                        raise ValueError("t must not be negative.")
+                if operation not in _COLUMN_OPERATIONS and not self.qa_indices:
+                    raise ValueError("The plan has no quasi-identifiers.")
+
+            except (ValueError, TypeError) as e:
+                raise ValueError(prefix + str(e)) from e
+
+            if operation in ('discretize', 'generalize', 'suppress_values'):
+                generalized.add(step['column_index'])
+            elif operation == 'suppress_locally':
+                generalized.update(self.qa_indices)
+
+    def run(self, df: pd.DataFrame) -> dict:
+        """
+        Validates the plan and applies all steps to the dataframe in place.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The dataframe to anonymize.
+
+        Returns
+        ----------
+        dict
+            The report of the run: the number of 'rows_removed', the number of 'cells_changed' per column index, the
+            remaining 'n_records' and the resulting 'k', 'l' and 't' (None without QI or sensitive attributes).
+        """
+
+        self.validate(df)
+
+        report = {'rows_removed': 0, 'cells_changed': {}}
+        position = 0
+
+        while position < len(self.steps):
+            # the run of steps of the same kind starting at position
+            kind = _get_kind(self.steps[position]['operation'])
+            end = position
+            while end < len(self.steps) and _get_kind(self.steps[end]['operation']) == kind \
+                    and (kind != 'suppress_locally' or end == position):
+                end += 1
+
+            if kind == 'column':
+                segments = get_column_segments(self.steps[position:end])
+                for j, n_changed in apply_column_segments(df, segments, self.compact).items():
+                    report['cells_changed'][j] = report['cells_changed'].get(j, 0) + n_changed
+            elif kind == 'removal':
+                report['rows_removed'] += run_removal_steps(df, self.qa_indices, self.sa_indices,
+                                                            self.steps[position:end])
+            else:
+                step = self.steps[position]
+                summary = suppress_locally(df, self.qa_indices, step['k'], _get_weights(step['weights']), self.compact)
+                for j, n_changed in summary['column_cells'].items():
+                    report['cells_changed'][j] = report['cells_changed'].get(j, 0) + n_changed
+
+            position = end
+
+        report.update(get_report(df, self.qa_indices, self.sa_indices))
+
+        return report
+
+    def to_dict(self) -> dict:
+        """
+        Returns the plan as a dict of plain values.
+        """
+        return {'qa_indices': self.qa_indices, 'sa_indices': self.sa_indices, 'compact': self.compact,
+                'steps': [dict(step) for step in self.steps]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AnonymizationPlan':
+        """
+        Builds a plan from a dict as returned by to_dict.
+        """
+        plan = cls(data.get('qa_indices'), data.get('sa_indices'), data.get('compact', False))
+
+        for step in data.get('steps', []):
+            step = dict(step)
+            plan._add_step(step.pop('operation'), **step)
+
+        return plan
+
+    def to_json(self) -> str:
+        """
+        Serializes the plan to JSON.
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'AnonymizationPlan':
+        """
+        Builds a plan from JSON as returned by to_json.
+        """
+        return cls.from_dict(json.loads(text))
+
+    def to_yaml(self) -> str:
+        """
+        Serializes the plan to YAML, which requires PyYAML.
+        """
+        return _import_yaml().safe_dump(self.to_dict(), sort_keys=False)
+
+    @classmethod
+    def from_yaml(cls, text: str) -> 'AnonymizationPlan':
+        """
+        Builds a plan from YAML as returned by to_yaml, which requires PyYAML.
+        """
+        return cls.from_dict(_import_yaml().safe_load(text))
+
+
+def _import_yaml():
+    try:
+        import yaml
+    except ImportError as e:
+        raise ImportError("Serializing plans to YAML requires PyYAML.") from e
+    return yaml
+
+
+def _get_kind(operation: str) -> str:
+    if operation in _COLUMN_OPERATIONS:
+        return 'column'
+    if operation in _REMOVAL_OPERATIONS:
+        return 'removal'
+    return operation
+
+
+def _get_weights(weights) -> dict:
+    # keys of JSON objects are strings
+    return {int(j): weight for j, weight in weights.items()} if weights is not None else None
+
+
+def run_removal_steps(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int], steps: List[dict],
+                      references: dict = None) -> int:
+    """
+    Removes the groups of consecutive removal steps from a dataframe in place. All removals are decided on the groups
+    of one equivalence class index and later steps only consider the groups still kept, which gives the result of
+    the functions in anonymize.suppress called one after another.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    qa_indices : list of int
+        The indices of the QI columns.
+    sa_indices : list of int
+        The indices of the sensitive attribute columns for l-diversity.
+    steps : list of dict
+        The removal steps.
+    references : dict, optional
+        The reference distribution per position of a closeness step, see calculate_closenesses, e.g. of the whole
+        dataset when the dataframe is one shard of it. By default, the distribution of the records kept so far.
+
+    Returns
+    ----------
+    int
+        The number of removed rows.
+    """
+
+    references = references or {}
+    ec_index = get_equivalence_class_index(df, qa_indices)
+    drop = np.zeros(ec_index.n_groups, dtype=bool)
+
+    for position, step in enumerate(steps):
+        if step['operation'] == 'remove_groups':
+            drop |= ec_index.sizes < step['k']
+        elif step['operation'] == 'remove_groups_with_diversity_smaller_l':
+            drop |= get_diversities(df, qa_indices, sa_indices, ec_index) < step['l']
+        else:
+            # closeness to the distribution of the records kept so far, as in remove_groups_with_closeness_higher_t
+            kept_rows = ec_index.broadcast(~drop, fill_value=True).astype(float)
+            _, closenesses = calculate_closenesses(ec_index, df.iloc[:, step['sa_index']], weights=kept_rows,
+                                                   reference=references.get(position))
+            drop |= closenesses > step['t']
+
+    return _drop_groups(df, ec_index, drop)['rows_removed']
+
+
+def get_column_segments(steps: List[dict]) -> Dict[int, List[Tuple[str, object]]]:
+    """
+    Splits column steps into the segments executed per column: ('discretize', step), ('suppress_float', step) or
+    ('values', steps) for consecutive value steps, which are fused into one pass.
+
+    Parameters
+    ----------
+    steps : list of dict
+        The column steps of a plan.
+
+    Returns
+    ----------
+    dict
+        The list of segments per column index, in the order of the steps.
+    """
+
+    segments = {}
+    for step in steps:
+        column_segments = segments.setdefault(step['column_index'], [])
+
+        if step['operation'] not in _VALUE_OPERATIONS:
+            column_segments.append((step['operation'], step))
+        elif column_segments and column_segments[-1][0] == 'values':
+            column_segments[-1][1].append(step)
+        else:
+            column_segments.append(('values', [step]))
+
+    return segments
+
+
+def needs_statistics(kind: str, content) -> bool:
+    """
+    Checks whether a segment depends on all values of its column: suppress_float on the mean and suppress_values on
+    the frequencies and the suppression token.
+    """
+    return kind == 'suppress_float' or (kind == 'values' and any(step['operation'] == 'suppress_values'
+                                                                 for step in content))
+
+
+def apply_column_segments(df: pd.DataFrame, segments: Dict[int, List[Tuple[str, object]]], compact: bool = False,
+                          statistics: dict = None) -> Dict[int, int]:
+    """
+    Applies the segments of column steps to a dataframe in place.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to anonymize.
+    segments : dict
+        The segments per column index, see get_column_segments.
+    compact : bool
+        Whether to store the changed columns as Categorical.
+    statistics : dict, optional
+        Precomputed statistics per (column index, segment position), the mean for suppress_float and the mapping for
+        value segments, e.g. of the whole dataset when the dataframe is one chunk of it. By default, they are
+        computed from the dataframe.
+
+    Returns
+    ----------
+    dict
+        The number of changed cells per column index.
+    """
+
+    statistics = statistics or {}
+    cells_changed = {}
+
+    for j, column_segments in segments.items():
+        cells_changed[j] = 0
+
+        for position, (kind, content) in enumerate(column_segments):
+            if kind == 'discretize':
+                cells_changed[j] += int(df.iloc[:, j].notna().sum())
+                discretize(df, j, content['interval_length'], compact)
+
+            elif kind == 'suppress_float':
+                cells_changed[j] += len(df)
+                if (j, position) in statistics:
+                    # as suppress_float, with the mean of the whole dataset
+                    df.isetitem(j, pd.Series(statistics[(j, position)], index=df.index, name=df.columns[j]))
+                else:
+                    suppress_float(df, j)
+
+            else:
+                mapping = statistics.get((j, position))
+                if mapping is None:
+                    mapping = fuse_value_steps(count_values(df.iloc[:, j]), content)
+
+                column, n_changed = generalize_column(df.iloc[:, j], mapping, compact)
+                if n_changed > 0 or compact:
+                    df.isetitem(j, column)
+                cells_changed[j] += n_changed
+
+    return cells_changed
+
+
+def count_values(column: pd.Series) -> dict:
+    """
+    Counts the records per distinct value of a column, missing values are not counted.
+    """
+    codes, uniques = factorize_column(column)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return {value: int(count) for value, count in zip(uniques, counts) if count > 0}
+
+
+def fuse_value_steps(counts: dict, steps: List[dict]) -> dict:
+    """
+    Follows the distinct values of a column through consecutive generalize and suppress_values steps and returns one
+    mapping of the original values, which applies all steps at once with generalize_column.
+
+    Parameters
+    ----------
+    counts : dict
+        The number of records per distinct value of the column, see count_values.
+    steps : list of dict
+        The value steps.
+
+    Returns
+    ----------
+    dict
+        The final value per changed original value.
+    """
+
+    current = {value: value for value in counts}
+
+    for step in steps:
+        if step['operation'] == 'generalize':
+            mapping = get_generalization_mapping(step['rules'])
+            current = {value: mapping.get(generalized, generalized) for value, generalized in current.items()}
+            continue
+
+        # the frequencies and the suppression token of the values after the previous steps
+        frequencies = {}
+        for value, generalized in current.items():
+            frequencies[generalized] = frequencies.get(generalized, 0) + counts[value]
+        token = _get_suppression_token(frequencies)
+
+        suppressed = set(step['values'])
+        if step['min_frequency'] is not None:
+            suppressed.update(value for value, frequency in frequencies.items() if frequency < step['min_frequency'])
+
+        current = {value: token if generalized in suppressed else generalized for value, generalized in current.items()}
+
+    return {value: generalized for value, generalized in current.items() if generalized != value}
+
+
+def get_report(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int],
+               ec_index: EquivalenceClassIndex = None, references: dict = None) -> dict:
+    """
+    Measures the privacy of a dataframe on one shared equivalence class index.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The anonymized dataframe.
+    qa_indices : list of int
+        The indices of the QI columns.
+    sa_indices : list of int
+        The indices of the sensitive attribute columns.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+    references : dict, optional
+        The reference distribution per sensitive attribute index for t, see calculate_closenesses.
+
+    Returns
+    ----------
+    dict
+        The number of records 'n_records', 'k', 'l' (distinct l-diversity) and 't' (the maximum t-closeness over all
+        sensitive attributes), None if not measurable.
+    """
+
+    report = {'n_records': len(df), 'k': None, 'l': None, 't': None}
+
+    if not qa_indices:
+        return report
+
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+    report['k'] = int(ec_index.sizes.min()) if ec_index.n_groups > 0 else 0
+
+    if sa_indices and ec_index.n_groups > 0:
+        report['l'] = int(get_diversities(df, qa_indices, sa_indices, ec_index).min())
+        references = references or {}
+        report['t'] = max(calculate_closenesses(ec_index, df.iloc[:, j], is_numerical(df.iloc[:, j]),
+                                                reference=references.get(j))[0] for j in sa_indices)
+
+    return report
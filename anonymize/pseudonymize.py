@@ -0,0 +1,266 @@
+import hashlib
+import hmac
+from typing import Iterable, List, Union
+import numpy as np
+import pandas as pd
+
+from anonymetrics.streaming import read_chunks
+from anonymize.generalize import _object_array
+from anonymize.streaming import _ChunkWriter
+
+_TOKEN_FORMATS = ('hex', 'preserve')
+
+# the character ranges whose characters are replaced by characters of the same range in the format-preserving tokens
+_CHARACTER_RANGES = ((ord('0'), 10), (ord('a'), 26), (ord('A'), 26))
+
+
+class Pseudonymizer:
+    """
+    Replaces the values of identifier columns by pseudonyms derived from a secret key with HMAC.
+
+    Every distinct value is hashed once, the tokens are kept in a token table, so the same value gets the same token in
+    every column and batch it is pseudonymized in. Tokens are unique: a token which is already taken by another value
+    is derived again with the next attempt number. Values are hashed in their text form, where integral numbers are
+    written without decimals, so 42, 42.0 and '42' share a token.
+
+    Since the token of a colliding value depends on the order the values are seen in, the token table should be saved
+    with get_token_table and passed to the next pseudonymizer to get the same tokens in a later run.
+
+    Parameters
+    ----------
+    key : bytes or str
+        The secret key.
+    token_format : str
+        'hex' for hexadecimal tokens of the given length, or 'preserve' for tokens of the same length as the value,
+        where every digit, lower case and upper case letter is replaced by a character of the same kind and all other
+        characters are kept.
+    length : int
+        The length of the hexadecimal tokens.
+    digestmod : str
+        The name of the hash function of the HMAC.
+    token_table : pd.DataFrame, optional
+        The token table of an earlier run with the columns 'value' and 'token'.
+    """
+
+    def __init__(self, key: Union[bytes, str], token_format: str = 'hex', length: int = 16,
+                 digestmod: str = 'sha256', token_table: pd.DataFrame = None):
+        if isinstance(key, str):
+            key = key.encode()
+        if not key:
+            raise ValueError("The key must not be empty.")
+        if token_format not in _TOKEN_FORMATS:
+            raise ValueError(f"Unknown token format {token_format!r}, expected one of {_TOKEN_FORMATS}.")
+
+        self.digest_size = hashlib.new(digestmod).digest_size
+        if token_format == 'hex' and not 0 < length <= 2 * self.digest_size:
+            raise ValueError(f"The token length must be between 1 and {2 * self.digest_size}.")
+
+        self._key = key
+        self.token_format = token_format
+        self.length = length
+        self.digestmod = digestmod
+
+        # the token per value text and the set of taken tokens
+        self.tokens = {}
+        self._taken = set()
+
+        if token_table is not None:
+            self.load_token_table(token_table)
+
+    def _hash(self, texts: List[str], attempt: int) -> List[str]:
+        # derives the tokens of the given texts for an attempt number
+        if self.token_format == 'hex':
+            prefix = b'%d:0:' % attempt
+            return [hmac.digest(self._key, prefix + text.encode(), self.digestmod).hex()[:self.length]
+                    for text in texts]
+
+        # one digest byte per character, the texts are handled as a matrix of code points
+        array = np.array(texts, dtype=str)
+        width = max(array.dtype.itemsize // 4, 1)
+        array = array.astype(f'U{width}')
+
+        n_blocks = -(-width // self.digest_size)
+        blocks = []
+        for block in range(n_blocks):
+            prefix = b'%d:%d:' % (attempt, block)
+            digests = b''.join(hmac.digest(self._key, prefix + text.encode(), self.digestmod) for text in texts)
+            blocks.append(np.frombuffer(digests, dtype=np.uint8).reshape(len(texts), self.digest_size))
+        randoms = np.hstack(blocks)[:, :width].astype(np.uint32)
+
+        characters = array.view(np.uint32).reshape(len(texts), width).copy()
+        for start, size in _CHARACTER_RANGES:
+            in_range = (characters >= start) & (characters < start + size)
+            characters[in_range] = start + randoms[in_range] % size
+
+        return characters.view(f'U{width}').ravel().tolist()
+
+    def _add_tokens(self, texts: List[str]):
+        # derives unique tokens for new value texts, colliding ones are derived again with the next attempt number
+        pending = texts
+        attempt = 0
+        while pending:
+            colliding = []
+            for text, token in zip(pending, self._hash(pending, attempt)):
+                if token in self._taken:
+                    colliding.append(text)
+                else:
+                    self.tokens[text] = token
+                    self._taken.add(token)
+
+            pending = colliding
+            attempt += 1
+            if attempt > 1000 and pending:
+                raise ValueError(f"No unique token found for {len(pending)} values, the token space is too small.")
+
+    def transform(self, column: pd.Series) -> pd.Series:
+        """
+        Pseudonymizes a column. Missing values are kept.
+
+        Parameters
+        ----------
+        column : pd.Series
+            The column to pseudonymize.
+
+        Returns
+        ----------
+        pd.Series
+            The column of tokens, a Categorical column stays Categorical.
+        """
+
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = column.array.codes
+            uniques = column.array.categories.to_numpy()
+        else:
+            codes, uniques = pd.factorize(column.to_numpy())
+
+        texts = _get_texts(uniques)
+        tokens = [self.tokens.get(text) for text in texts]
+
+        new_positions = [position for position, token in enumerate(tokens) if token is None]
+        if new_positions:
+            self._add_tokens(list(dict.fromkeys(texts[position] for position in new_positions)))
+            for position in new_positions:
+                tokens[position] = self.tokens[texts[position]]
+
+        tokens = _object_array(tokens)
+
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # distinct categories with the same text share a category
+            category_codes, categories = pd.factorize(tokens)
+            values = pd.Categorical.from_codes(np.append(category_codes, -1)[codes], categories=pd.Index(categories))
+        else:
+            values = np.append(tokens, np.nan)[codes]
+
+        return pd.Series(values, index=column.index, name=column.name)
+
+    def pseudonymize(self, df: pd.DataFrame, column_indices: List[int]) -> int:
+        """
+        Pseudonymizes columns of a dataframe in place. The columns share the token table, so a value gets the same
+        token in all of them.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The dataframe to pseudonymize.
+        column_indices : list of int
+            The indices of the identifier columns.
+
+        Returns
+        ----------
+        int
+            The number of pseudonymized cells.
+        """
+
+        n_cells = 0
+        for column_index in column_indices:
+            column = df.iloc[:, column_index]
+            df.isetitem(column_index, self.transform(column))
+            n_cells += int(column.notna().sum())
+
+        return n_cells
+
+    def get_token_table(self) -> pd.DataFrame:
+        """
+        Returns the token table with the columns 'value' and 'token', holding the text form of every pseudonymized
+        value.
+        """
+
+        return pd.DataFrame({'value': list(self.tokens), 'token': list(self.tokens.values())}, dtype=object)
+
+    def load_token_table(self, token_table: pd.DataFrame):
+        """
+        Adds the tokens of a token table, e.g. of an earlier run. The tokens must be unique.
+
+        Parameters
+        ----------
+        token_table : pd.DataFrame
+            The token table with the columns 'value' and 'token'.
+        """
+
+        tokens = dict(zip(_get_texts(token_table['value'].to_numpy()), token_table['token'].astype(str)))
+
+        new_tokens = {text: token for text, token in tokens.items() if text not in self.tokens}
+        conflicting = any(self.tokens[text] != token for text, token in tokens.items() if text in self.tokens)
+
+        if conflicting or len(set(new_tokens.values())) < len(new_tokens) or \
+                not self._taken.isdisjoint(new_tokens.values()):
+            raise ValueError("The token table contradicts the tokens of the pseudonymizer or holds duplicate tokens.")
+
+        self.tokens.update(new_tokens)
+        self._taken.update(new_tokens.values())
+
+
+def _get_texts(values: np.ndarray) -> List[str]:
+    # the text form of values, integral numbers without decimals
+    if values.dtype.kind in 'iu':
+        return list(map(str, values.tolist()))
+    if values.dtype.kind == 'f' and np.all(np.mod(values, 1) == 0):
+        return list(map(str, values.astype(np.int64).tolist()))
+    return [_get_text(value) for value in values]
+
+
+def _get_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def pseudonymize_streaming(pseudonymizer: Pseudonymizer, source: Union[str, Iterable[pd.DataFrame]],
+                           destination: str, column_indices: List[int], chunksize: int = 100000,
+                           **read_kwargs) -> int:
+    """
+    Pseudonymizes identifier columns of a dataset chunk by chunk and writes the result incrementally. The token table
+    of the pseudonymizer is shared by all chunks.
+
+    Parameters
+    ----------
+    pseudonymizer : Pseudonymizer
+        The pseudonymizer holding the key and the token table.
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet file, or an iterable of DataFrames holding consecutive records.
+    destination : str
+        The path of the CSV or Parquet (.parquet, .pq) output file.
+    column_indices : list of int
+        The indices of the identifier columns.
+    chunksize : int
+        The number of records per chunk.
+    **read_kwargs
+        Further arguments for pandas.read_csv.
+
+    Returns
+    ----------
+    int
+        The number of pseudonymized cells.
+    """
+
+    n_cells = 0
+    writer = _ChunkWriter(destination)
+    for chunk in read_chunks(source, chunksize=chunksize, **read_kwargs):
+        chunk = chunk.copy()
+        n_cells += pseudonymizer.pseudonymize(chunk, column_indices)
+        writer.write(chunk)
+    writer.close()
+
+    return n_cells
@@ -0,0 +1,410 @@
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, List, Union
+import numpy as np
+import pandas as pd
+
+from anonymetrics.streaming import read_chunks
+from anonymize.plan import AnonymizationPlan, get_column_segments, needs_statistics, apply_column_segments, \
+    count_values, fuse_value_steps, _COLUMN_OPERATIONS
+
+# the steps that can be decided on the group counts of the streaming pass
+_STREAMING_REMOVALS = ('remove_groups', 'remove_groups_with_diversity_smaller_l')
+
+# groups are identified by two independent 64 bit hashes, the second one with a key of its own
+_GROUP_KEY = np.dtype([('high', np.uint64), ('low', np.uint64)])
+_SECOND_HASH_KEY = 'anonymize-groups'
+
+
+def hash_values(chunk: pd.DataFrame, hash_key: str = None) -> np.ndarray:
+    """
+    Hashes the values of every record to 64 bit, independently of the chunk the record is read in. Numbers are
+    hashed as floats, as their dtype may differ between chunks, and frozensets independently of their order.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        The columns to hash.
+    hash_key : str, optional
+        A key of 16 characters for an independent hash function, by default the key of pandas.util.hash_pandas_object.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The uint64 hash per record.
+    """
+
+    hash_kwargs = {'hash_key': hash_key} if hash_key is not None else {}
+
+    hashes = {}
+    for column_position in range(chunk.shape[1]):
+        # hash the canonical form of the distinct values only
+        codes, uniques = pd.factorize(chunk.iloc[:, column_position].to_numpy())
+        keys = pd.Series([_canonical(value) for value in uniques], dtype=object)
+        unique_hashes = pd.util.hash_pandas_object(keys, index=False, **hash_kwargs).to_numpy()
+        hashes[column_position] = np.append(unique_hashes, np.uint64(0))[codes]
+
+    return pd.util.hash_pandas_object(pd.DataFrame(hashes), index=False, **hash_kwargs).to_numpy()
+
+
+def _is_grouped(group_keys: np.ndarray) -> np.ndarray:
+    # the key 0 marks the records with a missing QI value
+    return group_keys != np.zeros((), dtype=_GROUP_KEY)
+
+
+def _canonical(value) -> str:
+    if isinstance(value, frozenset):
+        return 'frozenset' + repr(sorted(_canonical(member) for member in value))
+    if isinstance(value, tuple):
+        return repr(tuple(_canonical(member) for member in value))
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+        return repr(float(value))
+    return repr(value)
+
+
+class _ChunkWriter:
+    # appends chunks to a CSV or Parquet file
+    def __init__(self, destination: str):
+        self.destination = destination
+        self._parquet = destination.endswith(('.parquet', '.pq'))
+        self._writer = None
+        self._schema = None
+        self._first = True
+
+    def write(self, chunk: pd.DataFrame):
+        if not self._parquet:
+            chunk.to_csv(self.destination, mode='w' if self._first else 'a', header=self._first, index=False)
+            self._first = False
+            return
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Writing Parquet files requires pyarrow.") from e
+
+        # tuples, frozensets and intervals are written as their string representation
+        chunk = chunk.copy()
+        for j in range(chunk.shape[1]):
+            if chunk.iloc[:, j].dtype == object or isinstance(chunk.iloc[:, j].dtype, pd.CategoricalDtype):
+                values = chunk.iloc[:, j].astype(object)
+                chunk.isetitem(j, values.where(values.isna(), values.astype(str)))
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(self.destination, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif self._first and not self._parquet:
+            open(self.destination, 'w').close()
+
+
+def _collect_statistics(plan: AnonymizationPlan, segments: dict, source, chunksize: int,
+                        **read_kwargs) -> dict:
+    # the statistics of the whole dataset needed by the column segments, from one pass over the dataset
+    needed = [(j, position) for j, column_segments in segments.items()
+              for position, (kind, content) in enumerate(column_segments) if needs_statistics(kind, content)]
+
+    if not needed:
+        return {}
+
+    for j, position in needed:
+        previous = [kind for kind, _ in segments[j][:position]]
+        if 'suppress_float' in previous:
+            raise ValueError(f"Column {j}: values cannot be suppressed after suppress_float in streaming mode.")
+
+    sums = {}
+    counts = {}
+
+    for chunk in read_chunks(source, None, chunksize, **read_kwargs):
+        for j, position in needed:
+            kind, content = segments[j][position]
+
+            if kind == 'suppress_float':
+                values = chunk.iloc[:, j].to_numpy()
+                total, n = sums.get((j, position), (0.0, 0))
+                sums[(j, position)] = (total + np.sum(values), n + len(values))
+                continue
+
+            # the values of the column before the segment
+            column = chunk.iloc[:, [j]].copy()
+            apply_column_segments(column, {0: segments[j][:position]}, plan.compact)
+
+            column_counts = counts.setdefault((j, position), {})
+            for value, count in count_values(column.iloc[:, 0]).items():
+                column_counts[value] = column_counts.get(value, 0) + count
+
+    statistics = {key: total / n if n > 0 else np.nan for key, (total, n) in sums.items()}
+    for (j, position), column_counts in counts.items():
+        statistics[(j, position)] = fuse_value_steps(column_counts, segments[j][position][1])
+
+    return statistics
+
+
+class _GroupTable:
+    """
+    The size and the diversity of every group, counted from 128 bit group keys and 64 bit hashes of the sensitive
+    values that are spilled to memory-mapped files. The keys are partitioned into buckets by their leading bits, so
+    only one bucket is held in memory.
+    """
+
+    def __init__(self, directory: str, n_sensitive: int):
+        self.directory = directory
+        self.n_sensitive = n_sensitive
+        self.n_records = 0
+        self._files = [open(os.path.join(directory, 'groups.bin'), 'wb')] + \
+                      [open(os.path.join(directory, f'sensitive_{i}.bin'), 'wb') for i in range(n_sensitive)]
+        self._dtypes = [_GROUP_KEY] + [np.dtype(np.uint64)] * n_sensitive
+        self._bits = 0
+
+    def append(self, group_keys: np.ndarray, sensitive_hashes: List[np.ndarray]):
+        for file, dtype, hashes in zip(self._files, self._dtypes, [group_keys] + sensitive_hashes):
+            np.ascontiguousarray(hashes, dtype=dtype).tofile(file)
+        self.n_records += len(group_keys)
+
+    def _bucket(self, group_keys: np.ndarray) -> np.ndarray:
+        if self._bits == 0:
+            return np.zeros(len(group_keys), dtype=np.int64)
+        return (group_keys['high'] >> np.uint64(64 - self._bits)).astype(np.int64)
+
+    def build(self, bucket_size: int, chunksize: int):
+        """
+        Partitions the records into buckets of about bucket_size records and counts every bucket.
+        """
+        for file in self._files:
+            file.close()
+
+        while (self.n_records >> self._bits) > bucket_size and self._bits < 32:
+            self._bits += 1
+        n_buckets = 1 << self._bits
+
+        arrays = [np.memmap(file.name, dtype=dtype, mode='r', shape=(self.n_records,)) if self.n_records > 0
+                  else np.zeros(0, dtype=dtype) for file, dtype in zip(self._files, self._dtypes)]
+
+        # one pass distributing the hashes to the bucket files
+        names = [[os.path.join(self.directory, f'bucket_{b}_{i}.bin') for i in range(len(arrays))]
+                 for b in range(n_buckets)]
+        bucket_files = [[open(name, 'wb') for name in bucket_names] for bucket_names in names]
+
+        for start in range(0, self.n_records, chunksize):
+            group_keys = np.asarray(arrays[0][start:start + chunksize])
+            buckets = self._bucket(group_keys)
+            order = np.argsort(buckets, kind='stable')
+            bounds = np.searchsorted(buckets[order], np.arange(n_buckets + 1))
+
+            for i, array in enumerate(arrays):
+                block = np.asarray(array[start:start + chunksize])[order]
+                for b in np.flatnonzero(np.diff(bounds)):
+                    block[bounds[b]:bounds[b + 1]].tofile(bucket_files[b][i])
+
+        for files in bucket_files:
+            for file in files:
+                file.close()
+        del arrays
+
+        # one bucket at a time in memory
+        self._keys = []
+        for b, bucket_names in enumerate(names):
+            hashes = [np.fromfile(name, dtype=dtype) for name, dtype in zip(bucket_names, self._dtypes)]
+            keys, group_codes, sizes = np.unique(hashes[0], return_inverse=True, return_counts=True)
+
+            diversities = np.full(len(keys), np.iinfo(np.int64).max, dtype=np.int64)
+            for sensitive_hashes in hashes[1:]:
+                # the number of distinct (group, sensitive value) pairs per group
+                valid = sensitive_hashes != 0
+                codes = group_codes[valid]
+                values = sensitive_hashes[valid]
+                order = np.lexsort((values, codes))
+                codes = codes[order]
+                values = values[order]
+                first = np.ones(len(codes), dtype=bool)
+                first[1:] = (codes[1:] != codes[:-1]) | (values[1:] != values[:-1])
+                diversities = np.minimum(diversities, np.bincount(codes[first], minlength=len(keys)))
+
+            for name in bucket_names:
+                os.remove(name)
+
+            np.save(os.path.join(self.directory, f'keys_{b}.npy'), keys)
+            np.save(os.path.join(self.directory, f'sizes_{b}.npy'), sizes)
+            np.save(os.path.join(self.directory, f'diversities_{b}.npy'), diversities)
+            self._keys.append(b)
+
+    def get_groups(self):
+        """
+        Yields the keys, sizes and diversities of the groups bucket by bucket, as memory-mapped arrays.
+        """
+        for b in self._keys:
+            yield tuple(np.load(os.path.join(self.directory, f'{name}_{b}.npy'), mmap_mode='r')
+                        for name in ('keys', 'sizes', 'diversities'))
+
+    def save_dropped(self, drop_functions):
+        """
+        Marks the groups to drop per bucket, the union of the masks of all drop functions.
+        """
+        self._dropped = []
+        for b, (keys, sizes, diversities) in zip(self._keys, self.get_groups()):
+            drop = np.zeros(len(keys), dtype=bool)
+            for drop_function in drop_functions:
+                drop |= drop_function(np.asarray(sizes), np.asarray(diversities))
+            path = os.path.join(self.directory, f'dropped_{b}.npy')
+            np.save(path, drop)
+            self._dropped.append(path)
+
+    def lookup_dropped(self, group_keys: np.ndarray) -> np.ndarray:
+        """
+        Returns for every record whether its group is dropped.
+        """
+        buckets = self._bucket(group_keys)
+        dropped = np.zeros(len(group_keys), dtype=bool)
+
+        for b in np.unique(buckets):
+            keys = np.load(os.path.join(self.directory, f'keys_{b}.npy'), mmap_mode='r')
+            drop = np.load(self._dropped[b], mmap_mode='r')
+            in_bucket = buckets == b
+            dropped[in_bucket] = drop[np.searchsorted(keys, group_keys[in_bucket])]
+
+        return dropped
+
+
+def run_plan_streaming(plan: AnonymizationPlan, source: Union[str, Iterable[pd.DataFrame]], destination: str,
+                       chunksize: int = 100000, bucket_size: int = 2 ** 24, workdir: str = None,
+                       **read_kwargs) -> dict:
+    """
+    Runs an anonymization plan on a dataset chunk by chunk and writes the result incrementally, so the memory stays
+    bounded by the chunk size and the number of distinct values of the suppressed columns, independently of the
+    number of records.
+
+    The column steps are applied per chunk. Statistics of the whole dataset (the mean for suppress_float, the value
+    frequencies and suppression tokens for suppress_values) are collected in a first pass. Group removals
+    (remove_groups and remove_groups_with_diversity_smaller_l, at the end of the plan) need the size and diversity
+    of every group: a counting pass spills a 128 bit key of the QI values, made of two independent 64 bit hashes, and
+    64 bit hashes of the sensitive values of every record to files in workdir, which are counted bucket by bucket
+    through memory maps, and the output pass drops the records of the removed groups. Two groups only merge if both
+    hashes collide. A collision of sensitive values can only lower the diversity of a group, so more groups are
+    removed, not fewer. The source is read once per pass.
+
+    Parameters
+    ----------
+    plan : AnonymizationPlan
+        The plan to run, which holds column steps followed by group removals.
+    source : str or iterable of pandas DataFrame
+        The path of a CSV or Parquet file, or a re-iterable collection of DataFrames holding consecutive records.
+    destination : str
+        The path of the CSV or Parquet (.parquet, .pq) output file.
+    chunksize : int
+        The number of records per chunk.
+    bucket_size : int
+        The number of group keys counted in memory at once.
+    workdir : str, optional
+        The directory of the intermediate files, by default a temporary directory.
+    **read_kwargs
+        Further arguments for pandas.read_csv.
+
+    Returns
+    ----------
+    dict
+        The report of the run as by AnonymizationPlan.run, with 't' = None.
+    """
+
+    first_removal = next((position for position, step in enumerate(plan.steps)
+                          if step['operation'] not in _COLUMN_OPERATIONS), len(plan.steps))
+    column_steps = plan.steps[:first_removal]
+    removal_steps = plan.steps[first_removal:]
+
+    for step in removal_steps:
+        if step['operation'] not in _STREAMING_REMOVALS:
+            raise ValueError(f"Operation {step['operation']!r} is not supported in streaming mode, only column steps "
+                             f"followed by {' and '.join(_STREAMING_REMOVALS)}.")
+
+    plan.validate()
+    segments = get_column_segments(column_steps)
+    statistics = _collect_statistics(plan, segments, source, chunksize, **read_kwargs)
+
+    def transformed_chunks():
+        for chunk in read_chunks(source, None, chunksize, **read_kwargs):
+            # DataFrame sources are read once per pass, so their chunks must not be changed
+            chunk = chunk.copy()
+            cells_changed = apply_column_segments(chunk, segments, plan.compact, statistics)
+            yield chunk, cells_changed
+
+    report = {'rows_removed': 0, 'cells_changed': {}, 'n_records': 0, 'k': None, 'l': None, 't': None}
+    directory = tempfile.mkdtemp(dir=workdir)
+
+    try:
+        table = None
+        if plan.qa_indices:
+            # counting pass
+            table = _GroupTable(directory, len(plan.sa_indices))
+            for chunk, _ in transformed_chunks():
+                table.append(*_get_hashes(chunk, plan))
+            table.build(bucket_size, chunksize)
+
+            drop_functions = []
+            for step in removal_steps:
+                if step['operation'] == 'remove_groups':
+                    drop_functions.append(lambda sizes, diversities, k=step['k']: sizes < k)
+                else:
+                    drop_functions.append(lambda sizes, diversities, l=step['l']: diversities < l)
+            table.save_dropped(drop_functions)
+
+        # output pass
+        writer = _ChunkWriter(destination)
+        for chunk, cells_changed in transformed_chunks():
+            for j, n_changed in cells_changed.items():
+                report['cells_changed'][j] = report['cells_changed'].get(j, 0) + n_changed
+
+            if table is not None and removal_steps:
+                group_keys, _ = _get_hashes(chunk, plan, sensitive=False)
+                dropped = table.lookup_dropped(group_keys) & _is_grouped(group_keys)
+                report['rows_removed'] += int(np.count_nonzero(dropped))
+                chunk = chunk[~dropped]
+
+            report['n_records'] += len(chunk)
+            writer.write(chunk)
+        writer.close()
+
+        if table is not None:
+            report.update(_get_group_report(table, plan))
+
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return report
+
+
+def _get_hashes(chunk: pd.DataFrame, plan: AnonymizationPlan, sensitive: bool = True):
+    # the group key per record (0 for records with a missing QI value) and the hashes of the sensitive values
+    grouped = chunk.iloc[:, plan.qa_indices].notna().all(axis=1).to_numpy()
+    group_keys = np.zeros(len(chunk), dtype=_GROUP_KEY)
+    group_keys['high'] = hash_values(chunk.iloc[:, plan.qa_indices])
+    group_keys['low'] = hash_values(chunk.iloc[:, plan.qa_indices], _SECOND_HASH_KEY)
+    group_keys[~grouped] = 0
+
+    sensitive_hashes = []
+    for j in plan.sa_indices if sensitive else []:
+        hashes = hash_values(chunk.iloc[:, [j]])
+        hashes[chunk.iloc[:, j].isna().to_numpy() | ~grouped] = 0
+        sensitive_hashes.append(hashes)
+
+    return group_keys, sensitive_hashes
+
+
+def _get_group_report(table: _GroupTable, plan: AnonymizationPlan) -> Dict[str, int]:
+    # k and l over the groups that are kept, the key 0 marks the records without group
+    k = None
+    l = None
+
+    for (keys, sizes, diversities), dropped_path in zip(table.get_groups(), table._dropped):
+        kept = ~np.load(dropped_path) & _is_grouped(np.asarray(keys))
+        if kept.any():
+            k = min(k, int(sizes[kept].min())) if k is not None else int(sizes[kept].min())
+            if plan.sa_indices:
+                bucket_l = int(diversities[kept].min())
+                l = min(l, bucket_l) if l is not None else bucket_l
+
+    return {'k': k if k is not None else 0, 'l': l if plan.sa_indices else None}
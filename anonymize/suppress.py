@@ -1,8 +1,9 @@
-from typing import List
+from typing import Dict, List
 import numpy as np
 import pandas as pd
-from anonymetrics.anonymetrics import get_groups, calculate_l_diversity, \
-    calculate_sensitive_attr_prob_dist, emd_categorical
+from anonymetrics.anonymetrics import get_diversities, get_closenesses, calculate_closenesses, is_numerical
+from anonymetrics.groupindex import EquivalenceClassIndex, get_equivalence_class_index, factorize_column
+from anonymize.generalize import generalize_column
 
 
 def suppress_float(df: pd.DataFrame, column_index: int):
@@ -25,10 +26,14 @@ def suppress_float(df: pd.DataFrame, column_index: int):
     df.iloc[:, column_index] = mean
 
 
-def suppress_categorical(df: pd.DataFrame, attribute_value: str, column_index: int):
+def suppress_categorical(df: pd.DataFrame, attribute_value: str, column_index: int, compact: bool = False):
     """
     Suppresses specified categorical attribute values in the given dataframe by replacing them with a common value.
 
+    The common value is the frozenset of all values of the column, where values already generalized to frozensets
+    contribute their members, as in suppress_categorical_values. Categorical columns stay Categorical and compact=True
+    converts object columns, see generalize_categorical. To suppress many values, use suppress_categorical_values.
+
     Parameters
     -----------
     df : pandas DataFrame
@@ -37,30 +42,87 @@ def suppress_categorical(df: pd.DataFrame, attribute_value: str, column_index: i
         The value that should be suppressed.
     column_index : int
         The column index, where values should be suppressed.
+    compact : bool
+        Whether to store the column as Categorical.
     """
 
-    # get the column name from its index
-    column_name = df.columns[column_index]
+    suppress_categorical_values(df, {column_index: [attribute_value]}, compact=compact)
 
-    # get unique values in the column
-    unique_values = df[column_name].unique()
 
-    frozenset_value = [val for val in unique_values if isinstance(val, frozenset)]
+def suppress_categorical_values(df: pd.DataFrame, values: Dict[int, List] = None, min_frequency: int = None,
+                                column_indices: List[int] = None, compact: bool = False) -> Dict[int, int]:
+    """
+    Suppresses many categorical values in several columns at once. All values of a column are replaced by one common
+    value, the frozenset of all values of the column, in one pass over the column, see generalize_column.
 
-    unique_values = [val for val in unique_values if not isinstance(val, frozenset)]
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input dataframe.
+    values : dict, optional
+        The values to suppress per column index, e.g. {13: ['Cuba', 'Jamaica']}.
+    min_frequency : int, optional
+        Values occurring in fewer than min_frequency records of a column are suppressed as well.
+    column_indices : list of int, optional
+        The columns to which min_frequency applies. By default, the columns in values.
+    compact : bool
+        Whether to store the changed columns as Categorical.
+
+    Returns
+    -----------
+    dict
+        The number of suppressed cells per column index.
+    """
 
-    print(frozenset_value)
+    values = values or {}
 
-    if len(frozenset_value) != 0:
-        df.loc[df[column_name] == attribute_value, column_name] \
-            = [frozenset_value[0]] * len(df[df[column_name] == attribute_value])
-    else:
-        # replace attribute_value with unique_values
-        df.loc[df[column_name] == attribute_value, column_name] \
-            = [frozenset(unique_values)] * len(df[df[column_name] == attribute_value])
+    if min_frequency is None and len(values) == 0:
+        raise ValueError("Either values or min_frequency must be given.")
+
+    if column_indices is None:
+        column_indices = list(values)
+
+    n_changed = {}
+    for j in dict.fromkeys(list(values) + (list(column_indices) if min_frequency is not None else [])):
+        column = df.iloc[:, j]
+
+        # the distinct values and their frequencies in one pass
+        counts = column.value_counts(sort=False)
+        counts = counts[counts > 0]
+        token = _get_suppression_token(counts.index)
+
+        suppressed = set(values.get(j, []))
+        if min_frequency is not None and j in column_indices:
+            suppressed.update(counts.index[counts < min_frequency])
 
+        column, n_changed[j] = generalize_column(column, {value: token for value in suppressed}, compact)
+        if n_changed[j] > 0 or compact:
+            df.isetitem(j, column)
 
-def remove_groups(df: pd.DataFrame, qa_indices: List[int], k: int):
+    return n_changed
+
+
+def _drop_groups(df: pd.DataFrame, ec_index: EquivalenceClassIndex, drop: np.ndarray) -> dict:
+    # Drop the rows of all groups marked in drop with one boolean mask and summarize the result
+    rows = ec_index.broadcast(drop, fill_value=False)
+
+    if rows.any():
+        # drop by position on a temporary RangeIndex, which also works for duplicate labels
+        index = df.index
+        df.reset_index(drop=True, inplace=True)
+        df.drop(np.flatnonzero(rows), inplace=True)
+        df.index = index[~rows]
+
+    kept_sizes = ec_index.sizes[~drop]
+
+    return {'rows_removed': int(np.count_nonzero(rows)),
+            'groups_removed': int(np.count_nonzero(drop)),
+            'k': int(kept_sizes.min()) if len(kept_sizes) > 0 else 0,
+            'l': None,
+            't': None}
+
+
+def remove_groups(df: pd.DataFrame, qa_indices: List[int], k: int, ec_index: EquivalenceClassIndex = None) -> dict:
     """
     Removes records in df, that are part of groups with < k records.
 
@@ -72,67 +134,324 @@ def remove_groups(df: pd.DataFrame, qa_indices: List[int], k: int):
         A list of column names to group by.
     k : int
         The desired k to obtain k-anonymity.
-    """
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
 
-    groups = get_groups(df, qa_indices)
+    Returns
+    -----------
+    dict
+        The number of 'rows_removed' and 'groups_removed' and the resulting 'k'.
+    """
 
-    # Collect the indices of all small groups
-    small_group_indices = [group.index for group in groups if len(group) < k]
-    small_group_indices = [index for sublist in small_group_indices for index in sublist]
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
 
     # Drop rows from small groups
-    df.drop(small_group_indices, inplace=True)
+    return _drop_groups(df, ec_index, ec_index.sizes < k)
 
 
-def remove_groups_with_diversity_smaller_l(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int], l: int):
+def remove_groups_with_diversity_smaller_l(df: pd.DataFrame, qa_indices: List[int], sa_indices: List[int], l: int,
+                                           ec_index: EquivalenceClassIndex = None) -> dict:
     """
     Removes records in df, that are part of groups with < l diversity.
 
     Parameters
     -----------
-    sa_indices : ...
     df : pandas DataFrame
         The input dataframe.
     qa_indices : list of int
         A list of column names to group by.
+    sa_indices : list of int
+        A list of the indices of the sensitive attribute columns.
     l : int
         The minimum l.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    dict
+        The number of 'rows_removed' and 'groups_removed' and the resulting 'k' and 'l'.
     """
 
-    groups = get_groups(df, qa_indices)
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+    diversities = get_diversities(df, qa_indices, sa_indices, ec_index)
 
-    # Collect the indices of all small groups
-    small_group_indices = [group.index for group in groups if calculate_l_diversity(group, qa_indices, sa_indices) < l]
-    small_group_indices = [index for sublist in small_group_indices for index in sublist]
+    # Drop rows from groups with low diversity
+    drop = diversities < l
+    summary = _drop_groups(df, ec_index, drop)
+    summary['l'] = int(diversities[~drop].min()) if not drop.all() else 0
 
-    # Drop rows from small groups
-    df.drop(small_group_indices, inplace=True)
+    return summary
 
 
-def remove_groups_with_closeness_higher_t(df: pd.DataFrame, qa_indices: List[int], sa_index: int, t: float):
+def remove_groups_with_closeness_higher_t(df: pd.DataFrame, qa_indices: List[int], sa_index: int, t: float,
+                                          ec_index: EquivalenceClassIndex = None) -> dict:
     """
     Removes records in df, that are part of groups with > t closeness.
 
+    The resulting t is measured against the distribution of the sensitive attribute in the remaining records, so it
+    can exceed the given t.
+
     Parameters
     -----------
-    sa_index : ...
     df : pandas DataFrame
         The input dataframe.
     qa_indices : list of int
         A list of column names to group by.
+    sa_index : int
+        The index of the sensitive attribute column.
     t : int
         The maximum t.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    dict
+        The number of 'rows_removed' and 'groups_removed' and the resulting 'k', 'l' and 't'.
     """
 
-    groups = get_groups(df, qa_indices)
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+    column = df.iloc[:, sa_index]
+    diversities = get_diversities(df, qa_indices, [sa_index], ec_index)
 
-    dist_dataset = calculate_sensitive_attr_prob_dist(df, sa_index)
+    # Drop rows from groups far from the overall distribution
+    drop = get_closenesses(df, qa_indices, sa_index, ec_index) > t
 
-    # Collect the indices of all small groups
-    small_group_indices = [group.index for group in groups if
-                           emd_categorical(pd.Series(data=calculate_sensitive_attr_prob_dist(group, sa_index),
-                                                     index=dist_dataset.index).fillna(0), dist_dataset) > t]
-    small_group_indices = [index for sublist in small_group_indices for index in sublist]
+    # closenesses of the remaining groups to the distribution of the remaining records
+    kept_rows = ec_index.broadcast(~drop, fill_value=True).astype(float)
+    _, closenesses = calculate_closenesses(ec_index, column, is_numerical(column), weights=kept_rows)
 
-    # Drop rows from small groups
-    df.drop(small_group_indices, inplace=True)
+    summary = _drop_groups(df, ec_index, drop)
+    summary['l'] = int(diversities[~drop].min()) if not drop.all() else 0
+    summary['t'] = closenesses[~drop].max(initial=0)
+
+    return summary
+
+
+def _get_suppression_token(uniques) -> frozenset:
+    # the frozenset of all values of a column, values generalized to frozensets contribute their members
+    values = set()
+    for value in uniques:
+        if isinstance(value, frozenset):
+            values.update(value)
+        else:
+            values.add(value)
+    return frozenset(values)
+
+
+def _set_cells(column: pd.Series, rows: np.ndarray, value, compact: bool = False) -> pd.Series:
+    # replaces the values of a column in the marked rows, Categorical columns stay Categorical
+    if isinstance(column.dtype, pd.CategoricalDtype) or compact:
+        values = column.array if isinstance(column.dtype, pd.CategoricalDtype) else pd.Categorical(column.to_numpy())
+        if value not in values.categories:
+            values = values.add_categories(pd.Index([value], dtype=object))
+        codes = np.where(rows, values.categories.get_loc(value), values.codes)
+        values = pd.Categorical.from_codes(codes, categories=values.categories)
+    else:
+        values = column.to_numpy(dtype=object, copy=True)
+        values[rows] = value
+
+    return pd.Series(values, index=column.index, name=column.name)
+
+
+def suppress_locally(df: pd.DataFrame, qa_indices: List[int], k: int, weights: Dict[int, float] = None,
+                     compact: bool = False, ec_index: EquivalenceClassIndex = None) -> dict:
+    """
+    Suppresses single QI cells in the given dataframe, so that every record falls into a group of at least k records.
+
+    A suppressed cell is replaced by the frozenset of all values of its column, as in suppress_categorical, so that
+    records with the same suppressed columns and equal remaining values form one group. The groups are merged greedily,
+    smallest first: all records of a group with < k records suppress the same cell, choosing the column that merges
+    them into a group of >= k records at the lowest weight, otherwise the column leading to the largest group. Only the
+    count per group pattern is kept in a dict and the small groups in one bucket per count, so each step costs a
+    constant number of lookups. A group that has no cell left to suppress and still < k records is completed with
+    records of the groups that can join it, the cheapest first, taking only the records beyond k of a group as long as
+    these suffice and otherwise a whole group. Records with a missing QI value are left unchanged.
+
+    Parameters
+    -----------
+    df : pandas DataFrame
+        The input dataframe.
+    qa_indices : list of int
+        A list of the indices of the QI columns.
+    k : int
+        The desired k to obtain k-anonymity.
+    weights : dict, optional
+        The cost of suppressing one cell per column index, 1 by default. Columns with an infinite weight are never
+        suppressed.
+    compact : bool
+        Whether to store the changed columns as Categorical.
+    ec_index : EquivalenceClassIndex, optional
+        A precomputed equivalence class index for df and qa_indices.
+
+    Returns
+    -----------
+    dict
+        The number of 'cells_suppressed' in total and per column ('column_cells'), their weighted 'cost', the number of
+        'rows_unresolved' that still belong to a group of < k records and the resulting 'k'.
+    """
+
+    if k < 1:
+        raise ValueError("k must be positive.")
+
+    ec_index = get_equivalence_class_index(df, qa_indices, ec_index)
+    weights = [float((weights or {}).get(j, 1)) for j in qa_indices]
+
+    if any(weight < 0 for weight in weights):
+        raise ValueError("Weights must not be negative.")
+
+    # the value codes of every group, -1 marks a suppressed cell
+    representatives = ec_index.order[ec_index.offsets[:-1]]
+    group_codes = np.zeros((ec_index.n_groups, len(qa_indices)), dtype=np.int64)
+    tokens = []
+
+    for column, j in enumerate(qa_indices):
+        codes, uniques = factorize_column(df.iloc[:, j])
+        token = _get_suppression_token(uniques)
+        tokens.append(token)
+
+        # cells holding the token already count as suppressed
+        lookup = np.arange(len(uniques))
+        token_codes = [code for code, value in enumerate(uniques) if isinstance(value, frozenset) and value == token]
+        lookup[token_codes] = -1
+        group_codes[:, column] = lookup[codes[representatives]]
+
+    patterns = list(map(tuple, group_codes.tolist()))
+    counts = {}
+    for pattern, size in zip(patterns, ec_index.sizes.tolist()):
+        counts[pattern] = counts.get(pattern, 0) + size
+
+    # the small groups bucketed by count, groups only grow, so the buckets are visited once in ascending order
+    buckets = [[] for _ in range(k)]
+    for pattern, count in counts.items():
+        if count < k:
+            buckets[count].append(pattern)
+
+    # every occupation of a pattern is a node, a moved node points to the node it merged into, so a pattern that is
+    # vacated and occupied again later does not redirect the records of its new occupation
+    node_patterns = list(counts)
+    parents = list(range(len(node_patterns)))
+    nodes = {pattern: node for node, pattern in enumerate(node_patterns)}
+    initial_nodes = dict(nodes)
+
+    for count, bucket in enumerate(buckets):
+        # the bucket may grow while it is visited
+        position = 0
+        while position < len(bucket):
+            pattern = bucket[position]
+            position += 1
+            if counts.get(pattern) != count:
+                # outdated entry of a group that has grown or moved
+                continue
+
+            best = None
+            for column, code in enumerate(pattern):
+                if code < 0 or weights[column] == np.inf:
+                    continue
+
+                target = pattern[:column] + (-1,) + pattern[column + 1:]
+                target_count = counts.get(target, 0)
+                if target_count + count >= k:
+                    # the cheapest column that completes a group
+                    rank = (False, weights[column], -target_count)
+                else:
+                    # otherwise the column leading to the largest group
+                    rank = (True, -target_count, weights[column])
+
+                if best is None or rank < best[0]:
+                    best = (rank, target)
+
+            if best is None:
+                # no cell left to suppress
+                continue
+
+            target = best[1]
+            del counts[pattern]
+            counts[target] = counts.get(target, 0) + count
+
+            if target not in nodes:
+                nodes[target] = len(node_patterns)
+                node_patterns.append(target)
+                parents.append(nodes[target])
+            parents[nodes.pop(pattern)] = nodes[target]
+
+            if counts[target] < k:
+                buckets[counts[target]].append(target)
+
+    # a group < k records is left only where no cell can be suppressed anymore, it takes the records it lacks from the
+    # groups that can suppress their remaining cells to join it, the cheapest first, and only the records a group has
+    # beyond k, or else merges the cheapest whole group
+    def record_cost(pattern):
+        return sum(weight for weight, code in zip(weights, pattern) if code >= 0 and weight != np.inf)
+
+    def terminal(pattern):
+        return tuple(-1 if weight != np.inf else code for weight, code in zip(weights, pattern))
+
+    transfers = {}
+    for pattern in [pattern for pattern, count in counts.items() if count < k]:
+        donors = sorted((donor for donor, count in counts.items() if count >= k and terminal(donor) == pattern),
+                        key=record_cost)
+        needed = k - counts[pattern]
+        for donor in donors:
+            moved = min(counts[donor] - k, needed)
+            if moved > 0:
+                transfers[donor] = (pattern, moved)
+                counts[donor] -= moved
+                counts[pattern] += moved
+                needed -= moved
+            if needed == 0:
+                break
+
+        if needed > 0 and donors:
+            donor = min(donors, key=lambda donor: counts[donor] * record_cost(donor))
+            transfers.pop(donor, None)
+            counts[pattern] += counts.pop(donor)
+            parents[nodes.pop(donor)] = nodes[pattern]
+
+    # the final pattern of every group, following the moves with path compression
+    final_patterns = []
+    for pattern in patterns:
+        node = root = initial_nodes[pattern]
+        while parents[root] != root:
+            root = parents[root]
+        while parents[node] != root:
+            parents[node], node = root, parents[node]
+        final_patterns.append(node_patterns[root])
+
+    final_codes = np.array(final_patterns, dtype=np.int64).reshape(group_codes.shape)
+    final_sizes = np.array([counts[pattern] for pattern in final_patterns], dtype=np.int64)
+
+    # the transferred records are taken from the first groups of their donor pattern
+    transferred_rows = []
+    transferred_groups = []
+    for group, pattern in enumerate(final_patterns):
+        if transfers.get(pattern, (None, 0))[1] > 0:
+            target, moved = transfers[pattern]
+            rows = ec_index.group_positions(group)[:moved]
+            transfers[pattern] = (target, moved - len(rows))
+            transferred_rows.append(rows)
+            transferred_groups.append(np.full(len(rows), group))
+
+    if transferred_rows:
+        transferred_rows = np.concatenate(transferred_rows)
+        transferred_groups = np.concatenate(transferred_groups)
+
+    column_cells = {}
+    for column, j in enumerate(qa_indices):
+        changed = (final_codes[:, column] < 0) & (group_codes[:, column] >= 0)
+        rows = ec_index.broadcast(changed, fill_value=False)
+        if len(transferred_rows) > 0 and weights[column] != np.inf:
+            rows[transferred_rows[group_codes[transferred_groups, column] >= 0]] = True
+        column_cells[j] = int(np.count_nonzero(rows))
+
+        if column_cells[j] > 0 or compact:
+            df.isetitem(j, _set_cells(df.iloc[:, j], rows, tokens[column], compact))
+
+    unresolved = final_sizes < k
+
+    return {'cells_suppressed': sum(column_cells.values()),
+            'column_cells': column_cells,
+            'cost': sum(weight * column_cells[j] for weight, j in zip(weights, qa_indices) if column_cells[j] > 0),
+            'rows_unresolved': int(ec_index.sizes[unresolved].sum()),
+            'k': int(min(counts.values())) if len(counts) > 0 else 0}
@@ -1,7 +1,9 @@
 import unittest
 
 from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_l_diversity, get_groups, calculate_t_closeness, \
-    get_group_sizes, get_count_per_group_size
+    get_group_sizes, get_count_per_group_size, calculate_closenesses, get_closenesses, emd_numerical, emd_numerical_batch, \
+    calculate_entropy_l_diversity, calculate_recursive_cl_diversity, get_entropy_diversities, get_recursive_diversities
+from anonymetrics.groupindex import EquivalenceClassIndex
 from anonymize.generalize import *
 
 
@@ -53,6 +55,19 @@ class TestAnonymetrics(unittest.TestCase):
         l = calculate_l_diversity(df, [1], [3])
         self.assertEqual(l, 6)
 
+    def test_entropy_and_recursive_l_diversity(self):
+        df = pd.DataFrame({'zipcode': [10001, 10001, 10001, 10001, 10002, 10002, 10002],
+                           'disease': ['flu', 'flu', 'cold', 'gastritis', 'flu', 'cold', None]})
+
+        # group 10001: counts (2, 1, 1), group 10002: counts (1, 1)
+        np.testing.assert_allclose(get_entropy_diversities(df, [0], [1]), [2 ** 1.5, 2.0])
+        self.assertAlmostEqual(calculate_entropy_l_diversity(df, [0], [1]), 2.0)
+
+        # r_1 < c (r_l + ... + r_m) for c = 2: l = 1, 2 hold in 10001 (2 < 8, 2 < 4), l = 3 does not (2 < 2)
+        np.testing.assert_array_equal(get_recursive_diversities(df, [0], [1], 2), [2, 2])
+        self.assertEqual(calculate_recursive_cl_diversity(df, [0], [1], 3), 2)
+        self.assertEqual(calculate_recursive_cl_diversity(df, [0], [1], 0.5), 0)
+
     def test_get_groups(self):
         df = pd.DataFrame({'age': [30, 30, 40, 40, 50, 50],
                            'gender': ['M', 'M', 'F', 'F', 'M', 'M'],
@@ -98,6 +113,44 @@ class TestAnonymetrics(unittest.TestCase):
         # t = calculate_t_closeness(df, qa_indices=[0, 1], sa_index=1)
         # self.assertAlmostEqual(t, 0.0)
 
+    def test_emd_numerical(self):
+        # see https://www.cs.purdue.edu/homes/ninghui/papers/t_closeness_icde07.pdf, p.7
+        salaries = [3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 11000]
+        dist_dataset = pd.Series(1 / 9, index=salaries)
+        dist_group = pd.Series([1 / 3, 1 / 3, 1 / 3, 0, 0, 0, 0, 0, 0], index=salaries)
+
+        self.assertAlmostEqual(emd_numerical(dist_group[::-1], dist_dataset), 0.375)
+        self.assertEqual(dist_group.index.tolist(), salaries)
+
+        # intervals are ordered by their midpoints
+        dist_0 = pd.Series([0.5, 0.5, 0.0], index=[(10, 19), (0, 9), (20, 29)])
+        dist_1 = pd.Series([0.0, 0.5, 0.5], index=[(0, 9), (10, 19), (20, 29)])
+        self.assertAlmostEqual(emd_numerical(dist_0, dist_1), 0.5)
+
+        dists = np.array([dist_group.to_numpy(), dist_dataset.to_numpy()])
+        emds = emd_numerical_batch(dists[:, ::-1], dist_dataset.to_numpy(), values=salaries[::-1])
+        np.testing.assert_allclose(emds, [0.375, 0.0])
+
+    def test_calculate_closenesses(self):
+        data = {'ZIP Code': ['4767*', '4767*', '4767*', '4790*', '4790*', '4790*', '4760*', '4760*', '4760*'],
+                'Age': ['<= 40', '<= 40', '<= 40', '>= 40', '>= 40', '>= 40', '>= 40', '>= 40', '>= 40'],
+                'Salary': [3000, 5000, 9000, 6000, 11000, 8000, 4000, 7000, 10000],
+                'Disease': ['gastric ulcer', 'stomach cancer', 'pneumonia', 'gastritis', 'flu', 'bronchitis',
+                            'gastritis', 'bronchitis', 'stomach cancer']}
+
+        df = pd.DataFrame(data=data, columns=['ZIP Code', 'Age', 'Salary', 'Disease'])
+        ec_index = EquivalenceClassIndex(df, [0, 1])
+
+        # groups 4760*, 4767*, 4790*
+        t, closenesses = calculate_closenesses(ec_index, df['Salary'], numerical=True)
+        self.assertAlmostEqual(t, 0.16666666666666669)
+        np.testing.assert_allclose(closenesses, [0.08333333333333333, 0.16666666666666669, 0.16666666666666669])
+
+        # one group per block gives the same result
+        t, closenesses = calculate_closenesses(ec_index, df['Disease'], max_cells=1)
+        self.assertAlmostEqual(t, 0.5555555555555556)
+        np.testing.assert_allclose(closenesses, get_closenesses(df, [0, 1], 3, ec_index))
+
     def test_get_group_size(self):
         df = pd.DataFrame({'age': [30, 30, 40, 40, 50, 50, 20],
                            'gender': ['M', 'M', 'F', 'F', 'M', 'M', 'D'],
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_t_closeness, get_count_per_group_size
+from anonymetrics.approximate import sample_equivalence_classes, estimate_count_per_group_size, refine_estimates, \
+    estimate_k_anonymity_ci
+
+
+class TestApproximate(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'age': rng.integers(20, 60, 2000),
+                                'gender': rng.choice(['M', 'F'], 2000),
+                                'zipcode': rng.integers(10001, 10011, 2000),
+                                'disease': rng.choice(['flu', 'cold', 'gastritis'], 2000)})
+
+    def test_sample_equivalence_classes(self):
+        sample, probabilities = sample_equivalence_classes(self.df, [0, 1, 2], 0.3, stratify_index=1,
+                                                           strata_weights={'F': 2})
+
+        # whole equivalence classes are sampled
+        sizes = self.df.groupby(['age', 'gender', 'zipcode']).size()
+        sample_sizes = sample.groupby(['age', 'gender', 'zipcode']).size()
+        pd.testing.assert_series_equal(sample_sizes, sizes[sample_sizes.index])
+
+        np.testing.assert_allclose(probabilities, np.where(sample['gender'] == 'F', 0.6, 0.3))
+
+    def test_estimate_count_per_group_size(self):
+        sample, probabilities = sample_equivalence_classes(self.df, [0, 1, 2], 0.5)
+        estimate, lower, upper = estimate_count_per_group_size(sample, [0, 1, 2], probabilities, confidence=0.999)
+        exact = get_count_per_group_size(self.df, [0, 1, 2])
+
+        # group sizes that occur in the sample
+        sizes = np.flatnonzero(estimate)
+        self.assertTrue(np.all(lower[sizes] <= exact[sizes]) and np.all(exact[sizes] <= upper[sizes]))
+
+    def test_refine_estimates(self):
+        estimates = list(refine_estimates(self.df, [0, 1, 2], 3, rates=[0.1, 0.5, 1.0]))
+
+        self.assertTrue(all(a['n_sampled'] <= b['n_sampled'] for a, b in zip(estimates, estimates[1:])))
+        self.assertTrue(all(e['k_upper'] >= calculate_k_anonymity(self.df, [0, 1, 2]) for e in estimates))
+
+        # the full sample gives the exact values
+        np.testing.assert_allclose(estimates[-1]['count_per_group_size'], get_count_per_group_size(self.df, [0, 1, 2]))
+        self.assertAlmostEqual(estimates[-1]['t_lower'], calculate_t_closeness(self.df, [0, 1, 2], 3))
+
+        # the intervals contain the exact values and narrow down to them with the full sample
+        k = calculate_k_anonymity(self.df, [0, 1, 2])
+        t = calculate_t_closeness(self.df, [0, 1, 2], 3)
+        for e in estimates:
+            self.assertTrue(e['k_ci'][0] <= k <= e['k_ci'][1] and e['k_ci'][1] == e['k_upper'])
+            self.assertTrue(e['t_ci'][0] == e['t_lower'] and t <= e['t_ci'][1] + 1e-9)
+        self.assertEqual(estimates[0]['k_ci'][0], 1)
+        self.assertEqual(estimates[0]['t_ci'][1], 1.0)
+        self.assertEqual(estimates[-1]['k_ci'], (k, k))
+        self.assertAlmostEqual(estimates[-1]['t_ci'][1], t)
+
+    def test_estimate_k_anonymity_ci(self):
+        sample, probabilities = sample_equivalence_classes(self.df, [0, 1, 2], 0.9)
+        k_upper = sample.groupby(['age', 'gender', 'zipcode']).size().min()
+
+        # a smaller group is missed with a probability of at most 0.1
+        self.assertEqual(estimate_k_anonymity_ci(sample, [0, 1, 2], 0.9, confidence=0.8), (k_upper, k_upper))
+        self.assertEqual(estimate_k_anonymity_ci(sample, [0, 1, 2], 0.9, confidence=0.95), (1, k_upper))
+        self.assertEqual(estimate_k_anonymity_ci(sample.iloc[:0], [0, 1, 2], 0.9), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import itertools
+import unittest
+import numpy as np
+import pandas as pd
+
+from anonymize.fulldomain import search_full_domain, get_level_losses
+from anonymize.hierarchy import GeneralizationHierarchy, apply_hierarchies
+from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_l_diversity
+
+
+class TestFulldomain(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'age': rng.integers(17, 90, 300),
+                                'zipcode': rng.integers(10000, 10400, 300),
+                                'job': rng.choice(list('abcdefgh'), 300),
+                                'disease': rng.choice(['flu', 'cold', 'gastritis'], 300)})
+
+        self.hierarchies = {0: GeneralizationHierarchy.from_intervals(self.df['age'], [5, 10, 20, 40, 80]),
+                            1: GeneralizationHierarchy.from_intervals(self.df['zipcode'], [10, 100, 1000]),
+                            2: GeneralizationHierarchy.from_tree({'ad': {'ab': ['a', 'b'], 'cd': ['c', 'd']},
+                                                                  'eh': {'ef': ['e', 'f'], 'gh': ['g', 'h']}})}
+
+    def get_losses(self):
+        losses = {}
+        for levels in itertools.product(*[range(h.height) for h in self.hierarchies.values()]):
+            losses[levels] = np.mean([get_level_losses(h, h.encode(self.df.iloc[:, j]))[level]
+                                      for (j, h), level in zip(self.hierarchies.items(), levels)])
+        return losses
+
+    def test_get_level_losses(self):
+        hierarchy = self.hierarchies[2]
+        losses = get_level_losses(hierarchy, hierarchy.encode(self.df['job']))
+
+        np.testing.assert_allclose(losses, [0, 1 / 7, 3 / 7, 1])
+
+    def test_search_full_domain(self):
+        result = search_full_domain(self.df, self.hierarchies, 4, sa_index=3, l=2)
+
+        # brute force over all nodes of the lattice
+        best = None
+        for levels, loss in sorted(self.get_losses().items(), key=lambda item: item[1]):
+            df = self.df.copy()
+            apply_hierarchies(df, self.hierarchies, dict(zip(self.hierarchies, levels)))
+            if calculate_k_anonymity(df, [0, 1, 2]) >= 4 and calculate_l_diversity(df, [0, 1, 2], [3]) >= 2:
+                best = loss
+                break
+
+        self.assertAlmostEqual(result['loss'], best)
+        self.assertGreaterEqual(result['k'], 4)
+        self.assertGreaterEqual(result['l'], 2)
+
+        df = self.df.copy()
+        apply_hierarchies(df, self.hierarchies, result['levels'])
+        self.assertEqual(calculate_k_anonymity(df, [0, 1, 2]), result['k'])
+
+    def test_parallel(self):
+        serial = search_full_domain(self.df, self.hierarchies, 5)
+        parallel = search_full_domain(self.df, self.hierarchies, 5, n_jobs=2)
+
+        self.assertAlmostEqual(serial['loss'], parallel['loss'])
+        self.assertIsNone(search_full_domain(self.df, {0: self.hierarchies[0]}, 301))
+
+
+if __name__ == '__main__':
+    unittest.main()
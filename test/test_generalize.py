@@ -1,6 +1,7 @@
 import unittest
 import pandas as pd
-from anonymize.generalize import generalize_categorical, discretize
+from anonymize.generalize import generalize_categorical, discretize, interval_tuples, get_generalized_values, \
+    generalize_columns
 from anonymetrics.anonymetrics import calculate_k_anonymity
 
 
@@ -26,6 +27,22 @@ class TestGeneralize(unittest.TestCase):
         # Check if the 'age' column has been discretized correctly
         self.assertEqual(df['age'].tolist(), expected_ages)
 
+    def test_discretize_compact(self):
+        df = pd.DataFrame({'age': [1.5, 4.3, 7.9, 15.8, 30.0, None]})
+
+        discretize(df, 0, 5.0, compact=True)
+
+        self.assertEqual(df['age'].dtype, 'category')
+        self.assertEqual(len(df['age'].cat.categories), 4)
+        self.assertEqual(interval_tuples(df['age']).tolist()[:5],
+                         [(0.0, 4.0), (0.0, 4.0), (5.0, 9.0), (15.0, 19.0), (30.0, 34.0)])
+        self.assertTrue(pd.isna(df['age'].iloc[5]))
+
+        # intervals shorter than 1 would end below their lower bound
+        for L in [0, 0.5]:
+            with self.assertRaises(ValueError):
+                discretize(pd.DataFrame({'age': [1.5, 4.3]}), 0, L, compact=True)
+
     def test_generalize_categorical(self):
         # Example dataframe
         df = pd.DataFrame({
@@ -44,6 +61,46 @@ class TestGeneralize(unittest.TestCase):
         k = calculate_k_anonymity(df, qa_indices=[1, 2])
         self.assertEqual(k, 2)
 
+    def test_generalize_categorical_compact(self):
+        df = pd.DataFrame({
+            'img': [1, 2, 3, 4, 5],
+            'Label 1': ['foo', 'bar', 'cat', 'dog', 'eagle'],
+            'Label 2': ['foo', 'bar', 'cat', 'dog', 'bird']
+        })
+        expected = df.copy()
+
+        generalize_categorical(df, [1, 2], ['cat', 'dog', 'bird', 'eagle'], compact=True)
+        generalize_categorical(df, [1, 2], ['foo', 'bar'])
+        generalize_categorical(expected, [1, 2], ['cat', 'dog', 'bird', 'eagle'])
+        generalize_categorical(expected, [1, 2], ['foo', 'bar'])
+
+        self.assertEqual(df['Label 1'].dtype, 'category')
+        self.assertEqual(df['Label 1'].tolist(), expected['Label 1'].tolist())
+        self.assertEqual(calculate_k_anonymity(df, qa_indices=[1, 2]), 2)
+
+        self.assertEqual(get_generalized_values(df['Label 2']),
+                         {0: frozenset({'foo', 'bar'}), 1: frozenset({'cat', 'dog', 'bird', 'eagle'})})
+
+    def test_generalize_columns(self):
+        df = pd.DataFrame({
+            'img': [1, 2, 3, 4, 5],
+            'Label 1': ['foo', 'bar', 'cat', 'dog', 'eagle'],
+            'Label 2': ['foo', 'bar', 'cat', 'dog', 'bird']
+        })
+        expected = df.copy()
+
+        n_changed = generalize_columns(df, {1: [['cat', 'dog', 'bird', 'eagle'], ['foo', 'bar']],
+                                            2: {'cat': 'animal', 'dog': 'animal', 'bird': 'animal'}})
+        generalize_categorical(expected, [1], ['cat', 'dog', 'bird', 'eagle'])
+        generalize_categorical(expected, [1], ['foo', 'bar'])
+
+        self.assertEqual(n_changed, {1: 5, 2: 3})
+        self.assertEqual(df['Label 1'].tolist(), expected['Label 1'].tolist())
+        self.assertEqual(df['Label 2'].tolist(), ['foo', 'bar', 'animal', 'animal', 'animal'])
+
+        with self.assertRaises(ValueError):
+            generalize_columns(df, {1: [['foo', 'bar'], ['bar']]})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from anonymetrics.groupindex import EquivalenceClassIndex
+from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_l_diversity, calculate_t_closeness, \
+    get_group_sizes, get_diversities, get_groups
+from anonymize.generalize import generalize_categorical
+from anonymize.suppress import remove_groups
+
+
+class TestGroupIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'age': [30, 30, 40, 40, 50, 50, 20],
+                                'gender': ['M', 'M', 'F', 'F', 'M', 'M', 'D'],
+                                'zipcode': [10001, 10001, 10002, 10002, 10003, 10003, 10001],
+                                'salary': [50000, 60000, 70000, 80000, 90000, 100000, 1],
+                                'siblings': [1, 1, 1, 3, 3, 3, 4]})
+
+    def test_index(self):
+        ec_index = EquivalenceClassIndex(self.df, [1])
+
+        self.assertEqual(ec_index.n_groups, 3)
+        np.testing.assert_array_equal(ec_index.sizes, [1, 2, 4])
+        np.testing.assert_array_equal(ec_index.offsets, [0, 1, 3, 7])
+        np.testing.assert_array_equal(ec_index.codes, [2, 2, 1, 1, 2, 2, 0])
+        np.testing.assert_array_equal(ec_index.group_positions(2), [0, 1, 4, 5])
+        np.testing.assert_array_equal(ec_index.broadcast(ec_index.sizes), [4, 4, 2, 2, 4, 4, 1])
+
+    def test_missing_values(self):
+        self.df.loc[0, 'gender'] = np.nan
+        ec_index = EquivalenceClassIndex(self.df, [1, 2])
+
+        self.assertEqual(ec_index.codes[0], -1)
+        np.testing.assert_array_equal(ec_index.sizes, self.df.groupby(['gender', 'zipcode']).size().values)
+
+    def test_shared_index(self):
+        generalize_categorical(self.df, [1], ['M', 'F'])
+        ec_index = EquivalenceClassIndex(self.df, [1])
+
+        self.assertEqual(calculate_k_anonymity(self.df, [1], ec_index), 1)
+        self.assertEqual(calculate_l_diversity(self.df, [1], [4], ec_index), 1)
+        self.assertAlmostEqual(calculate_t_closeness(self.df, [1], 4, ec_index),
+                               calculate_t_closeness(self.df, [1], 4))
+        np.testing.assert_array_equal(get_group_sizes(self.df, [1], ec_index), [6, 1])
+        np.testing.assert_array_equal(get_diversities(self.df, [1], [3, 4], ec_index), [2, 1])
+        self.assertEqual([len(group) for group in get_groups(self.df, [1], ec_index)], [6, 1])
+
+        remove_groups(self.df, [1], 2, ec_index)
+        self.assertEqual(len(self.df), 6)
+
+    def test_mismatching_index(self):
+        ec_index = EquivalenceClassIndex(self.df, [1])
+
+        with self.assertRaises(ValueError):
+            calculate_k_anonymity(self.df, [1, 2], ec_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from anonymize.generalize import discretize, interval_tuples
+from anonymize.hierarchy import GeneralizationHierarchy, encode_leaves, generalize_codes, apply_hierarchies
+from anonymetrics.anonymetrics import calculate_k_anonymity
+
+
+class TestHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'age': [39, 50, 38, 53, 28, 37],
+                                'country': ['Germany', 'France', 'Germany', 'Poland', 'Cuba', 'Cuba']})
+
+        self.countries = GeneralizationHierarchy.from_tree({'Europe': {'West': ['France', 'Germany'],
+                                                                       'East': ['Poland']},
+                                                            'America': ['Cuba']})
+        self.ages = GeneralizationHierarchy.from_intervals(self.df['age'], [10, 20])
+
+    def test_from_tree(self):
+        self.assertEqual(self.countries.height, 4)
+        codes = self.countries.encode(self.df['country'])
+
+        self.assertEqual(list(self.countries.generalize(codes, 0)), self.df['country'].tolist())
+        self.assertEqual(list(self.countries.generalize(codes, 1)),
+                         [frozenset({'France', 'Germany'})] * 3 + ['Poland', 'Cuba', 'Cuba'])
+        self.assertEqual(list(self.countries.generalize(codes, 2)),
+                         [frozenset({'France', 'Germany', 'Poland'})] * 4 + ['Cuba', 'Cuba'])
+        self.assertEqual(len(self.countries.get_values(3)), 1)
+
+        with self.assertRaises(ValueError):
+            self.countries.encode(pd.Series(['Spain']))
+
+    def test_from_intervals(self):
+        codes = self.ages.encode(self.df['age'])
+
+        expected = self.df.copy()
+        discretize(expected, 0, 10.0)
+        self.assertEqual(interval_tuples(pd.Series(self.ages.generalize(codes, 1))).tolist(), expected['age'].tolist())
+        self.assertEqual(len(self.ages.get_values(2)), 2)
+
+        with self.assertRaises(ValueError):
+            GeneralizationHierarchy.from_intervals(self.df['age'], [10, 15])
+        with self.assertRaises(ValueError):
+            GeneralizationHierarchy.from_intervals(self.df['age'], [0.5, 10])
+
+    def test_apply_hierarchies(self):
+        hierarchies = {0: self.ages, 1: self.countries}
+        leaf_codes = encode_leaves(self.df, hierarchies)
+
+        codes, cardinalities = generalize_codes(leaf_codes, hierarchies, {0: 2, 1: 2})
+        self.assertEqual(cardinalities, [2, 2])
+        np.testing.assert_array_equal(codes[1], [0, 0, 0, 0, 1, 1])
+
+        df = self.df.copy()
+        apply_hierarchies(df, hierarchies, {0: 1, 1: 3}, leaf_codes)
+        self.assertEqual(calculate_k_anonymity(df, [0, 1]), 1)
+
+        apply_hierarchies(df, hierarchies, {0: 2, 1: 3}, leaf_codes)
+        self.assertEqual(calculate_k_anonymity(df, [0, 1]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
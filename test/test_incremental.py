@@ -0,0 +1,51 @@
+import unittest
+import pandas as pd
+
+from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_l_diversity, calculate_t_closeness
+from anonymetrics.incremental import IncrementalAnonymityTracker
+
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'age': [30, 30, 40, 40, 50, 50, 20, 20],
+                                'gender': ['M', 'M', 'F', 'F', 'M', 'M', 'D', 'D'],
+                                'disease': ['flu', 'cold', 'flu', 'flu', 'cold', 'gastritis', 'flu', 'cold']})
+
+    def assertMetricsEqual(self, tracker, df):
+        self.assertEqual(tracker.calculate_k_anonymity(), calculate_k_anonymity(df, [0, 1]))
+        self.assertEqual(tracker.calculate_l_diversity(), calculate_l_diversity(df, [0, 1], [2]))
+        self.assertAlmostEqual(tracker.calculate_t_closeness(), calculate_t_closeness(df, [0, 1], 2))
+
+    def test_insert_delete(self):
+        tracker = IncrementalAnonymityTracker([0, 1], 2)
+
+        tracker.insert(self.df.iloc[:6])
+        self.assertMetricsEqual(tracker, self.df.iloc[:6])
+
+        tracker.insert(self.df.iloc[6:])
+        self.assertEqual(tracker.n_groups, 4)
+        self.assertMetricsEqual(tracker, self.df)
+
+        tracker.delete(self.df.iloc[[2, 3, 7]])
+        self.assertEqual(tracker.n_groups, 3)
+        self.assertMetricsEqual(tracker, self.df.drop([2, 3, 7]))
+
+        with self.assertRaises(ValueError):
+            tracker.delete(self.df.iloc[[2]])
+
+    def test_t_closeness_bounds(self):
+        tracker = IncrementalAnonymityTracker([0, 1], 2)
+        tracker.insert(self.df.iloc[:6])
+        tracker.calculate_t_closeness()
+
+        tracker.insert(self.df.iloc[6:])
+        lower, upper = tracker.get_t_closeness_bounds()
+        t = calculate_t_closeness(self.df, [0, 1], 2)
+
+        self.assertLessEqual(lower, t)
+        self.assertGreaterEqual(upper, t)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,6 +32,8 @@ class TestInfometrics(unittest.TestCase):
         })
 
         self.df1 = self.df2.copy()
+        self.df3 = self.df2.copy()
+        discretize(self.df3, 0, 10.0, compact=True)
 
         discretize(self.df2, 0, 10.0)
         generalize_categorical(self.df2, [3], ['Bachelors', 'Masters'])
@@ -44,16 +46,38 @@ class TestInfometrics(unittest.TestCase):
         self.assertAlmostEqual(infoloss, 0.00)
         infoloss = numerical_info_loss(self.df1, self.df1, 0)
         self.assertAlmostEqual(infoloss, 0.00)
+        infoloss = numerical_info_loss(self.df1, self.df3, 0)
+        self.assertAlmostEqual(infoloss, 0.36)
+
+        # unchanged cells lose nothing, the losses of several columns add up
+        self.df2.at[0, 'age'] = (39, 39)
+        self.df2.at[1, 'age'] = 50
+        self.df2['education-num'] = pd.Series([(10, 14), (10, 14), (5, 9), 7, 13, 14], dtype=object)
+        infoloss = numerical_info_loss(self.df1, self.df2, [0, 4])
+        self.assertAlmostEqual(infoloss, (9 * 4 / 25 + (4 + 4 + 4) / 7) / 6)
 
     def test_entropy_info_loss(self):
         infoloss = entropy_info_loss(self.df1, self.df2, 3)
         self.assertAlmostEqual(infoloss, 3.2451124978365313)
 
+        generalize_categorical(self.df3, [3], ['Bachelors', 'Masters'], compact=True)
+        infoloss = entropy_info_loss(self.df1, self.df3, 3)
+        self.assertAlmostEqual(infoloss, 3.2451124978365313)
+
     def test_euclid_info_loss(self):
         infoloss = euclid_info_loss(self.df1, self.df1, 0)
         self.assertEqual(infoloss, 0.0)
         infoloss = euclid_info_loss(self.df1, self.df2, 0)
         self.assertAlmostEqual(infoloss, 3.3333333333333335)
+        infoloss = euclid_info_loss(self.df1, self.df3, 0)
+        self.assertAlmostEqual(infoloss, 3.3333333333333335)
+
+    def test_euclid_info_loss_columns(self):
+        # the distance of a record is the euclidean norm over all columns
+        df = pd.DataFrame({'a': [0.0, 0.0], 'b': [0.0, 0.0]})
+        changed = pd.DataFrame({'a': [3.0, 0.0], 'b': [4.0, 2.0]})
+        self.assertAlmostEqual(euclid_info_loss(df, changed, [0, 1]), 3.5)
+        self.assertAlmostEqual(euclid_info_loss(df, changed, [1]), 3.0)
 
 
 if __name__ == '__main__':
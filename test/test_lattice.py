@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_l_diversity
+from anonymetrics.lattice import scan_qi_subsets, _Table
+
+
+class TestLattice(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'age': rng.integers(20, 24, 200),
+                                'gender': rng.choice(['M', 'F'], 200),
+                                'zipcode': rng.integers(10001, 10004, 200),
+                                'siblings': rng.integers(0, 3, 200),
+                                'disease': rng.choice(['flu', 'cold', 'gastritis'], 200)})
+        self.df.loc[[4, 8], 'gender'] = np.nan
+        self.df.loc[[5], 'disease'] = np.nan
+
+    def test_scan_qi_subsets(self):
+        scan = scan_qi_subsets(self.df, [0, 1, 2, 3], sa_index=4)
+
+        self.assertEqual(len(scan), 15)
+        for qa_indices, k, l in scan.itertuples(index=False):
+            self.assertEqual(k, calculate_k_anonymity(self.df, list(qa_indices)))
+            self.assertEqual(l, calculate_l_diversity(self.df, list(qa_indices), [4]))
+
+    def test_max_size(self):
+        scan = scan_qi_subsets(self.df, [0, 1, 2, 3], max_size=2)
+
+        self.assertEqual(list(scan.columns), ['qa_indices', 'k'])
+        self.assertEqual(scan['qa_indices'].tolist(), [(0,), (1,), (2,), (3,), (0, 1), (0, 2), (0, 3), (1, 2),
+                                                       (1, 3), (2, 3)])
+
+    def test_max_size_pruning(self):
+        df = pd.concat([self.df.iloc[:, :4]] * 2, axis=1)
+        drop = _Table.drop
+
+        tables = {}
+        for max_size in [2, None]:
+            with patch.object(_Table, 'drop', autospec=True, side_effect=drop) as mock_drop:
+                scan = scan_qi_subsets(df, list(range(8)), max_size=max_size)
+                tables[max_size] = mock_drop.call_count
+
+        # the full scan rolls up one table per subset below the root, the bounded scan only the paths to small subsets
+        self.assertEqual(len(scan), 255)
+        self.assertEqual(tables[None], 254)
+        self.assertLess(tables[2], tables[None] / 2)
+        pd.testing.assert_frame_equal(scan_qi_subsets(df, list(range(8)), max_size=2),
+                                      scan[scan['qa_indices'].map(len) <= 2].reset_index(drop=True))
+        pd.testing.assert_frame_equal(scan_qi_subsets(df, list(range(8)), max_size=2, n_jobs=2),
+                                      scan_qi_subsets(df, list(range(8)), max_size=2))
+
+    def test_parallel(self):
+        pd.testing.assert_frame_equal(scan_qi_subsets(self.df, [0, 1, 2, 3], sa_index=4, n_jobs=2, split_depth=1),
+                                      scan_qi_subsets(self.df, [0, 1, 2, 3], sa_index=4))
+
+        # a split depth of 0 scans serially
+        pd.testing.assert_frame_equal(scan_qi_subsets(self.df, [0, 1, 2, 3], n_jobs=2, split_depth=0),
+                                      scan_qi_subsets(self.df, [0, 1, 2, 3]))
+
+    def test_many_columns(self):
+        # the missing values of more than 64 columns
+        df = pd.concat([self.df] * 14, axis=1)
+        scan = scan_qi_subsets(df, list(range(69)), sa_index=69, max_size=1)
+
+        self.assertEqual(len(scan), 69)
+        for qa_indices, k, l in scan.iloc[-5:].itertuples(index=False):
+            self.assertEqual(k, calculate_k_anonymity(df, list(qa_indices)))
+            self.assertEqual(l, calculate_l_diversity(df, list(qa_indices), [69]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+import pandas as pd
+from anonymize.microaggregation import microaggregate, get_sse
+from anonymetrics.anonymetrics import calculate_k_anonymity
+
+
+class TestMicroaggregation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.df = pd.DataFrame({
+            'age': rng.integers(18, 90, 500).astype(float),
+            'income': rng.exponential(40000, 500),
+            'disease': rng.choice(['flu', 'cold'], 500)
+        })
+
+    def test_microaggregate(self):
+        original = self.df.copy()
+
+        groups, sse = microaggregate(self.df, [0, 1], 4, standardize=False)
+
+        sizes = np.bincount(groups)
+        self.assertEqual(sizes.min(), 4)
+        self.assertLess(sizes.max(), 8)
+        self.assertGreaterEqual(calculate_k_anonymity(self.df, [0, 1]), 4)
+        self.assertAlmostEqual(sse, get_sse(original.iloc[:, [0, 1]].to_numpy(), groups))
+
+        # the group means are kept
+        pd.testing.assert_series_equal(self.df.groupby(groups)['income'].first(),
+                                       original.groupby(groups)['income'].mean())
+        pd.testing.assert_series_equal(self.df['disease'], original['disease'])
+
+    def test_microaggregate_variable(self):
+        groups, sse = microaggregate(self.df.copy(), [0, 1], 3, variable=True, gamma=1.0)
+        _, fixed_sse = microaggregate(self.df.copy(), [0, 1], 3)
+
+        sizes = np.bincount(groups)
+        self.assertGreaterEqual(sizes.min(), 3)
+        self.assertLessEqual(sizes.max(), 5)
+        self.assertGreater(sse, 0)
+        self.assertGreater(fixed_sse, 0)
+
+    def test_microaggregate_missing(self):
+        self.df.loc[[0, 5], 'age'] = np.nan
+
+        groups, _ = microaggregate(self.df, [0, 1], 5)
+
+        self.assertEqual(groups[[0, 5]].tolist(), [-1, -1])
+        self.assertTrue(self.df['age'][[0, 5]].isna().all())
+        self.assertEqual(np.bincount(groups[groups >= 0]).min(), 5)
+
+    def test_get_sse(self):
+        values = np.array([[1.0, 0.0], [3.0, 2.0], [5.0, 7.0]])
+        self.assertEqual(get_sse(values, np.array([0, 0, -1])), 4.0)
+        self.assertEqual(get_sse(values[:, 0], np.array([0, 0, 0])), 8.0)
+
+    def test_microaggregate_too_few_records(self):
+        with self.assertRaises(ValueError):
+            microaggregate(self.df.head(3), [0, 1], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from anonymize.mondrian import mondrian
+from anonymetrics.anonymetrics import calculate_k_anonymity, get_group_sizes
+from anonymetrics.infometrics import get_interval_bounds
+
+
+class TestMondrian(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'age': rng.integers(17, 90, 500),
+                                'hours-per-week': rng.integers(1, 99, 500),
+                                'workclass': rng.choice(['Private', 'State-gov', 'Self-emp'], 500)})
+
+    def test_mondrian(self):
+        df = self.df.copy()
+        partitions = mondrian(df, [0, 1, 2], 5)
+
+        self.assertGreaterEqual(calculate_k_anonymity(df, [0, 1, 2]), 5)
+        self.assertEqual(df['age'].dtype, 'category')
+
+        # every record lies within the interval and value set of its partition
+        lower, upper = get_interval_bounds(df['age'])
+        self.assertTrue(np.all((lower <= self.df['age']) & (self.df['age'] <= upper)))
+        self.assertTrue(all(original == value or original in value
+                            for original, value in zip(self.df['workclass'], df['workclass'])))
+
+        # the partitions are the equivalence classes, unless two partitions have the same summary
+        self.assertGreaterEqual(partitions.max() + 1, len(get_group_sizes(df, [0, 1, 2])))
+
+    def test_parallel(self):
+        df = self.df.copy()
+        df.loc[3, 'age'] = np.nan
+        partitions = mondrian(df, [0, 1, 2], 5, n_jobs=2)
+
+        self.assertEqual(partitions[3], -1)
+        self.assertTrue(pd.isna(df.iloc[3, 0]))
+        self.assertGreaterEqual(calculate_k_anonymity(df, [0, 1, 2]), 5)
+
+        with self.assertRaises(ValueError):
+            mondrian(self.df.iloc[:3].copy(), [0, 1, 2], 5)
+
+    def test_missing_values(self):
+        df = self.df.copy()
+        df.loc[3, 'age'] = np.nan
+        df.loc[7, 'workclass'] = None
+        partitions = mondrian(df, [0, 1, 2], 5)
+
+        # partly missing records are not partitioned and keep their other QI values
+        self.assertEqual(partitions[[3, 7]].tolist(), [-1, -1])
+        self.assertEqual(df.iloc[[3, 7], 1].tolist(), self.df.iloc[[3, 7], 1].tolist())
+        self.assertEqual(df.iloc[3, 2], self.df.iloc[3, 2])
+        self.assertEqual(df.iloc[7, 0], self.df.iloc[7, 0])
+        self.assertTrue(pd.isna(df.iloc[3, 0]) and pd.isna(df.iloc[7, 2]))
+        self.assertEqual(df['age'].dtype, 'category')
+
+        # the partitioned records are summarized as before
+        partitioned = partitions >= 0
+        lower, upper = get_interval_bounds(df['age'])
+        self.assertTrue(np.all((lower <= self.df['age'])[partitioned] & (self.df['age'] <= upper)[partitioned]))
+        self.assertGreaterEqual(get_group_sizes(df.iloc[partitioned], [0, 1, 2]).min(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
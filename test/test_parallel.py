@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import pandas as pd
+from anonymize.plan import AnonymizationPlan
+from anonymize.parallel import partition_by_groups, run_plan_parallel
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        n = 3000
+        self.df = pd.DataFrame({
+            'age': rng.integers(18, 90, n),
+            'country': rng.choice(list('abcdefgh'), n, p=[.3, .2, .2, .1, .1, .05, .03, .02]),
+            'sex': rng.choice(['m', 'f'], n),
+            'disease': rng.choice(['flu', 'cold', 'cough'], n),
+            'income': rng.integers(0, 50, n)
+        }, index=rng.permutation(n) * 2)
+        self.df.iloc[[5, 17], 2] = np.nan
+
+    def test_partition_by_groups(self):
+        partitions = partition_by_groups(self.df, [1, 2], 3)
+
+        self.assertEqual(sorted(np.concatenate(partitions).tolist()), list(range(len(self.df))))
+        for partition in partitions:
+            self.assertTrue(np.all(np.diff(partition) > 0))
+
+        # every equivalence class lies in one partition
+        keys = [set(map(tuple, self.df.iloc[partition, [1, 2]].dropna().to_numpy().tolist()))
+                for partition in partitions]
+        self.assertEqual(sum(len(partition_keys) for partition_keys in keys), len(set.union(*keys)))
+
+    def test_run_plan_parallel(self):
+        plan = AnonymizationPlan([0, 1, 2], [3, 4]) \
+            .discretize(0, 10) \
+            .generalize(1, [['a', 'b'], ['c', 'd']]) \
+            .remove_groups(10) \
+            .remove_groups_with_closeness_higher_t(4, 0.3) \
+            .remove_groups_with_diversity_smaller_l(3)
+
+        for n_jobs, n_shards in [(1, 1), (1, 4), (2, 3)]:
+            result, report = run_plan_parallel(plan, self.df, n_jobs=n_jobs, n_shards=n_shards)
+
+            expected = self.df.copy()
+            expected_report = plan.run(expected)
+
+            pd.testing.assert_frame_equal(result, expected)
+            self.assertEqual(report, expected_report)
+
+    def test_run_plan_parallel_unsupported(self):
+        with self.assertRaises(ValueError):
+            run_plan_parallel(AnonymizationPlan([0]).suppress_locally(2), self.df)
+
+
+if __name__ == '__main__':
+    unittest.main()
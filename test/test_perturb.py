@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+import pandas as pd
+from anonymize.perturb import add_noise, rank_swap, laplace_mechanism, gaussian_mechanism, release_histogram
+
+
+class TestPerturb(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 10000
+        self.df = pd.DataFrame({'age': rng.integers(18, 90, n),
+                                'income': rng.normal(3000, 500, n),
+                                'sex': rng.choice(['m', 'f'], n),
+                                'zipcode': rng.choice([10001, 10002, 10003], n)})
+        self.df.loc[[3, 7], 'income'] = np.nan
+
+    def test_add_noise(self):
+        # the laplace distribution of diversity b has the standard deviation b * sqrt(2)
+        for distribution, std in [('gaussian', 0.1), ('laplace', 0.1 * np.sqrt(2))]:
+            df = self.df.copy()
+            add_noise(df, [0, 1], 0.1, distribution, seed=1)
+
+            self.assertEqual(df['age'].dtype, self.df['age'].dtype)
+            self.assertTrue(df['income'].isna()[[3, 7]].all())
+            self.assertEqual(df['income'].isna().sum(), 2)
+
+            # the noise has the relative scale of the column
+            noise = df['income'] - self.df['income']
+            self.assertAlmostEqual(noise.std() / self.df['income'].std(), std, delta=0.01)
+            self.assertAlmostEqual(noise.mean(), 0, delta=5)
+
+            # reproducible from the seed
+            again = self.df.copy()
+            add_noise(again, [0, 1], 0.1, distribution, seed=1)
+            pd.testing.assert_frame_equal(df, again)
+
+        with self.assertRaises(ValueError):
+            add_noise(self.df, [1], 0.1, 'uniform')
+
+    def test_add_noise_nullable(self):
+        df = pd.DataFrame({'age': pd.array([20, pd.NA, 40, 50], dtype='Int64')})
+        add_noise(df, [0], 1, relative=False, seed=1)
+
+        self.assertEqual(df['age'].dtype, 'Int64')
+        self.assertTrue(pd.isna(df['age'][1]))
+        self.assertLess((df['age'].dropna() - pd.Series([20, 40, 50], index=[0, 2, 3])).abs().max(), 10)
+
+    def test_rank_swap(self):
+        df = self.df.copy()
+        rank_swap(df, [0, 1], 5, seed=1)
+
+        for column in ['age', 'income']:
+            # the distribution is kept, the values move by less than 5 % of the ranks
+            np.testing.assert_array_equal(np.sort(df[column].dropna()), np.sort(self.df[column].dropna()))
+            ranks = self.df[column].rank(method='first')
+            swapped_ranks = self.df[column].sort_values().searchsorted(df[column], side='left') + 1
+            present = self.df[column].notna().to_numpy()
+            self.assertLess(np.abs(swapped_ranks[present] - ranks[present]).max(), 0.05 * present.sum() + 100)
+
+        self.assertGreater((df['income'] != self.df['income']).mean(), 0.9)
+        self.assertTrue(df['income'].isna()[[3, 7]].all())
+
+        unchanged = self.df.copy()
+        rank_swap(unchanged, [1], 0, seed=1)
+        pd.testing.assert_frame_equal(unchanged, self.df)
+
+    def test_mechanisms(self):
+        values = np.zeros((200, 100))
+
+        noisy = laplace_mechanism(values, 2, 0.5, seed=1)
+        self.assertEqual(noisy.shape, values.shape)
+        self.assertAlmostEqual(np.abs(noisy).mean(), 4, delta=0.1)
+        np.testing.assert_array_equal(noisy, laplace_mechanism(values, 2, 0.5, seed=1))
+
+        noisy = gaussian_mechanism(values, 1, 0.5, 1e-5, seed=1)
+        self.assertAlmostEqual(noisy.std(), np.sqrt(2 * np.log(1.25e5)) / 0.5, delta=0.1)
+
+        with self.assertRaises(ValueError):
+            laplace_mechanism(values, 1, 0)
+        with self.assertRaises(ValueError):
+            gaussian_mechanism(values, 1, 2, 1e-5)
+
+    def test_release_histogram(self):
+        histogram = release_histogram(self.df, [2, 3], 1.0, seed=1, post_process=False)
+
+        self.assertEqual(list(histogram.columns), ['sex', 'zipcode', 'count'])
+        self.assertEqual(len(histogram), 6)
+
+        expected = self.df.groupby(['sex', 'zipcode']).size()
+        exact = histogram.set_index(['sex', 'zipcode'])['count'].reindex(expected.index)
+        self.assertLess(np.abs(exact.to_numpy() - expected.to_numpy()).max(), 20)
+
+        # with public domains, empty cells are released as well and values outside the domains are not counted
+        histogram = release_histogram(self.df, [2, 3], 0.5, delta=1e-5, seed=1,
+                                      domains={2: ['m', 'f', 'd'], 3: [10001, 10002]})
+        self.assertEqual(len(histogram), 6)
+        self.assertEqual(histogram['count'].dtype, np.int64)
+        self.assertTrue((histogram['count'] >= 0).all())
+        self.assertLess(histogram.loc[histogram['sex'] == 'd', 'count'].max(), 50)
+
+        # the cross product is checked before it is allocated
+        with self.assertRaises(ValueError):
+            release_histogram(self.df, [2, 3], 1.0, max_cells=5)
+        with self.assertRaises(ValueError):
+            release_histogram(self.df, [0, 1, 2, 3], 1.0, domains={0: range(10 ** 6), 1: range(10 ** 6)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+import pandas as pd
+from anonymize.plan import AnonymizationPlan, get_report
+from anonymize.generalize import discretize, generalize_columns
+from anonymize.suppress import suppress_categorical_values, remove_groups, remove_groups_with_diversity_smaller_l, \
+    remove_groups_with_closeness_higher_t
+from anonymetrics.anonymetrics import calculate_k_anonymity, calculate_l_diversity, calculate_t_closeness
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        n = 2000
+        self.df = pd.DataFrame({
+            'age': rng.integers(18, 90, n),
+            'country': rng.choice(list('abcdefgh'), n, p=[.3, .2, .2, .1, .1, .05, .03, .02]),
+            'sex': rng.choice(['m', 'f'], n),
+            'disease': rng.choice(['flu', 'cold', 'cough'], n)
+        })
+        self.plan = AnonymizationPlan([0, 1, 2], [3]) \
+            .discretize(0, 10) \
+            .generalize(1, [['a', 'b'], ['c', 'd']]) \
+            .suppress_values(1, min_frequency=150) \
+            .remove_groups(5) \
+            .remove_groups_with_closeness_higher_t(3, 0.3) \
+            .remove_groups_with_diversity_smaller_l(3)
+
+    def test_run(self):
+        expected = self.df.copy()
+        discretize(expected, 0, 10)
+        generalize_columns(expected, {1: [['a', 'b'], ['c', 'd']]})
+        suppress_categorical_values(expected, min_frequency=150, column_indices=[1])
+        remove_groups(expected, [0, 1, 2], 5)
+        remove_groups_with_closeness_higher_t(expected, [0, 1, 2], 3, 0.3)
+        remove_groups_with_diversity_smaller_l(expected, [0, 1, 2], [3], 3)
+
+        report = self.plan.run(self.df)
+
+        pd.testing.assert_frame_equal(self.df, expected)
+        self.assertEqual(report['rows_removed'], 2000 - len(expected))
+        self.assertEqual(report['n_records'], len(expected))
+        self.assertEqual(report['cells_changed'][0], 2000)
+        self.assertEqual(report['k'], calculate_k_anonymity(expected, [0, 1, 2]))
+        self.assertEqual(report['l'], calculate_l_diversity(expected, [0, 1, 2], [3]))
+        self.assertAlmostEqual(report['t'], calculate_t_closeness(expected, [0, 1, 2], 3))
+
+    def test_serialization(self):
+        for text, load in [(self.plan.to_json(), AnonymizationPlan.from_json),
+                           (self.plan.to_yaml(), AnonymizationPlan.from_yaml)]:
+            plan = load(text)
+            self.assertEqual(plan.to_dict(), self.plan.to_dict())
+
+            df = self.df.copy()
+            self.assertEqual(plan.run(df), self.plan.run(self.df.copy()))
+
+    def test_suppress_locally(self):
+        plan = AnonymizationPlan.from_json(AnonymizationPlan([1, 2]).suppress_locally(20, {1: 2.0}).to_json())
+
+        report = plan.run(self.df)
+
+        self.assertEqual(report['rows_removed'], 0)
+        self.assertGreaterEqual(report['k'], 20)
+        self.assertGreater(report['cells_changed'][1], 0)
+
+    def test_validate(self):
+        with self.assertRaises(ValueError):
+            AnonymizationPlan([0]).discretize(0, 10).suppress_float(0).validate()
+        with self.assertRaises(ValueError):
+            AnonymizationPlan([0]).discretize(1, 10).validate(self.df)
+        with self.assertRaises(ValueError):
+            AnonymizationPlan([0]).discretize(7, 10).validate(self.df)
+        with self.assertRaises(ValueError):
+            AnonymizationPlan([0]).generalize(1, [['a', 'b'], ['b', 'c']]).validate()
+        with self.assertRaises(ValueError):
+            AnonymizationPlan([0]).remove_groups_with_diversity_smaller_l(2).validate()
+        with self.assertRaises(ValueError):
+            AnonymizationPlan().remove_groups(2).validate()
+        with self.assertRaises(ValueError):
+            AnonymizationPlan.from_dict({'steps': [{'operation': 'shuffle'}]})
+
+        # nothing is changed by an invalid plan
+        df = self.df.copy()
+        with self.assertRaises(ValueError):
+            AnonymizationPlan([0]).generalize(1, [['a']]).discretize(9, 10).run(df)
+        pd.testing.assert_frame_equal(df, self.df)
+
+    def test_get_report(self):
+        report = get_report(self.df, [], [3])
+        self.assertEqual(report, {'n_records': 2000, 'k': None, 'l': None, 't': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
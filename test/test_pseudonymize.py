@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from anonymize.pseudonymize import Pseudonymizer, pseudonymize_streaming
+
+
+class TestPseudonymize(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({'id': ['AB-12', 'CD-34', 'AB-12', np.nan, 'ef-56'],
+                                'partner': ['CD-34', 'AB-12', 'xy-99', 'AB-12', np.nan],
+                                'age': [20, 30, 40, 50, 60]})
+
+    def test_pseudonymize(self):
+        pseudonymizer = Pseudonymizer('secret')
+        df = self.df.copy()
+
+        self.assertEqual(pseudonymizer.pseudonymize(df, [0, 1]), 8)
+
+        # the same value gets the same token in both columns, missing values are kept
+        self.assertEqual(df.iloc[0, 0], df.iloc[2, 0])
+        self.assertEqual(df.iloc[0, 0], df.iloc[1, 1])
+        self.assertNotEqual(df.iloc[0, 0], df.iloc[1, 0])
+        self.assertTrue(pd.isna(df.iloc[3, 0]))
+        self.assertEqual(len(df.iloc[0, 0]), 16)
+        pd.testing.assert_series_equal(df['age'], self.df['age'])
+
+        # the tokens depend on the key only
+        pd.testing.assert_series_equal(Pseudonymizer(b'secret').transform(self.df['id']), df['id'])
+        self.assertNotEqual(Pseudonymizer('other').transform(self.df['id'])[0], df.iloc[0, 0])
+
+    def test_preserve_format(self):
+        tokens = Pseudonymizer('secret', 'preserve').transform(pd.Series(['AB-12', 'ef-56', 'AB-12', 42, 42.0, '42']))
+
+        self.assertRegex(tokens[0], '^[A-Z]{2}-[0-9]{2}$')
+        self.assertRegex(tokens[1], '^[a-z]{2}-[0-9]{2}$')
+        self.assertEqual(tokens[0], tokens[2])
+        self.assertEqual(len(set(tokens[3:])), 1)
+
+        # the tokens stay unique when the token space is almost full
+        tokens = Pseudonymizer('secret', 'preserve').transform(pd.Series(np.arange(100) % 10))
+        self.assertEqual(tokens.nunique(), 10)
+        with self.assertRaises(ValueError):
+            Pseudonymizer('secret', 'hex', length=1).transform(pd.Series(np.arange(17)))
+
+    def test_batches(self):
+        # without collisions, the tokens do not depend on the order of the values
+        values = pd.Series(np.random.default_rng(0).integers(0, 500, 2000))
+        expected = Pseudonymizer('secret').transform(values)
+
+        pseudonymizer = Pseudonymizer('secret')
+        batches = [pseudonymizer.transform(values[i:i + 300]) for i in range(0, len(values), 300)]
+        pd.testing.assert_series_equal(pd.concat(batches), expected)
+
+        categorical = pseudonymizer.transform(values.astype('category'))
+        self.assertEqual(categorical.astype(object).tolist(), expected.tolist())
+
+        # a later run with the saved token table gives the same tokens
+        later = Pseudonymizer('secret', token_table=pseudonymizer.get_token_table())
+        self.assertEqual(later.tokens, pseudonymizer.tokens)
+        with self.assertRaises(ValueError):
+            later.load_token_table(pd.DataFrame({'value': ['new'], 'token': [expected[0]]}))
+
+    def test_pseudonymize_streaming(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'data.csv')
+            destination = os.path.join(directory, 'pseudonymized.csv')
+            self.df.to_csv(source, index=False)
+
+            n_cells = pseudonymize_streaming(Pseudonymizer('secret'), source, destination, [0, 1], chunksize=2)
+
+            expected = self.df.copy()
+            Pseudonymizer('secret').pseudonymize(expected, [0, 1])
+
+            self.assertEqual(n_cells, 8)
+            pd.testing.assert_frame_equal(pd.read_csv(destination), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from anonymetrics.riskmetrics import prosecutor_risk, journalist_risk, marketer_risk, get_share_at_risk
+
+
+class TestRiskmetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'age': [30, 30, 40, 40, 50, 50, 20],
+                                'gender': ['M', 'M', 'F', 'F', 'M', 'M', 'D'],
+                                'salary': [50000, 60000, 70000, 80000, 90000, 100000, 1]})
+
+        # number of individuals per QI combination in the population
+        self.population = pd.DataFrame({'age': [20, 30, 40, 50, 60],
+                                        'gender': ['D', 'M', 'F', 'M', 'F'],
+                                        'count': [4, 2, 8, 5, 7]})
+
+    def test_prosecutor_risk(self):
+        risks = prosecutor_risk(self.df, [0, 1])
+
+        np.testing.assert_allclose(risks, [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0])
+        self.assertAlmostEqual(get_share_at_risk(risks, 0.5), 1 / 7)
+
+    def test_journalist_risk(self):
+        risks = journalist_risk(self.df, [0, 1], self.population, count_index=2)
+        np.testing.assert_allclose(risks, [0.5, 0.5, 0.125, 0.125, 0.2, 0.2, 0.25])
+
+        np.testing.assert_allclose(journalist_risk(self.df, [0, 1]), prosecutor_risk(self.df, [0, 1]))
+
+        with self.assertRaises(ValueError):
+            journalist_risk(self.df, [0, 1], self.population.iloc[1:], count_index=2)
+
+    def test_marketer_risk(self):
+        self.assertAlmostEqual(marketer_risk(self.df, [0, 1]), 4 / 7)
+        self.assertAlmostEqual(marketer_risk(self.df, [0, 1], self.population, count_index=2),
+                               (2 / 2 + 2 / 8 + 2 / 5 + 1 / 4) / 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+from anonymetrics.anonymetrics import calculate_k_anonymity, get_group_sizes, get_count_per_group_size
+from anonymetrics.streaming import calculate_k_anonymity_streaming, get_group_sizes_streaming, \
+    get_count_per_group_size_streaming
+from anonymize.plan import AnonymizationPlan
+from anonymize import streaming
+from anonymize.streaming import run_plan_streaming, hash_values
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'age': rng.integers(20, 30, 500),
+                                'gender': rng.choice(['M', 'F', 'D'], 500),
+                                'zipcode': rng.integers(10001, 10004, 500),
+                                'salary': rng.integers(1000, 9000, 500)})
+        self.df.loc[[3, 70, 250], 'gender'] = np.nan
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.csv')
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_csv(self):
+        for qa_indices in [[0], [2, 1], [0, 1, 2]]:
+            self.assertEqual(calculate_k_anonymity_streaming(self.path, qa_indices, chunksize=64),
+                             calculate_k_anonymity(self.df, qa_indices))
+            np.testing.assert_array_equal(get_group_sizes_streaming(self.path, qa_indices, chunksize=64),
+                                          get_group_sizes(self.df, qa_indices))
+            np.testing.assert_array_equal(get_count_per_group_size_streaming(self.path, qa_indices, chunksize=64),
+                                          get_count_per_group_size(self.df, qa_indices))
+
+    def test_dataframes(self):
+        chunks = (self.df.iloc[i:i + 100] for i in range(0, len(self.df), 100))
+        np.testing.assert_array_equal(get_group_sizes_streaming(chunks, [0, 1]), get_group_sizes(self.df, [0, 1]))
+
+
+class TestStreamingPlan(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        n = 5000
+        self.df = pd.DataFrame({'age': rng.integers(18, 90, n),
+                                'country': rng.choice(list('abcdefgh'), n, p=[.3, .2, .2, .1, .1, .05, .03, .02]),
+                                'sex': rng.choice(['m', 'f'], n),
+                                'disease': rng.choice(['flu', 'cold', 'cough'], n),
+                                'income': rng.integers(0, 1000, n)})
+        self.df.loc[[5, 17], 'sex'] = np.nan
+        self.df.loc[[8, 9], 'disease'] = np.nan
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'data.csv')
+        self.destination = os.path.join(self.directory.name, 'anonymized.csv')
+        self.df.to_csv(self.source, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_csv(self, df: pd.DataFrame) -> pd.DataFrame:
+        path = os.path.join(self.directory.name, 'expected.csv')
+        df.to_csv(path, index=False)
+        return pd.read_csv(path)
+
+    def test_run_plan_streaming(self):
+        plan = AnonymizationPlan([0, 1, 2], [3]) \
+            .discretize(0, 10) \
+            .generalize(1, [['a', 'b'], ['c', 'd']]) \
+            .suppress_values(1, min_frequency=400) \
+            .remove_groups(15) \
+            .remove_groups_with_diversity_smaller_l(3)
+
+        # small buckets spread the groups over several intermediate files
+        report = run_plan_streaming(plan, self.source, self.destination, chunksize=700, bucket_size=500)
+
+        expected_report = plan.run(self.df)
+        expected_report['t'] = None
+
+        self.assertEqual(report, expected_report)
+        pd.testing.assert_frame_equal(pd.read_csv(self.destination), self.read_csv(self.df))
+
+    def test_run_plan_streaming_dataframes(self):
+        plan = AnonymizationPlan([0, 1, 2]) \
+            .discretize(0, 10) \
+            .generalize(1, [['a', 'b'], ['c', 'd']]) \
+            .suppress_float(4) \
+            .remove_groups(40)
+        chunks = [self.df.iloc[i:i + 1000].copy() for i in range(0, len(self.df), 1000)]
+
+        report = run_plan_streaming(plan, chunks, self.destination)
+
+        # the chunks are read once per pass and stay unchanged
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.df)
+
+        expected = self.df.copy()
+        expected_report = plan.run(expected)
+        self.assertEqual(report['rows_removed'], expected_report['rows_removed'])
+        self.assertEqual(report['k'], expected_report['k'])
+
+        result = pd.read_csv(self.destination)
+        np.testing.assert_allclose(result['income'], expected['income'])
+        pd.testing.assert_frame_equal(result.drop(columns='income'), self.read_csv(expected.drop(columns='income')))
+
+    def test_run_plan_streaming_unsupported(self):
+        plan = AnonymizationPlan([0], [3]).remove_groups_with_closeness_higher_t(3, 0.2)
+        with self.assertRaises(ValueError):
+            run_plan_streaming(plan, self.source, self.destination)
+
+    def test_hash_values(self):
+        chunk = pd.DataFrame({'a': [1, 1.0, 2], 'b': [frozenset({'x', 'y'}), frozenset({'y', 'x'}), 'x']})
+        hashes = hash_values(chunk)
+        self.assertEqual(hashes[0], hashes[1])
+        self.assertNotEqual(hashes[0], hashes[2])
+        self.assertNotEqual(hash_values(chunk, 'anonymize-groups')[0], hashes[0])
+
+    def test_run_plan_streaming_collision(self):
+        # groups whose first hash collides are kept apart by the second one
+        def colliding_hash_values(chunk, hash_key=None):
+            if hash_key is None:
+                return np.ones(len(chunk), dtype=np.uint64)
+            return hash_values(chunk, hash_key)
+
+        plan = AnonymizationPlan([0, 1, 2]).remove_groups(8)
+        with patch.object(streaming, 'hash_values', side_effect=colliding_hash_values):
+            report = run_plan_streaming(plan, self.source, self.destination)
+
+        expected = self.df.copy()
+        self.assertEqual(report['rows_removed'], plan.run(expected)['rows_removed'])
+        pd.testing.assert_frame_equal(pd.read_csv(self.destination), self.read_csv(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
+import numpy as np
 import pandas as pd
-from anonymize.suppress import suppress_categorical, suppress_float, remove_groups
-from anonymetrics.anonymetrics import get_groups
+from anonymize.suppress import suppress_categorical, suppress_float, remove_groups, \
+    remove_groups_with_diversity_smaller_l, remove_groups_with_closeness_higher_t, suppress_locally, \
+    suppress_categorical_values
+from anonymetrics.anonymetrics import get_groups, calculate_k_anonymity, calculate_l_diversity, \
+    calculate_t_closeness
 
 
 class TestSuppress(unittest.TestCase):
@@ -56,6 +60,48 @@ class TestSuppress(unittest.TestCase):
 
         pd.testing.assert_frame_equal(self.df, expected_output)
 
+    def test_suppress_categorical_generalized(self):
+        # the token is the union of all values, not an existing frozenset of the column
+        df = pd.DataFrame({'A': ['cat', frozenset({'dog', 'fish'}), 'bird', 'bird']})
+
+        suppress_categorical(df, 'cat', 0)
+
+        token = frozenset({'cat', 'dog', 'fish', 'bird'})
+        self.assertEqual(df['A'].tolist(), [token, frozenset({'dog', 'fish'}), 'bird', 'bird'])
+
+        suppress_categorical(df, 'bird', 0)
+        self.assertEqual(df['A'].tolist(), [token, frozenset({'dog', 'fish'}), token, token])
+
+    def test_suppress_categorical_compact(self):
+        df = pd.DataFrame({'A': pd.Categorical(['cat', 'dog', 'dog', 'bird', 'bird'])})
+
+        suppress_categorical(df, 'dog', 0)
+        suppress_categorical(df, 'bird', 0)
+
+        self.assertEqual(df['A'].dtype, 'category')
+        self.assertEqual(df['A'].tolist(), ['cat'] + [frozenset({'bird', 'dog', 'cat'})] * 4)
+
+    def test_suppress_categorical_values(self):
+        df = pd.DataFrame({
+            'A': ['cat', 'dog', 'dog', 'bird', 'bird', 'dog'],
+            'B': pd.Categorical(['apple', 'orange', 'banana', 'apple', 'banana', 'apple']),
+            'C': ['red', 'blue', 'red', 'green', 'blue', 'red']
+        })
+
+        n_changed = suppress_categorical_values(df, {0: ['cat', 'bird'], 2: ['green']}, min_frequency=2,
+                                                column_indices=[1])
+
+        self.assertEqual(n_changed, {0: 3, 2: 1, 1: 1})
+        self.assertEqual(df['A'].tolist(), [frozenset({'bird', 'dog', 'cat'})] + ['dog'] * 2
+                         + [frozenset({'bird', 'dog', 'cat'})] * 2 + ['dog'])
+        self.assertEqual(df['B'].dtype, 'category')
+        self.assertEqual(df['B'].tolist(), ['apple', frozenset({'apple', 'orange', 'banana'}), 'banana', 'apple',
+                                            'banana', 'apple'])
+        self.assertEqual(df['C'][3], frozenset({'red', 'blue', 'green'}))
+
+        # the token of a column is shared by later calls
+        suppress_categorical_values(df, {0: ['dog']})
+        self.assertEqual(df['A'].nunique(), 1)
 
     def test_remove_groups(self):
         # Create a DataFrame for testing
@@ -77,6 +123,121 @@ class TestSuppress(unittest.TestCase):
         # print(df)
         pd.testing.assert_frame_equal(df.reset_index(drop=True), expected_result)
 
+    def test_remove_groups_summary(self):
+        # duplicate labels in the index are kept apart by position
+        df = pd.DataFrame({
+            'A': ['apple', 'banana', 'cherry', 'banana', 'apple', 'apple', 'cherry'],
+            'B': ['red', 'yellow', 'red', 'yellow', 'red', 'red', 'red'],
+            'C': ['small', 'large', 'small', 'small', 'small', 'medium', 'medium']
+        }, index=[0, 0, 1, 1, 2, 2, 3])
+
+        summary = remove_groups_with_diversity_smaller_l(df.copy(), [0, 1], [2], 2)
+        self.assertEqual(summary, {'rows_removed': 0, 'groups_removed': 0, 'k': 2, 'l': 2, 't': None})
+
+        summary = remove_groups(df, [0, 1], 3)
+        self.assertEqual(summary, {'rows_removed': 4, 'groups_removed': 2, 'k': 3, 'l': None, 't': None})
+        self.assertEqual(df.index.tolist(), [0, 2, 2])
+        self.assertEqual(df['C'].tolist(), ['small', 'small', 'medium'])
+
+    def test_remove_groups_with_closeness_higher_t(self):
+        df = pd.DataFrame({
+            'A': ['apple', 'apple', 'banana', 'banana', 'cherry', 'cherry', 'cherry'],
+            'C': ['small', 'large', 'small', 'large', 'small', 'small', 'small']
+        })
+
+        summary = remove_groups_with_closeness_higher_t(df, [0], 1, 0.25)
+
+        self.assertEqual(summary['rows_removed'], 3)
+        self.assertEqual(summary['k'], calculate_k_anonymity(df, [0]))
+        self.assertEqual(summary['l'], calculate_l_diversity(df, [0], [1]))
+        self.assertAlmostEqual(summary['t'], calculate_t_closeness(df, [0], 1))
+
+    def test_suppress_locally(self):
+        df = pd.DataFrame({
+            'age': [30, 30, 30, 40, 40, 50, 50, 60],
+            'zip': ['a', 'a', 'b', 'b', 'b', 'b', 'c', 'c'],
+            'income': range(8)
+        })
+
+        summary = suppress_locally(df, [0, 1], 2)
+
+        self.assertEqual(summary['column_cells'], {0: 4, 1: 0})
+        self.assertEqual(summary['cost'], 4)
+        self.assertEqual(summary['k'], calculate_k_anonymity(df, [0, 1]))
+        self.assertEqual(summary['k'], 2)
+        self.assertEqual(df['age'].tolist()[2:], [frozenset({30, 40, 50, 60})] + [40, 40]
+                         + [frozenset({30, 40, 50, 60})] * 3)
+        self.assertEqual(df['income'].tolist(), list(range(8)))
+
+        # a repeated call finds nothing left to suppress
+        self.assertEqual(suppress_locally(df, [0, 1], 2)['cells_suppressed'], 0)
+
+    def test_suppress_locally_weights(self):
+        df = pd.DataFrame({
+            'age': [30, 30, 30, 40, 40, 50, 50, 60],
+            'zip': pd.Categorical(['a', 'a', 'b', 'b', 'b', 'b', 'c', 'c'])
+        })
+
+        summary = suppress_locally(df, [0, 1], 2, weights={0: np.inf})
+
+        # the age 60 cannot be hidden by suppressing zip codes only, the zip b of age 30 is joined by the zips a
+        self.assertEqual(summary['column_cells'], {0: 0, 1: 6})
+        self.assertEqual(summary['rows_unresolved'], 1)
+        self.assertEqual(summary['k'], calculate_k_anonymity(df, [0, 1]))
+        self.assertEqual(df['zip'].dtype, 'category')
+        self.assertEqual(df['age'].tolist(), [30, 30, 30, 40, 40, 50, 50, 60])
+
+    def test_suppress_locally_unresolved(self):
+        # records with a missing value stay unchanged, the fully suppressed record is joined by the group of k records
+        df = pd.DataFrame({'a': [1, 2, None, 1], 'b': ['x', 'y', 'y', 'x']})
+
+        summary = suppress_locally(df, [0, 1], 2)
+
+        self.assertEqual(summary['rows_unresolved'], 0)
+        self.assertEqual(summary['k'], 3)
+        self.assertTrue(np.isnan(df['a'][2]))
+        self.assertEqual(df['b'].tolist(), [frozenset({'x', 'y'})] * 2 + ['y', frozenset({'x', 'y'})])
+
+        # with more than k records, only the surplus records join it
+        df = pd.DataFrame({'a': [1, 2, 1, 1], 'b': ['x', 'y', 'x', 'x']})
+        summary = suppress_locally(df, [0, 1], 2)
+
+        self.assertEqual(summary['cells_suppressed'], 4)
+        self.assertEqual(summary['k'], 2)
+        self.assertEqual(calculate_k_anonymity(df, [0, 1]), 2)
+
+    def test_suppress_locally_summary(self):
+        # patterns vacated by a group and occupied again later must not redirect the records of the new group
+        for seed in range(300):
+            rng = np.random.default_rng(seed)
+            n = int(rng.integers(2, 30))
+            k = int(rng.integers(2, 5))
+            df = pd.DataFrame({column: rng.integers(0, 4, n) for column in 'abc'})
+            original = df.copy()
+
+            summary = suppress_locally(df, [0, 1, 2], k)
+
+            sizes = df.groupby(list('abc'), sort=False)['a'].transform('size')
+            changed = (df.astype(object) != original.astype(object)).to_numpy()
+            self.assertEqual(summary['k'], calculate_k_anonymity(df, [0, 1, 2]))
+            self.assertEqual(summary['cells_suppressed'], int(changed.sum()))
+            self.assertEqual(summary['column_cells'], dict(enumerate(changed.sum(axis=0).tolist())))
+            self.assertEqual(summary['rows_unresolved'], int((sizes < k).sum()))
+
+    def test_suppress_locally_reaches_k(self):
+        # a fully suppressed group < k records takes records of other groups
+        for seed in range(300):
+            rng = np.random.default_rng(seed)
+            k = int(rng.integers(2, 6))
+            n = int(rng.integers(k, 60))
+            df = pd.DataFrame({column: rng.integers(0, 5, n) for column in 'abc'})
+
+            summary = suppress_locally(df, [0, 1, 2], k)
+
+            self.assertGreaterEqual(calculate_k_anonymity(df, [0, 1, 2]), k)
+            self.assertEqual(summary['rows_unresolved'], 0)
+            self.assertEqual(summary['k'], calculate_k_anonymity(df, [0, 1, 2]))
+
 
 if __name__ == '__main__':
     unittest.main()